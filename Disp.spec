@@ -10,7 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # pandas/numpy приложению не нужны; исключаем, даже если стоят в окружении сборки
+    excludes=['pandas', 'numpy'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,917 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Микро-бенчмарки горячих участков приложения.
+
+Запуск:  python benchmarks.py <сценарий> [--rows N]
+Сценарии не импортируют main.py (он открывает окно входа), а работают
+с теми же модулями, что использует приложение.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+
+def _synthetic_timestamps(n: int, seed: int = 1):
+    """created_at за год: ~n заявок с разными секундами, часть старых записей без времени."""
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    out = []
+    for _ in range(n):
+        dt = start + timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+        out.append(dt.strftime("%Y-%m-%d") if rnd.random() < 0.05 else dt.strftime("%Y-%m-%d %H:%M:%S"))
+    out.sort()
+    return out
+
+
+def _report(name: str, rows: int, seconds: float):
+    rate = rows / seconds if seconds > 0 else float("inf")
+    print(f"  {name:<28} {seconds * 1000:9.1f} мс   {rate:13,.0f} строк/с")
+
+
+def bench_formatting(rows: int):
+    """Форматирование created_at/assignment_date и метки месяца для списка заявок."""
+    from formatting import clear_cache, format_timestamp, format_date, month_label
+
+    stamps = _synthetic_timestamps(rows)
+    assigns = [s[:10] for s in stamps]
+    months_ru = {
+        "January": "Январь", "February": "Февраль", "March": "Март",
+        "April": "Апрель", "May": "Май", "June": "Июнь",
+        "July": "Июль", "August": "Август", "September": "Сентябрь",
+        "October": "Октябрь", "November": "Ноябрь", "December": "Декабрь"
+    }
+
+    def before():
+        # Прежняя логика populate_tree_from_rows: strptime для метки месяца и ещё раз для даты
+        out = []
+        current = None
+        for dt_str, assign in zip(stamps, assigns):
+            label = None
+            try:
+                label = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S").strftime("%B %Y")
+            except Exception:
+                try:
+                    label = datetime.strptime(dt_str, "%Y-%m-%d").strftime("%B %Y")
+                except Exception:
+                    pass
+            if label:
+                for en, ru in months_ru.items():
+                    label = label.replace(en, ru)
+            if label and label != current:
+                current = label
+                out.append(label.upper())
+            time_f = ""
+            try:
+                dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
+                date_f = dt.strftime("%d.%m.%Y")
+                time_f = dt.strftime("%H:%M")
+            except Exception:
+                try:
+                    date_f = datetime.strptime(dt_str, "%Y-%m-%d").strftime("%d.%m.%Y")
+                except Exception:
+                    date_f = str(dt_str or "")
+            assign_f = datetime.strptime(assign, "%Y-%m-%d").strftime("%d.%m.%Y") if assign else ""
+            out.append((date_f, time_f, assign_f))
+        return out
+
+    def after():
+        out = []
+        current = None
+        for dt_str, assign in zip(stamps, assigns):
+            ts = format_timestamp(dt_str)
+            if ts.month_key and ts.month_key != current:
+                current = ts.month_key
+                out.append(month_label(ts.month_key).upper())
+            out.append((ts.date, ts.time, format_date(assign)))
+        return out
+
+    print(f"formatting: {rows:,} строк")
+    t0 = time.perf_counter(); ref = before(); t1 = time.perf_counter()
+    _report("до (strptime/strftime)", rows, t1 - t0)
+    clear_cache()
+    t0 = time.perf_counter(); res = after(); t1 = time.perf_counter()
+    _report("после (холодный кэш)", rows, t1 - t0)
+    t0 = time.perf_counter(); after(); t1 = time.perf_counter()
+    _report("после (повторный показ)", rows, t1 - t0)
+    if res != ref:
+        print("  ВНИМАНИЕ: результаты не совпадают")
+        return 1
+    return 0
+
+
+def _synthetic_period(directory: str, rows: int, months: int = 12, seed: int = 1):
+    """Помесячные базы app_2025_MM.db и общая app.db с ~rows заявками за период."""
+    import os
+    import sqlite3
+
+    rnd = random.Random(seed)
+    common = sqlite3.connect(os.path.join(directory, "app.db"))
+    common.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)")
+    common.executemany("INSERT INTO users VALUES (?, ?)", [(i, f"оператор{i}") for i in range(1, 9)])
+    common.commit()
+    common.close()
+
+    problems = ["Течь воды в подвале", "Нет электричества в подъезде (срок выполнения 3 дня)",
+                "Засор канализации", "Не работает лифт", "Уборка территории"]
+    statuses = ["в работе", "выполнено 12.03.2025 10:15", "не выполнено"]
+    files = []
+    per_month = rows // months
+    rec_id = 0
+    for month in range(1, months + 1):
+        path = os.path.join(directory, f"app_2025_{month:02d}.db")
+        db = sqlite3.connect(path)
+        db.execute("""CREATE TABLE records (id INTEGER PRIMARY KEY, name TEXT, surname TEXT, category TEXT,
+                      problem TEXT, brigade_number TEXT, phone TEXT, address TEXT, created_at TEXT,
+                      assignment_date TEXT, status TEXT, user_id INTEGER, date TEXT, improvement TEXT,
+                      version INTEGER NOT NULL DEFAULT 0)""")
+        batch = []
+        for _ in range(per_month if month < months else rows - per_month * (months - 1)):
+            rec_id += 1
+            dt = datetime(2025, month, rnd.randint(1, 28), rnd.randrange(24), rnd.randrange(60), rnd.randrange(60))
+            stamp = dt.strftime("%Y-%m-%d %H:%M:%S")
+            batch.append((rec_id, "Иван", "Петров", "Сантехника", rnd.choice(problems), str(rnd.randint(1, 12)),
+                          f"+7 900 {rnd.randrange(10**7):07d}", f"ул. Ленина, д. {rnd.randint(1, 200)}, кв. {rnd.randint(1, 300)}",
+                          stamp, stamp[:10], rnd.choice(statuses), rnd.randint(1, 8), stamp, "", 0))
+        db.executemany("INSERT INTO records VALUES (" + ",".join("?" * 15) + ")", batch)
+        db.commit()
+        db.close()
+        files.append(path)
+    return files
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def bench_export(rows: int):
+    """Экспорт периода в Excel: прежний путь (вся выборка в памяти) и потоковый export.py."""
+    import os
+    import sqlite3
+    import tempfile
+
+    from export import EXPORT_COLUMNS, export_values, iter_record_rows, write_records_xlsx
+
+    def open_shard(path):
+        connection = sqlite3.connect(path)
+        connection.execute("ATTACH DATABASE ? AS common", (os.path.join(os.path.dirname(path), "app.db"),))
+        return connection
+
+    def before(files, out_path):
+        # Прежний путь: все строки всех баз списком, затем лист обычной книги и проход по колонкам
+        from openpyxl import Workbook
+        from openpyxl.utils import get_column_letter
+
+        all_rows = list(iter_record_rows(files, open_shard))
+        table = [export_values(idx, row) for idx, row in enumerate(all_rows, start=1)]
+        wb = Workbook()
+        ws = wb.active
+        ws.append([title for title, _ in EXPORT_COLUMNS])
+        for values in table:
+            ws.append(values)
+        for col_idx, (_, width) in enumerate(EXPORT_COLUMNS, start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+        wb.save(out_path)
+        return len(table)
+
+    def after(files, out_path):
+        return write_records_xlsx(out_path, iter_record_rows(files, open_shard))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"export: {rows:,} строк, 12 баз")
+        files = _synthetic_period(tmp, rows)
+        # Пиковый RSS процесса только растёт, поэтому потоковый вариант меряется первым
+        base = _peak_rss_mb()
+        t0 = time.perf_counter(); n_after = after(files, os.path.join(tmp, "after.xlsx")); t1 = time.perf_counter()
+        peak_after = _peak_rss_mb()
+        _report("после (write_only, поток)", n_after, t1 - t0)
+        t0 = time.perf_counter(); n_before = before(files, os.path.join(tmp, "before.xlsx")); t1 = time.perf_counter()
+        peak_before = _peak_rss_mb()
+        _report("до (список + обычная книга)", n_before, t1 - t0)
+        print(f"  прирост пикового RSS: после {peak_after - base:8.1f} МБ   до {peak_before - peak_after:8.1f} МБ (сверх)")
+        if n_after != n_before:
+            print("  ВНИМАНИЕ: число строк не совпадает")
+            return 1
+    return 0
+
+
+def bench_autosize(rows: int):
+    """Автоширина колонок: прежний второй проход по колонкам и ColumnWidths по ходу записи
+    (по всем строкам и, как в потоковом экспорте, по первым SAMPLE_ROWS)."""
+    from export import EXPORT_COLUMNS, SAMPLE_ROWS, ColumnWidths
+
+    rnd = random.Random(1)
+    headers = [title for title, _ in EXPORT_COLUMNS]
+    words = ["течь", "воды", "подвал", "электричество", "подъезд", "лифт", "засор", "уборка"]
+    table = []
+    for idx in range(1, rows + 1):
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(2, 12)))
+        table.append((idx, f"№ {idx}", "12.03.25", "10:15:00", text.upper(), "Сантехника", str(rnd.randint(1, 12)),
+                      "", f"+7 900 {rnd.randrange(10**7):07d}", f"ул. Ленина, д. {rnd.randint(1, 200)}",
+                      "", "Иван Петров", "оператор1", "выполнено\n12.03.2025 10:15" if idx % 3 else "в работе"))
+
+    def before():
+        # Прежний код: по каждой колонке str() всех значений и split("\n")
+        out = []
+        for c, col in enumerate(headers):
+            max_len = len(str(col))
+            for val in (str(values[c]) for values in table):
+                for line in val.split("\n"):
+                    if len(line) > max_len:
+                        max_len = len(line)
+            out.append(min(80, max_len + 2))
+        return out
+
+    def after(measured):
+        sizer = ColumnWidths(headers)
+        for values in measured:
+            sizer.observe(values)
+        return sizer.widths()
+
+    print(f"autosize: {rows:,} строк, {len(headers)} колонок")
+    t0 = time.perf_counter(); ref = before(); t1 = time.perf_counter()
+    _report("до (проход по колонкам)", rows, t1 - t0)
+    t0 = time.perf_counter(); res = after(table); t1 = time.perf_counter()
+    _report("после (все строки)", rows, t1 - t0)
+    t0 = time.perf_counter(); after(table[:SAMPLE_ROWS]); t1 = time.perf_counter()
+    _report(f"после (первые {SAMPLE_ROWS}, как в экспорте)", min(rows, SAMPLE_ROWS), t1 - t0)
+    if res != ref:
+        print("  ВНИМАНИЕ: результаты не совпадают")
+        return 1
+    return 0
+
+
+def bench_report(rows: int):
+    """Сводка по фильтрам: прежнее оформление (новые Alignment/Border на каждую ячейку)
+    и именованные стили report_styles (export.write_filtered_report)."""
+    import os
+    import tempfile
+
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Side
+
+    from export import write_filtered_report
+
+    rnd = random.Random(1)
+    words = ["течь", "воды", "подвал", "засор", "колодец", "канализации", "кран", "давление"]
+    table = []
+    for idx in range(1, rows + 1):
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(2, 12)))
+        table.append((idx, f"{text} (срок выполнения 24 ч)", f"+7 900 {rnd.randrange(10**7):07d}",
+                      f"ул. Ленина, д. {rnd.randint(1, 200)}", "", "3", "Водопровод", "2025-03-12 10:15:00",
+                      "Иван", "Петров", "оператор1", "выполнено"))
+
+    def before(path):
+        # Прежний код: объекты стилей создаются заново для каждой ячейки таблицы
+        wb = Workbook()
+        ws = wb.active
+        thin = Side(style="thin")
+        for r, row in enumerate(table, start=6):
+            values = (row[0], row[7], row[1], row[3], f"{row[8]} {row[9]}", row[11])
+            for c, value in enumerate(values, start=1):
+                cell = ws.cell(row=r, column=c, value=value)
+                cell.alignment = Alignment(wrap_text=c in (3, 4, 5), vertical="top")
+                cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        wb.save(path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"report: {rows:,} строк, 6 колонок")
+        old_path = os.path.join(tmp, "before.xlsx")
+        t0 = time.perf_counter(); before(old_path); t1 = time.perf_counter()
+        _report("до (стили на каждую ячейку)", rows, t1 - t0)
+        new_path = os.path.join(tmp, "after.xlsx")
+        t0 = time.perf_counter(); write_filtered_report(new_path, table, "Период", "Отбор"); t1 = time.perf_counter()
+        _report("после (именованные стили)", rows, t1 - t0)
+        print(f"  размер файла: {os.path.getsize(old_path) / 1024:.0f} КБ -> {os.path.getsize(new_path) / 1024:.0f} КБ")
+    return 0
+
+
+def bench_summary(rows: int):
+    """Краткий отчёт за год: прежний GROUP BY problem с правилами в Python по каждой
+    формулировке и выборка из суточной сводки daily_rollup (summary.py)."""
+    import sqlite3
+    import tempfile
+
+    from changes import install_change_log
+    from problems import classify_problem
+    from summary import bucket_counts, summarize
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = _synthetic_period(tmp, rows)
+        for path in files:
+            # Срок выполнения в тексте делает формулировки почти уникальными
+            db = sqlite3.connect(path)
+            install_change_log(db)
+            db.execute("UPDATE records SET problem = problem || ' (срок выполнения ' || (id % 97) || ' ч, ' || "
+                       "substr(address, -3) || ')'")
+            db.commit()
+            db.close()
+
+        def before():
+            counts = {}
+            for path in files:
+                db = sqlite3.connect(path)
+                for problem, count in db.execute("SELECT problem, COUNT(*) FROM records "
+                                                 "WHERE date(date) >= date(?) AND date(date) <= date(?) "
+                                                 "GROUP BY problem", ("2025-01-01", "2025-12-31")):
+                    bucket = classify_problem(problem)
+                    if bucket:
+                        counts[bucket] = counts.get(bucket, 0) + count
+                db.close()
+            return summarize(counts.items())
+
+        def after():
+            pairs = []
+            for path in files:
+                db = sqlite3.connect(path)
+                pairs += bucket_counts(db, "2025-01-01", "2025-12-31")
+                db.close()
+            return summarize(pairs)
+
+        print(f"summary: {rows:,} строк, {len(files)} баз")
+        t0 = time.perf_counter(); ref = before(); t1 = time.perf_counter()
+        _report("до (правила по формулировкам)", rows, t1 - t0)
+        t0 = time.perf_counter(); after(); t1 = time.perf_counter()
+        _report("после, первый отчёт (построение сводки)", rows, t1 - t0)
+        t0 = time.perf_counter(); res = after(); t1 = time.perf_counter()
+        _report("после (суточная сводка)", rows, t1 - t0)
+    if res != ref:
+        print("  ВНИМАНИЕ: результаты не совпадают")
+        return 1
+    return 0
+
+
+def _old_blank_section(problem_text: str, problem_to_blank_category) -> str:
+    """Прежний category_for бланка сведений (эталон для проверки blank.BlankClassifier)."""
+    import re
+
+    from problems import clean_problem_text
+
+    t = (problem_text or "").lower()
+
+    # Сначала проверяем, есть ли категория в скобках в самом тексте проблемы
+    # Формат: "содержание (категория)" - извлекаем категорию из скобок
+    # Ищем категорию в скобках, но не "срок выполнения"
+    category_match = re.search(r'\(([^)]+)\)', t)
+    if category_match:
+        category_in_parens = category_match.group(1).lower().strip()
+        # Игнорируем "срок выполнения" и другие служебные скобки
+        if "срок" not in category_in_parens and "выполнен" not in category_in_parens:
+            # Маппинг категорий из скобок в названия секций бланка
+            category_map = {
+                "канализация": "КАНАЛИЗАЦИЯ",
+                "водопровод": "ВОДОПРОВОД",
+                "водоотведение": "КАНАЛИЗАЦИЯ",
+                "водоснабжение": "ВОДОПРОВОД",
+                "перекладка": "ПЕРЕКЛАДКА",
+                "в/колонки": "В/КОЛОНКИ",
+                "колонки": "В/КОЛОНКИ",
+                "пожарные гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
+                "гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
+                "частные врезки": "ЧАСТНЫЕ ВРЕЗКИ",
+                "врезки": "ЧАСТНЫЕ ВРЕЗКИ",
+            }
+            # Проверяем точное совпадение или частичное
+            for key, value in category_map.items():
+                if key in category_in_parens:
+                    return value
+                # Если не нашли точное совпадение, пробуем по первым словам
+                if "канализац" in category_in_parens:
+                    return "КАНАЛИЗАЦИЯ"
+                if "водопровод" in category_in_parens or "водоснабж" in category_in_parens:
+                    return "ВОДОПРОВОД"
+                if "перекладк" in category_in_parens:
+                    return "ПЕРЕКЛАДКА"
+                if "колонк" in category_in_parens:
+                    return "В/КОЛОНКИ"
+                if "гидрант" in category_in_parens:
+                    return "ПОЖАРНЫЕ ГИДРАНТЫ"
+                if "врезк" in category_in_parens:
+                    return "ЧАСТНЫЕ ВРЕЗКИ"
+
+    # Проверяем маппинг из problem_to_blank_category
+    problem_clean = clean_problem_text(problem_text).lower()
+    if problem_clean in problem_to_blank_category:
+        return problem_to_blank_category[problem_clean]
+
+    # ПЕРЕКЛАДКА: прокладка водопровода, врезка водопровода, разрытие, прокол канализации, прокол водопровода, замена водовода
+    # Приоритет: проверяем сначала ПЕРЕКЛАДКУ
+    if "перекладк" in t or "прокладк" in t:
+        # Если есть "перекладка" или "прокладка" - это ПЕРЕКЛАДКА
+        return "ПЕРЕКЛАДКА"
+    if "разрытие" in t and "восстанов" not in t:
+        # "разрытие" само по себе - ПЕРЕКЛАДКА, но "восстановить разрытие" - ВОДОПРОВОД
+        return "ПЕРЕКЛАДКА"
+    if "прокол" in t:
+        # прокол канализации или прокол водопровода
+        return "ПЕРЕКЛАДКА"
+    if "замен" in t and "водовод" in t:
+        # замена водовода
+        return "ПЕРЕКЛАДКА"
+    if "врезк" in t and "водопровод" in t and "частн" not in t:
+        # врезка водопровода (но не частная)
+        return "ПЕРЕКЛАДКА"
+
+    # ЧАСТНЫЕ ВРЕЗКИ: ч/врезка, ч/врезка (нужна откачка воды из колодца)
+    if ("врезк" in t and "частн" in t) or ("ч/" in t and "врезк" in t) or \
+       ("частн" in t and "врезк" in t):
+        return "ЧАСТНЫЕ ВРЕЗКИ"
+
+    # ПОЖАРНЫЕ ГИДРАНТЫ: неисправен ПГ, домонтирован ПГ, нет воды в ПГ, соран шток ПГ и затоплен водой
+    if "гидрант" in t or "пг" in t:
+        return "ПОЖАРНЫЕ ГИДРАНТЫ"
+
+    # В/КОЛОНКИ: ремонт в/колонки
+    if "колонк" in t:
+        return "В/КОЛОНКИ"
+
+    # ВОДОПРОВОД: перекладка водопровода, течь, замена крана (оплачено), течь, открыт в/к и течь в/к,
+    # перекрыть/открыть х/в (оплачено), восстановить благоустройство, сл.давление х/воды, восстановить разрытие
+    if "течь" in t and "канализац" not in t:
+        # течь (но не течь канализации)
+        return "ВОДОПРОВОД"
+    if "замен" in t and "кран" in t:
+        # замена крана
+        return "ВОДОПРОВОД"
+    if "открыт" in t and ("в/к" in t or "в/колонк" in t):
+        # открыт в/к и течь в/к
+        return "ВОДОПРОВОД"
+    if ("перекрыт" in t or "открыт" in t) and ("х/в" in t or "холодн" in t):
+        # перекрыть/открыть х/в
+        return "ВОДОПРОВОД"
+    if "восстанов" in t and ("благоустр" in t or "разрытие" in t):
+        # восстановить благоустройство, восстановить разрытие
+        return "ВОДОПРОВОД"
+    if ("слаб" in t or "сл." in t) and ("давл" in t or "х/в" in t or "холодн" in t):
+        # сл.давление х/воды
+        return "ВОДОПРОВОД"
+    if "водопровод" in t:
+        # все остальное с водопроводом
+        return "ВОДОПРОВОД"
+
+    # КАНАЛИЗАЦИЯ: все остальное, связанное с канализацией
+    if ("засор" in t) or ("колодец" in t and ("канализац" in t or "забой" in t)) or ("канализац" in t):
+        return "КАНАЛИЗАЦИЯ"
+
+    # По умолчанию - ВОДОПРОВОД
+    return "ВОДОПРОВОД"
+
+
+# Формулировки для проверки совпадения разделов бланка: содержания из таблицы docx
+# по умолчанию, формулировки из базы и варианты со скобками
+_BLANK_CORPUS = (
+    "забой канализационного колодца", "течь канализации по дороге", "течь воды", "течь в / колонки",
+    "течь из-под земли", "течь пожарного гидранта", "течь из -под асфальта", "течь трассы холодной воды",
+    "откачка воды из колодца", "дефект водоразборной колонки", "ржавая холодная вода в жилом фонде",
+    "Не работает в / колонка", "слабое давление х/в", "восстановить в/колонку", "течь в/к", "нет х/в",
+    "перекладка", "водопровод", "частные врезки", "открыт колодец (отсутствие/несоответствие крышки)",
+    "восстановление асфальтобетонного покрытия", "разрушена плита колодца", "привести к/к в нормативное состояние",
+    "привести в / к в нормативное состояние", "обвал в/к", "обвал к/к", "ч/врезка", "ч/врезка (нужна откачка воды из колодца)",
+    "неисправен ПГ", "домонтирован ПГ", "нет воды в ПГ", "соран шток ПГ и затоплен водой", "ремонт в/колонки",
+    "замена крана (оплачено)", "открыт в/к и течь в/к", "перекрыть/открыть х/в (оплачено)",
+    "восстановить благоустройство", "сл.давление х/воды", "восстановить разрытие", "разрытие", "прокол канализации",
+    "прокол водопровода", "замена водовода", "врезка водопровода", "частная врезка водопровода",
+    "прокладка водопровода", "засор", "засор канализации", "течь воды /канализации по дороге",
+    "забит колодец", "уборка территории", "", "Течь Водопровода (Канализация)",
+)
+_BLANK_SUFFIXES = ("", " (срок выполнения 24 ч)", " (водоснабжение)", " (канализация)", " (водоотведение)",
+                   " (перекладка)", " (в/колонки)", " (пожарные гидранты)", " (частные врезки)", " (прочее)",
+                   " (срок выполнения 2 ч) (канализация)")
+
+
+def bench_blank(rows: int):
+    """Раздел бланка сведений: прежний category_for на каждую строку бланка и
+    blank.BlankClassifier; заодно проверяет, что разделы совпадают на корпусе формулировок."""
+    from blank import BlankClassifier, section_for_category
+
+    mapping = {"течь канализации по дороге": section_for_category("канализация"),
+               "откачка воды из колодца": section_for_category("водоотведение"),
+               "разрушена плита колодца": section_for_category("пожарные гидранты")}
+    corpus = [text + suffix for text in _BLANK_CORPUS for suffix in _BLANK_SUFFIXES]
+    corpus += [text.upper() for text in corpus]
+    classify = BlankClassifier(mapping)
+    mismatches = [(text, _old_blank_section(text, mapping), classify(text)) for text in corpus
+                  if _old_blank_section(text, mapping) != classify(text)]
+    print(f"blank: корпус {len(corpus)} формулировок, расхождений: {len(mismatches)}")
+    for text, before, after in mismatches[:10]:
+        print(f"  {text!r}: {before} -> {after}")
+
+    rnd = random.Random(1)
+    table = [rnd.choice(corpus) for _ in range(rows)]
+    t0 = time.perf_counter()
+    for text in table:
+        _old_blank_section(text, mapping)
+    t1 = time.perf_counter()
+    _report("до (category_for на строку)", rows, t1 - t0)
+    classify = BlankClassifier(mapping)
+    t0 = time.perf_counter()
+    for text in table:
+        classify(text)
+    t1 = time.perf_counter()
+    _report("после (BlankClassifier)", rows, t1 - t0)
+    return 1 if mismatches else 0
+
+
+def _old_problem_views(text, classify):
+    """Прежний разбор текста проблемы: каждый потребитель — своими выражениями."""
+    import re
+
+    from problems import _bucket
+
+    raw = text or ""
+    # Форма: очистка от категорий в скобках (blank.clean_problem_text)
+    deadline_match = re.search(r"\([^)]*срок[^)]*выполнен[^)]*\)", raw, re.IGNORECASE)
+    cleaned = re.sub(r"\s*\([^)]*\)", "", raw)
+    if deadline_match:
+        cleaned = cleaned.strip() + " " + deadline_match.group(0)
+    # Выгрузка: отделение срока (export.split_deadline)
+    stripped = raw.strip()
+    m = re.search(r"\((\s*срок\s+выполнения\s*[^)]*)\)", stripped, re.IGNORECASE)
+    deadline = m.group(1).strip() if m else ""
+    body = re.sub(r"\((\s*срок\s+выполнения\s*[^)]*)\)", "", stripped, flags=re.IGNORECASE).strip() if m else stripped
+    # Сводка по фильтрам: часы срока
+    m = re.search(r"\(\s*срок\s+выполнения\s*(\d+)\s*ч\s*\)", stripped, re.IGNORECASE)
+    hours = m.group(1) if m else ""
+    # Поиск, краткий отчёт и бланк
+    return (cleaned.strip(), body, deadline, hours, raw.lower(), _bucket(raw.lower()), classify(raw))
+
+
+def bench_problems(rows: int):
+    """Разбор текста проблемы на rows строк (форма, выгрузка, поиск, краткий отчёт, бланк):
+    прежние выражения у каждого потребителя и общий problems.parse_problem с памятью."""
+    from blank import BlankClassifier
+    from problems import clear_cache, parse_problem
+
+    corpus = [text + suffix for text in _BLANK_CORPUS for suffix in _BLANK_SUFFIXES]
+    rnd = random.Random(1)
+    table = [rnd.choice(corpus) for _ in range(rows)]
+    mapping = {"течь канализации по дороге": "КАНАЛИЗАЦИЯ"}
+
+    def after(classify):
+        out = []
+        for text in table:
+            p = parse_problem(text)
+            out.append((p.text, p.body, p.deadline, p.deadline_hours, p.folded, p.bucket, classify(text)))
+        return out
+
+    def old_classify(text):
+        return _old_blank_section(text, mapping)
+
+    print(f"problems: {rows:,} строк, {len(set(table)):,} формулировок")
+    t0 = time.perf_counter(); ref = [_old_problem_views(text, old_classify) for text in table]
+    t1 = time.perf_counter()
+    _report("до (разбор у каждого)", rows, t1 - t0)
+    clear_cache()
+    classify = BlankClassifier(mapping)
+    t0 = time.perf_counter(); res = after(classify); t1 = time.perf_counter()
+    _report("после (холодная память)", rows, t1 - t0)
+    t0 = time.perf_counter(); after(classify); t1 = time.perf_counter()
+    _report("после (повторный отчёт)", rows, t1 - t0)
+    if res != ref:
+        print("  ВНИМАНИЕ: результаты не совпадают")
+        return 1
+    return 0
+
+
+def bench_blanks(rows: int):
+    """Бланки сведений за месяц: прежние 30 отдельных выгрузок (запрос и книга на каждый день)
+    и один запрос с разбором по дням и записью книг в рабочих процессах."""
+    import os
+    import sqlite3
+    import tempfile
+    from datetime import date
+
+    from blank import BlankClassifier, blank_lines, partition_by_day, write_blank_files, write_daily_blank
+
+    fields = ("problem, address, phone, name, surname, brigade_number, COALESCE(created_at, date), status, "
+              "category, blank_category")
+    days = [date(2025, 3, d) for d in range(1, 31)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Все заявки — в одном месяце
+        path = _synthetic_period(tmp, rows, months=1)[0]
+        db = sqlite3.connect(path)
+        db.execute("ALTER TABLE records ADD COLUMN blank_category TEXT")
+        db.execute("UPDATE records SET date = '2025-03-' || substr(date, 9), created_at = '2025-03-' || substr(created_at, 9)")
+        db.commit()
+
+        def before(out):
+            classify = BlankClassifier()
+            for day in days:
+                day_rows = db.execute(f"SELECT {fields} FROM records WHERE date(date) = date(?) ORDER BY id",
+                                      (day.strftime("%Y-%m-%d"),)).fetchall()
+                write_daily_blank(os.path.join(out, f"{day:%d}.xlsx"), day, blank_lines(day_rows, classify))
+
+        def after(out):
+            classify = BlankClassifier()
+            by_day = partition_by_day(db.execute(
+                f"SELECT date(date), {fields} FROM records WHERE date(date) >= date(?) AND date(date) <= date(?) "
+                "ORDER BY id", ("2025-03-01", "2025-03-30")))
+            return write_blank_files([(os.path.join(out, f"{day:%d}.xlsx"), day,
+                                       blank_lines(by_day.get(day.strftime("%Y-%m-%d"), ()), classify))
+                                      for day in days])
+
+        print(f"blanks: {rows:,} строк, {len(days)} бланков, процессоров: {os.cpu_count()}")
+        os.mkdir(os.path.join(tmp, "before"))
+        os.mkdir(os.path.join(tmp, "after"))
+        t0 = time.perf_counter(); before(os.path.join(tmp, "before")); t1 = time.perf_counter()
+        _report("до (30 выгрузок подряд)", rows, t1 - t0)
+        t0 = time.perf_counter(); results = after(os.path.join(tmp, "after")); t1 = time.perf_counter()
+        _report("после (месяц, процессы)", rows, t1 - t0)
+        slowest = max(results, key=lambda r: r[2])
+        print(f"  самый долгий файл: {os.path.basename(slowest[0])}, {slowest[1]} заявок, {slowest[2]:.2f} с")
+        db.close()
+    return 0
+
+
+def _old_daily_blank(path, day, sections) -> int:
+    """Прежний write_daily_blank: книга бланка собирается с нуля (эталон для blank_template)."""
+    from openpyxl import Workbook
+
+    from report_styles import BLANK_LINE_ROW, BLANK_SECTION_ROW, register, style_row
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Бланк"
+    register(wb)
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
+    ws.cell(row=1, column=1, value=f"БЛАНК - СВЕДЕНИЙ  {day.strftime('%d.%m.%y')}").style = "disp_title"
+    row_idx = 3
+    for section_name, lines in sections.items():
+        ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=6)
+        ws.cell(row=row_idx, column=1, value=section_name)
+        style_row(ws, row_idx, BLANK_SECTION_ROW)
+        row_idx += 1
+        for left_text, right_text in lines or [("", "")]:
+            ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=5)
+            ws.cell(row=row_idx, column=1, value=left_text)
+            ws.cell(row=row_idx, column=6, value=right_text)
+            style_row(ws, row_idx, BLANK_LINE_ROW)
+            row_idx += 1
+        row_idx += 1
+    ws.column_dimensions['A'].width = 16
+    for col in ['B', 'C', 'D', 'E']:
+        ws.column_dimensions[col].width = 24
+    ws.column_dimensions['F'].width = 44
+    sig_row = ws.max_row + 2
+    ws.merge_cells(start_row=sig_row, start_column=1, end_row=sig_row, end_column=3)
+    ws.cell(row=sig_row, column=1, value="Составил: __________________")
+    ws.merge_cells(start_row=sig_row + 1, start_column=1, end_row=sig_row + 1, end_column=3)
+    ws.cell(row=sig_row + 1, column=1, value="Утвердил: __________________")
+    wb.save(path)
+    return sum(len(lines) for lines in sections.values())
+
+
+def bench_template(rows: int):
+    """Бланк сведений: прежняя сборка книги с нуля и заполнение заготовки шаблона
+    (blank_template). rows — заявок на бланк; пишется 30 бланков. Проверяется, что
+    по стандартному шаблону получается та же книга."""
+    import os
+    import random
+    import tempfile
+    from datetime import date
+
+    from openpyxl import load_workbook
+
+    from blank import SECTIONS
+    from blank_template import ensure_default_template, render_blank
+
+    rng = random.Random(1)
+    day = date(2025, 3, 1)
+    sections = {section: [] for section in SECTIONS}
+    for i in range(rows):
+        sections[rng.choice(SECTIONS)].append(
+            (f"заявка {i} — ул. Ленина, {rng.randint(1, 200)} — бригада {rng.randint(1, 9)}" * rng.randint(1, 3),
+             f"01.03.2025 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d} — выполнено"))
+
+    def dump(path):
+        ws = load_workbook(path).active
+        cells = {(c.row, c.column): (c.value, c.style, c.font.b, c.alignment.horizontal, c.alignment.wrap_text,
+                                     c.border.left.style if c.border.left else None)
+                 for row in ws.iter_rows() for c in row if c.value is not None or c.has_style}
+        widths = {k: v.width for k, v in ws.column_dimensions.items()}
+        return cells, sorted(str(m) for m in ws.merged_cells.ranges), widths
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = ensure_default_template(tmp)
+        old_path, new_path = os.path.join(tmp, "old.xlsx"), os.path.join(tmp, "new.xlsx")
+        _old_daily_blank(old_path, day, sections)
+        render_blank(new_path, day, sections, template)
+        same = dump(old_path) == dump(new_path)
+        print(f"template: {rows} заявок на бланк, 30 бланков; совпадает с прежним: {'да' if same else 'НЕТ'}")
+        t0 = time.perf_counter()
+        for _ in range(30):
+            _old_daily_blank(old_path, day, sections)
+        t1 = time.perf_counter()
+        _report("до (книга с нуля)", 30 * rows, t1 - t0)
+        t0 = time.perf_counter()
+        for _ in range(30):
+            render_blank(new_path, day, sections, template)
+        t1 = time.perf_counter()
+        _report("после (заготовка шаблона)", 30 * rows, t1 - t0)
+    return 0 if same else 1
+
+
+def _synthetic_docx(path: str, rows: int, seed: int = 1):
+    """Справочник содержаний как в DOCX_NAME: таблица «содержание (категория) | срок» на rows строк."""
+    import random
+    import zipfile
+    from xml.sax.saxutils import escape
+
+    rng = random.Random(seed)
+    categories = ("водопровод", "канализация", "колонки", "гидранты", "перекладка", "врезки")
+    cell = '<w:tc><w:p><w:r><w:t>{}</w:t></w:r></w:p></w:tc>'
+    body = []
+    for i in range(rows):
+        content = f"{rng.choice(_BLANK_CORPUS) or 'прочее'} {i}"
+        body.append("<w:tr>" + cell.format(escape(f"{content} ({rng.choice(categories)})"))
+                    + cell.format(escape(f"(срок выполнения {rng.choice((2, 4, 24, 72))} ч)")) + "</w:tr>")
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                '<w:body><w:tbl>' + "".join(body) + '</w:tbl></w:body></w:document>')
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("word/document.xml", document)
+
+
+def bench_catalog(rows: int):
+    """Справочник содержаний при входе в приложение: разбор docx на rows строк и чтение
+    разобранного из кэша (catalog.load_catalog)."""
+    import os
+    import tempfile
+
+    from catalog import DOCX_NAME, load_catalog, load_problem_categories_from_docx
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _synthetic_docx(os.path.join(tmp, DOCX_NAME), rows)
+        print(f"catalog: {rows:,} строк в таблице docx")
+        t0 = time.perf_counter(); parsed = load_problem_categories_from_docx(os.path.join(tmp, DOCX_NAME))
+        t1 = time.perf_counter()
+        _report("до (разбор docx)", rows, t1 - t0)
+        load_catalog(tmp)
+        t0 = time.perf_counter(); cached = load_catalog(tmp); t1 = time.perf_counter()
+        _report("после (кэш)", rows, t1 - t0)
+    if cached != parsed:
+        print("  ОШИБКА: кэш не совпадает с разбором")
+        return 1
+    return 0
+
+
+def _old_docx_rows(path):
+    """Строки таблиц прежним способом: весь document.xml в дерево, затем findall."""
+    import xml.etree.ElementTree as ET
+    import zipfile
+
+    ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+    with zipfile.ZipFile(path, 'r') as docx:
+        root = ET.fromstring(docx.read('word/document.xml'))
+    return [[' '.join(t.text for t in cell.findall('.//w:t', ns) if t.text).strip()
+             for cell in row.findall('.//w:tc', ns)]
+            for row in root.findall('.//w:tr', ns)]
+
+
+def bench_docx(rows: int):
+    """Чтение таблицы справочника docx на rows строк: дерево целиком против потокового
+    doctables.iter_docx_rows; время и пик памяти интерпретатора (tracemalloc)."""
+    import os
+    import tempfile
+    import tracemalloc
+
+    from doctables import iter_docx_rows
+
+    def measure(read):
+        # Время — без tracemalloc (он замедляет разбор в разы), память — отдельным проходом
+        t0 = time.perf_counter()
+        count = read()
+        seconds = time.perf_counter() - t0
+        tracemalloc.start()
+        read()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return count, seconds, peak / 1024 / 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "table.docx")
+        _synthetic_docx(path, rows)
+        same = _old_docx_rows(path) == list(iter_docx_rows(path))
+        print(f"docx: {rows:,} строк в таблице; строки совпадают с прежними: {'да' if same else 'НЕТ'}")
+        for name, read in (("до (дерево целиком)", lambda: len(_old_docx_rows(path))),
+                           ("после (iterparse)", lambda: sum(1 for _ in iter_docx_rows(path)))):
+            count, seconds, peak = measure(read)
+            _report(name, count, seconds)
+            print(f"  {'':<28} пик памяти {peak:9.1f} МБ")
+    return 0 if same else 1
+
+
+def bench_csv(rows: int):
+    """Выгрузка CSV/TSV(.gz) периода: строки из курсора прямо в csv.writer."""
+    import os
+    import sqlite3
+    import tempfile
+
+    from export import csv_format, write_records_csv
+
+    def open_shard(path):
+        connection = sqlite3.connect(path)
+        connection.execute("ATTACH DATABASE ? AS common", (os.path.join(os.path.dirname(path), "app.db"),))
+        return connection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"csv: {rows:,} строк, 12 баз")
+        files = _synthetic_period(tmp, rows)
+        base = _peak_rss_mb()
+        for name in ("dump.csv", "dump.tsv.gz"):
+            out_path = os.path.join(tmp, name)
+            delimiter, compress = csv_format(out_path)
+            t0 = time.perf_counter()
+            n = write_records_csv(out_path, files, open_shard, delimiter=delimiter, compress=compress)
+            t1 = time.perf_counter()
+            _report(f"{name} ({os.path.getsize(out_path) / 1024 / 1024:.0f} МБ)", n, t1 - t0)
+            if n != rows:
+                print("  ВНИМАНИЕ: число строк не совпадает")
+                return 1
+        print(f"  прирост пикового RSS: {_peak_rss_mb() - base:.1f} МБ")
+    return 0
+
+
+# Модули, которые main.py импортирует при запуске (сам main.py открывает окно входа)
+_STARTUP_IMPORTS = ("sqlite3", "tkinter", "tkinter.ttk", "tkcalendar", "formatting", "recent", "changes",
+                    "scheduler", "query", "loader", "stalls", "store", "export", "jobs")
+
+_STARTUP_PROBE = """
+import importlib, sys, time
+t0 = time.perf_counter()
+for name in sys.argv[1:]:
+    importlib.import_module(name)
+t1 = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:
+    rss = float("nan")
+print(t1 - t0, rss)
+"""
+
+
+def bench_startup(rows: int):
+    """Импорты запуска приложения в чистом интерпретаторе: время и пиковый RSS, с pandas и без.
+
+    rows — число запусков каждого варианта (берётся лучший). Собранный Disp.exe
+    платит те же импорты при старте, только из архива PyInstaller.
+    """
+    import importlib.util
+    import os
+    import subprocess
+
+    runs = max(1, min(rows, 20))
+    here = os.path.dirname(os.path.abspath(__file__))
+    variants = [("без pandas (сейчас)", _STARTUP_IMPORTS)]
+    if importlib.util.find_spec("pandas") is not None:
+        variants.append(("с pandas (как раньше)", _STARTUP_IMPORTS + ("pandas",)))
+    else:
+        print("  pandas не установлен — прежний вариант не измерить")
+    print(f"startup: лучший из {runs} запусков")
+    for name, modules in variants:
+        best = None
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-c", _STARTUP_PROBE, *modules], cwd=here,
+                                 capture_output=True, text=True, check=True).stdout.split()
+            seconds, rss = float(out[0]), float(out[1])
+            if best is None or seconds < best[0]:
+                best = (seconds, rss)
+        print(f"  {name:<28} {best[0] * 1000:9.1f} мс   RSS {best[1]:7.1f} МБ")
+    return 0
+
+
+SCENARIOS = {
+    "formatting": bench_formatting,
+    "export": bench_export,
+    "autosize": bench_autosize,
+    "report": bench_report,
+    "summary": bench_summary,
+    "blank": bench_blank,
+    "blanks": bench_blanks,
+    "problems": bench_problems,
+    "template": bench_template,
+    "catalog": bench_catalog,
+    "docx": bench_docx,
+    "csv": bench_csv,
+    "startup": bench_startup,
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки Disp")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    return SCENARIOS[args.scenario](args.rows) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Раздел бланка сведений для заявки.
+
+Раздел (ПЕРЕКЛАДКА, ВОДОПРОВОД, ...) определяется по тексту проблемы: сначала
+по категории в скобках, затем по таблице содержаний из docx, затем по ключевым
+словам. Скобки и ключевые слова разбирает problems.parse_problem (один раз на
+формулировку), BlankClassifier добавляет к ним таблицу содержаний. Раздел
+вычисляется при сохранении заявки и хранится в колонке records.blank_category;
+для заявок, сохранённых до её появления или до новой версии справочника,
+колонку заполняет backfill_blank_categories.
+
+Здесь же собирается сам бланк: blank_lines раскладывает заявки дня по
+разделам, write_daily_blank пишет книгу по шаблону (blank_template). Бланки за месяц write_blank_files
+пишет в рабочих процессах — по книге на день: сборка книги openpyxl занимает
+процессор, и потоки её не ускоряют. Модуль не зависит от tkinter.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from formatting import format_timestamp
+from problems import GIDRANTY, KANALIZACIYA, KOLONKI, PEREKLADKA, VODOPROVOD, VREZKI, parse_problem
+
+# Разделы в порядке вывода в бланке
+SECTIONS = (PEREKLADKA, VODOPROVOD, KOLONKI, GIDRANTY, VREZKI, KANALIZACIYA)
+
+# Категория из docx или из скобок -> раздел бланка (первое вхождение ключа)
+CATEGORY_SECTIONS = {
+    "канализация": KANALIZACIYA,
+    "водопровод": VODOPROVOD,
+    "водоотведение": KANALIZACIYA,
+    "водоснабжение": VODOPROVOD,
+    "перекладка": PEREKLADKA,
+    "в/колонки": KOLONKI,
+    "колонки": KOLONKI,
+    "пожарные гидранты": GIDRANTY,
+    "гидранты": GIDRANTY,
+    "частные врезки": VREZKI,
+    "врезки": VREZKI,
+}
+
+# Не больше рабочих процессов для бланков за месяц
+MAX_WORKERS = 4
+
+logger = logging.getLogger("disp.blank")
+
+
+def section_for_category(category: str, sections=None) -> str:
+    """Раздел бланка для категории из docx (по умолчанию — ВОДОПРОВОД).
+    sections — таблица категория -> раздел из справочника (иначе CATEGORY_SECTIONS)."""
+    sections = CATEGORY_SECTIONS if sections is None else sections
+    section = sections.get(category, VODOPROVOD)
+    lowered = category.lower()
+    for key, value in sections.items():
+        if key in lowered:
+            return value
+    return section
+
+
+class BlankClassifier:
+    """Раздел бланка по тексту проблемы.
+
+    mapping — {очищенное содержание в нижнем регистре: раздел} из таблицы docx.
+    Разбор текста и правила по скобкам и ключевым словам запоминаются по тексту
+    в problems.parse_problem; здесь к ним добавляется только таблица содержаний.
+    """
+
+    def __init__(self, mapping=None):
+        self.mapping = dict(mapping or {})
+
+    def __call__(self, problem_text) -> str:
+        parsed = parse_problem(problem_text or "")
+        # Категория в скобках важнее таблицы содержаний, таблица — важнее ключевых слов
+        if parsed.by_bracket:
+            return parsed.blank_section
+        return self.mapping.get(parsed.key) or parsed.blank_section
+
+
+def _backfill_shard(connection, classify, refbook_version: int) -> int:
+    connection.execute("""CREATE TABLE IF NOT EXISTS main.blank_category_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        refbook INTEGER NOT NULL,
+        done_at TEXT
+    )""")
+    if connection.in_transaction:
+        connection.commit()
+    # Под блокировкой записи: базу мог уже обработать другой компьютер
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        state = connection.execute("SELECT refbook FROM main.blank_category_state WHERE id = 1").fetchone()
+        if state is not None and state[0] >= refbook_version:
+            connection.rollback()
+            return 0
+        changed = []
+        for rec_id, problem, stored in connection.execute("SELECT id, problem, blank_category FROM main.records"):
+            section = classify(problem)
+            if section != stored:
+                changed.append((section, rec_id))
+        connection.executemany("UPDATE main.records SET blank_category = ? WHERE id = ?", changed)
+        connection.execute("INSERT OR REPLACE INTO main.blank_category_state (id, refbook, done_at) VALUES "
+                           "(1, ?, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))", (refbook_version,))
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return len(changed)
+
+
+def backfill_blank_categories(db_files, open_shard, classify, refbook_version: int, workers: int = 4) -> int:
+    """Пересчитывает records.blank_category по справочнику версии refbook_version, параллельно по базам.
+
+    Каждая база обрабатывается один раз на версию справочника: отметка хранится в
+    её таблице blank_category_state, и базы, уже пересчитанные этой или более
+    новой версией (в том числе с другого компьютера), не читаются. Записываются
+    только изменившиеся разделы; в журнал изменений они не попадают (см.
+    changes._LOGGED_COLUMNS). refbook_version=0 — справочник не из общей базы,
+    пересчёт не выполняется.
+
+    open_shard(db_file) -> sqlite3.Connection; вызывается в рабочих потоках.
+    Ошибки отдельных баз пишутся в журнал «disp.blank» и не прерывают остальные.
+    Возвращает число обновлённых заявок.
+    """
+    if not refbook_version:
+        return 0
+
+    def fill(db_file):
+        try:
+            connection = open_shard(db_file)
+        except Exception as e:
+            logger.warning("Не удалось открыть %s для заполнения разделов бланка: %s", db_file, e)
+            return 0
+        try:
+            return _backfill_shard(connection, classify, refbook_version)
+        except Exception as e:
+            logger.warning("Ошибка заполнения разделов бланка в %s: %s", db_file, e)
+            return 0
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blank-backfill") as pool:
+        return sum(pool.map(fill, list(db_files)))
+
+
+def blank_lines(rows, classify):
+    """Заявки дня по разделам бланка: {раздел: [(текст слева, дата и состояние справа)]}.
+
+    rows — (problem, address, phone, name, surname, brigade_number, created, status,
+    category, blank_category); раздел берётся из blank_category, а если он пуст —
+    вычисляется classify(problem).
+    """
+    sections = {name: [] for name in SECTIONS}
+    for (problem, address, phone, name_, surname_, brigade_number, dt_str, status_full, category,
+         blank_category) in rows:
+        who = " ".join([p for p in [name_ or "", surname_ or ""] if p]).strip()
+        # В бланке время и дата выводятся только для записей с полной отметкой времени
+        ts = format_timestamp(dt_str)
+        time_part = ts.time
+        date_part = ts.date_short if ts.time else ""
+        line_parts = []
+        if time_part:
+            line_parts.append(time_part)
+        if category:
+            line_parts.append(f"Категория: {category}")
+        if address:
+            line_parts.append(str(address))
+        if problem:
+            line_parts.append(str(problem))
+        if phone:
+            line_parts.append(f"тел: {phone}")
+        if who:
+            line_parts.append(who)
+        if brigade_number:
+            # Номер бригады без суффикса .бр
+            brigade_display = str(brigade_number).replace(".бр", "").strip()
+            if brigade_display:
+                line_parts.append(f"бригада: {brigade_display}")
+        # Справа: дата/время и состояние
+        right_text = (date_part + (" " + time_part if time_part else "")).strip()
+        if status_full:
+            right_text = (right_text + (" — " if right_text else "") + status_full).strip()
+        # Раздел не из SECTIONS (старое значение в базе, раздел из справочника) — в ВОДОПРОВОД
+        section = blank_category or classify(problem)
+        sections.get(section, sections[VODOPROVOD]).append((" — ".join(line_parts), right_text))
+    return sections
+
+
+def write_daily_blank(path, day, sections, template=None) -> int:
+    """Пишет бланк сведений за сутки day (date) с разделами sections (см. blank_lines)
+    по шаблону template (путь xlsx, None — стандартный, см. blank_template).
+    Возвращает число заявок в бланке."""
+    from blank_template import render_blank
+
+    return render_blank(path, day, sections, template)
+
+
+def partition_by_day(rows):
+    """{YYYY-MM-DD: [строка без первого поля]} за один проход; первое поле строки — день."""
+    days = {}
+    for row in rows:
+        days.setdefault(row[0], []).append(row[1:])
+    return days
+
+
+def _write_blank_file(task, template=None):
+    """Задание рабочего процесса: (path, day, sections) -> (path, заявок, секунд)."""
+    path, day, sections = task
+    started = time.perf_counter()
+    count = write_daily_blank(path, day, sections, template)
+    return path, count, time.perf_counter() - started
+
+
+def write_blank_files(tasks, workers: int | None = None, on_done=None, template=None):
+    """Пишет бланки tasks = [(path, day, sections)] по шаблону template в рабочих процессах.
+
+    on_done(path, count, seconds) вызывается в этом потоке после каждого файла;
+    исключение из него (например, отмена задания) прерывает выгрузку — файлы,
+    которые ещё не начаты, не пишутся. Возвращает [(path, count, seconds)]
+    в порядке завершения.
+    """
+    tasks = list(tasks)
+    if workers is None:
+        workers = min(len(tasks), os.cpu_count() or 1, MAX_WORKERS)
+    results = []
+    if workers <= 1:
+        for task in tasks:
+            results.append(_write_blank_file(task, template))
+            if on_done is not None:
+                on_done(*results[-1])
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_blank_file, task, template) for task in tasks]
+        try:
+            for future in as_completed(futures):
+                results.append(future.result())
+                if on_done is not None:
+                    on_done(*results[-1])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
@@ -0,0 +1,268 @@
+"""Шаблон бланка сведений.
+
+Постоянная часть бланка — заголовок, ширины колонок, рамки разделов,
+подписи «Составил/Утвердил» — не собирается заново для каждого отчёта, а
+берётся из шаблона: книги xlsx, в первом листе которой размечены
+
+    {date}     — дата бланка (в любой ячейке вне области данных, можно внутри текста);
+    {section}  — строка-образец заголовка раздела;
+    {line}     — строка-образец заявки (текст слева), {status} — дата и состояние в той же строке.
+
+Строки-образцы задают оформление и объединения ячеек строк данных; всё, что
+ниже них (подписи), переносится под последний раздел с тем же отступом.
+Стандартный шаблон строит build_default_template; ensure_default_template
+сохраняет его в каталог приложения и пересобирает при смене LAYOUT_VERSION.
+Администратор может указать свой шаблон xlsx с той же разметкой.
+
+Шаблон разбирается один раз на процесс: из книги вырезается область данных,
+заготовка хранится в памяти как xlsx, и каждый бланк открывается из неё —
+без поиска разметки и пересборки подвала. Перед заполнением проверяется, не
+изменился ли файл шаблона.
+"""
+
+import io
+import os
+from copy import copy
+
+# Увеличить при изменении стандартного шаблона (build_default_template)
+LAYOUT_VERSION = 1
+
+DATE_MARK = "{date}"
+SECTION_MARK = "{section}"
+LINE_MARK = "{line}"
+STATUS_MARK = "{status}"
+
+# Пустых строк между разделами
+SECTION_GAP = 1
+
+_cache = {}   # путь шаблона (None — стандартный в памяти) -> (mtime, _Skeleton)
+
+
+class TemplateError(ValueError):
+    """Шаблон бланка не размечен или не читается; текст — для пользователя."""
+
+
+def build_default_template(target) -> None:
+    """Строит стандартный шаблон бланка в target (путь или файловый объект)."""
+    from openpyxl import Workbook
+
+    from report_styles import BLANK_LINE_ROW, BLANK_SECTION_ROW, register, style_row
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Бланк"
+    register(wb)
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
+    ws.cell(row=1, column=1, value=f"БЛАНК - СВЕДЕНИЙ  {DATE_MARK}").style = "disp_title"
+    # Образец раздела
+    ws.merge_cells(start_row=3, start_column=1, end_row=3, end_column=6)
+    ws.cell(row=3, column=1, value=SECTION_MARK)
+    style_row(ws, 3, BLANK_SECTION_ROW)
+    # Образец заявки: слева объединены A..E, справа дата и состояние в F
+    ws.merge_cells(start_row=4, start_column=1, end_row=4, end_column=5)
+    ws.cell(row=4, column=1, value=LINE_MARK)
+    ws.cell(row=4, column=6, value=STATUS_MARK)
+    style_row(ws, 4, BLANK_LINE_ROW)
+    # Подписи — через строку после последней заявки
+    for row, text in ((6, "Составил: __________________"), (7, "Утвердил: __________________")):
+        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
+        ws.cell(row=row, column=1, value=text)
+    ws.column_dimensions['A'].width = 16
+    for col in ['B', 'C', 'D', 'E']:
+        ws.column_dimensions[col].width = 24
+    ws.column_dimensions['F'].width = 44
+    wb.save(target)
+
+
+def ensure_default_template(directory) -> str | None:
+    """Путь стандартного шаблона в directory; строит его, если файла нет (удаляя шаблоны
+    прежних версий). None — каталог недоступен для записи: шаблон будет строиться в памяти."""
+    path = os.path.join(str(directory), f"blank_template_v{LAYOUT_VERSION}.xlsx")
+    if os.path.exists(path):
+        return path
+    try:
+        for name in os.listdir(str(directory)):
+            if name.startswith("blank_template_v") and name.endswith(".xlsx"):
+                os.remove(os.path.join(str(directory), name))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            build_default_template(f)
+        os.replace(tmp, path)
+    except OSError:
+        return None
+    return path
+
+
+def _template_bytes(template) -> bytes:
+    if template is None:
+        buffer = io.BytesIO()
+        build_default_template(buffer)
+        return buffer.getvalue()
+    with open(template, "rb") as f:
+        return f.read()
+
+
+def _find_marks(ws):
+    """{метка: (строка, колонка)} для SECTION_MARK, LINE_MARK и STATUS_MARK."""
+    marks = {}
+    for row in ws.iter_rows():
+        for cell in row:
+            if cell.value in (SECTION_MARK, LINE_MARK, STATUS_MARK):
+                marks[cell.value] = (cell.row, cell.column)
+    if SECTION_MARK not in marks or LINE_MARK not in marks:
+        raise TemplateError(f"В шаблоне бланка нет строк-образцов {SECTION_MARK} и {LINE_MARK}")
+    if marks.get(STATUS_MARK, (None,))[0] != marks[LINE_MARK][0]:
+        raise TemplateError(f"В шаблоне бланка нет ячейки {STATUS_MARK} в строке {LINE_MARK}")
+    return marks
+
+
+def _format(cell):
+    return (copy(cell.font), copy(cell.border), copy(cell.fill), cell.number_format,
+            copy(cell.protection), copy(cell.alignment))
+
+
+def _cell_style(cell):
+    """Оформление ячейки: (именованный стиль, собственное оформление или None).
+
+    Собственное оформление (копии общедоступных атрибутов openpyxl) запоминается,
+    только если ячейка отличается от своего именованного стиля: назначить стиль по
+    имени намного быстрее. Строки-образцы после снимка удаляются, поэтому ячейку
+    можно сбросить к её стилю для сравнения.
+    """
+    own = _format(cell)
+    name = cell.style
+    cell.style = name
+    return name, (None if _format(cell) == own else own)
+
+
+def _snapshot(ws, row, max_col):
+    """Оформление, значения и объединения строки row: (cells, merges, height).
+    Пустые ячейки без оформления не запоминаются, как и ячейки внутри объединений:
+    их рамки строит merge_cells."""
+    from openpyxl.cell.cell import MergedCell
+
+    cells = []
+    for c in range(1, max_col + 1):
+        cell = ws.cell(row=row, column=c)
+        if isinstance(cell, MergedCell):
+            continue
+        if cell.value is not None or cell.has_style:
+            cells.append((c, cell.value, _cell_style(cell)))
+    merges = [(rng.min_col, rng.max_col) for rng in ws.merged_cells.ranges
+              if rng.min_row == row and rng.max_row == row]
+    return cells, merges, ws.row_dimensions[row].height
+
+
+def _put(ws, row, snapshot, values=None):
+    cells, merges, height = snapshot
+    # Сначала объединения: на пустых ячейках merge_cells не пересобирает рамки
+    for min_col, max_col in merges:
+        ws.merge_cells(start_row=row, start_column=min_col, end_row=row, end_column=max_col)
+    for c, value, style in cells:
+        cell = ws.cell(row=row, column=c)
+        name, own = style
+        cell.style = name
+        if own is not None:
+            cell.font, cell.border, cell.fill, cell.number_format, cell.protection, cell.alignment = own
+        value = values.get(c, value) if values is not None else value
+        if value is not None:
+            cell.value = value
+    if height is not None:
+        ws.row_dimensions[row].height = height
+
+
+class _Skeleton:
+    """Разобранный шаблон: книга без области данных и строки-образцы."""
+
+    def __init__(self, data: bytes):
+        from openpyxl import load_workbook
+
+        try:
+            wb = load_workbook(io.BytesIO(data))
+        except Exception as e:
+            raise TemplateError(f"Шаблон бланка не открывается как книга Excel: {e}") from e
+        ws = wb.worksheets[0]
+        marks = _find_marks(ws)
+        section_row, self.section_col = marks[SECTION_MARK]
+        line_row, self.line_col = marks[LINE_MARK]
+        self.status_col = marks[STATUS_MARK][1]
+        self.first = min(section_row, line_row)
+        last = max(section_row, line_row)
+        max_col = ws.max_column
+        self.section = _snapshot(ws, section_row, max_col)
+        self.line = _snapshot(ws, line_row, max_col)
+        # Подписи и прочее под образцами переносятся вслед за данными
+        self.footer = [(row - last, _snapshot(ws, row, max_col)) for row in range(last + 1, ws.max_row + 1)]
+        # Объединения подвала на несколько строк (однострочные — в снимках строк)
+        self.footer_merges = [(rng.min_row - last, rng.min_col, rng.max_row - last, rng.max_col)
+                              for rng in ws.merged_cells.ranges
+                              if rng.min_row > last and rng.max_row > rng.min_row]
+
+        for rng in list(ws.merged_cells.ranges):
+            if rng.max_row >= self.first:
+                ws.merged_cells.remove(rng)
+        ws.delete_rows(self.first, ws.max_row - self.first + 1)
+        for row in [row for row in ws.row_dimensions if row >= self.first]:
+            del ws.row_dimensions[row]
+        self.dated = [(cell.row, cell.column, cell.value) for row in ws.iter_rows() for cell in row
+                      if isinstance(cell.value, str) and DATE_MARK in cell.value]
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        self.data = buffer.getvalue()
+
+    def new_workbook(self):
+        """Новая книга-заготовка для бланка."""
+        from openpyxl import load_workbook
+
+        return load_workbook(io.BytesIO(self.data))
+
+
+def _skeleton(template) -> _Skeleton:
+    """Заготовка шаблона template; с диска читается заново, только если файл изменился."""
+    try:
+        mtime = os.stat(template).st_mtime_ns if template is not None else 0
+        cached = _cache.get(template)
+        if cached is None or cached[0] != mtime:
+            cached = _cache[template] = (mtime, _Skeleton(_template_bytes(template)))
+    except OSError as e:
+        raise TemplateError(f"Не удалось прочитать шаблон бланка {template}: {e}") from e
+    return cached[1]
+
+
+def check_template(template) -> None:
+    """Проверяет, что шаблон читается и размечен; иначе TemplateError."""
+    _skeleton(template)
+
+
+def render_blank(path, day, sections, template=None) -> int:
+    """Пишет бланк сведений за сутки day по шаблону template (None — стандартный).
+
+    sections — {раздел: [(текст слева, дата и состояние справа)]} (см. blank.blank_lines).
+    Возвращает число заявок в бланке.
+    """
+    skeleton = _skeleton(template)
+    wb = skeleton.new_workbook()
+    ws = wb.worksheets[0]
+    stamp = day.strftime('%d.%m.%y')
+    for row, column, text in skeleton.dated:
+        ws.cell(row=row, column=column).value = text.replace(DATE_MARK, stamp)
+
+    row_idx = skeleton.first
+    last_line = row_idx
+    for section_name, lines in sections.items():
+        _put(ws, row_idx, skeleton.section, {skeleton.section_col: section_name})
+        row_idx += 1
+        # Пустой раздел — одна пустая строка в рамке
+        for left_text, right_text in lines or [("", "")]:
+            _put(ws, row_idx, skeleton.line, {skeleton.line_col: left_text, skeleton.status_col: right_text})
+            last_line = row_idx
+            row_idx += 1
+        row_idx += SECTION_GAP
+    for min_offset, min_col, max_offset, max_col in skeleton.footer_merges:
+        ws.merge_cells(start_row=last_line + min_offset, start_column=min_col,
+                       end_row=last_line + max_offset, end_column=max_col)
+    for offset, snapshot in skeleton.footer:
+        _put(ws, last_line + offset, snapshot)
+
+    wb.save(path)
+    return sum(len(lines) for lines in sections.values())
@@ -0,0 +1,237 @@
+"""Справочник содержаний заявок: виды работ по группам и разделы бланка сведений.
+
+Справочник ведётся в Word-документе DOCX_NAME в папке приложения (таблица
+«содержание (категория)»); без документа используются значения по умолчанию.
+Разбор документа сохраняется в CACHE_NAME рядом с ним (load_catalog): при
+следующем запуске или входе документ заново разбирается, только если
+изменился — по пути, размеру и времени изменения, а при их расхождении по
+SHA-256 содержимого. Там же ведётся учёт: время последнего разбора, число
+разборов и попаданий в кэш. Модуль не зависит от tkinter.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from blank import BlankClassifier, section_for_category
+from doctables import iter_docx_rows
+
+DOCX_NAME = "Таблица содержание 28.11.2025 ( исправление).docx"
+CACHE_NAME = ".catalog_cache.json"
+
+# Увеличить при изменении разбора load_problem_categories_from_docx
+PARSER_VERSION = 3
+
+
+def row_entry(cell_texts):
+    """(содержание, категория) строки таблицы справочника; None — строка без содержания.
+
+    Категория — из скобок в конце первой ячейки, иначе вторая ячейка, иначе
+    последние скобки любой ячейки (кроме сроков выполнения).
+    """
+    if not any(cell_texts):
+        return None
+
+    content = ""
+    category = ""
+
+    if cell_texts[0]:
+        match = re.search(r'^(.+?)\s*\(([^)]+)\)\s*$', cell_texts[0])
+        if match:
+            content = match.group(1).strip()
+            category = match.group(2).strip()
+        else:
+            content = cell_texts[0]
+            if len(cell_texts) > 1:
+                category = cell_texts[1].strip()
+
+    for cell_text in cell_texts:
+        matches = re.findall(r'\(([^)]+)\)', cell_text)
+        if matches:
+            cat = matches[-1].strip()
+            if "срок" not in cat.lower() and "выполнен" not in cat.lower():
+                if not category:
+                    category = cat
+                clean = re.sub(r'\s*\([^)]+\)\s*$', '', cell_text).strip()
+                if clean and not content:
+                    content = clean
+
+    return (content, category) if content else None
+
+
+def iter_docx_entries(doc_path):
+    """(содержание, категория) по строкам таблиц документа — потоково, см. doctables.py."""
+    for cells in iter_docx_rows(doc_path):
+        entry = row_entry(cells)
+        if entry:
+            yield entry
+
+
+def load_problem_categories_from_docx(doc_path):
+    """Загружает problem_categories и problem_to_blank_category из Word документа doc_path.
+    problem_to_blank_category — {содержание в нижнем регистре: категория из документа}."""
+
+    # Значения по умолчанию
+    default_categories = {
+        "водоотведение": [
+            "забой канализационного колодца",
+            "течь канализации по дороге",
+        ],
+        "водоснабжение": [
+            "течь воды",
+            "течь в / колонки",
+            "течь из-под земли",
+            "течь пожарного гидранта",
+            "течь из -под асфальта",
+            "течь трассы холодной воды",
+            "откачка воды из колодца",
+            "дефект водоразборной колонки",
+            "ржавая холодная вода в жилом фонде",
+            "Не работает в / колонка",
+            "слабое давление х/в",
+            "восстановить в/колонку",
+            "течь в/к",
+            "нет х/в"
+        ],
+        "общие": [
+            "перекладка",
+            "водопровод",
+            "частные врезки",
+            "открыт колодец (отсутствие/несоответствие крышки)",
+            "восстановление асфальтобетонного покрытия",
+            "разрушена плита колодца",
+            "привести к/к в нормативное состояние",
+            "привести в / к в нормативное состояние",
+            "обвал в/к",
+            "обвал к/к",
+        ]
+    }
+
+    default_mapping = {
+        "течь канализации по дороге": "канализация",
+    }
+
+    # Пытаемся загрузить из Word документа
+    if os.path.exists(doc_path):
+        try:
+            content_to_category = {}
+            all_contents = []
+
+            for content, category in iter_docx_entries(doc_path):
+                all_contents.append(content)
+                if category:
+                    content_to_category[content.lower()] = category.lower()
+
+            # Обновляем маппинг: категории из документа как есть — в разделы бланка их
+            # переводит make_blank_classifier по таблице разделов справочника
+            if content_to_category:
+                default_mapping.update(content_to_category)
+
+                # Обновляем problem_categories, группируя по категориям
+                # Создаем временные списки
+                vodootvedenie = []
+                vodsnabshenie = []
+                obshie = []
+
+                for content in set(all_contents):
+                    content_lower = content.lower()
+                    cat = content_to_category.get(content_lower, "")
+
+                    # Определяем в какую категорию поместить
+                    if "канализац" in cat or "водоотвед" in cat:
+                        vodootvedenie.append(content)
+                    elif "водопровод" in cat or "водоснабж" in cat or "вод" in cat:
+                        vodsnabshenie.append(content)
+                    else:
+                        obshie.append(content)
+
+                # Обновляем только если нашли данные
+                if vodootvedenie or vodsnabshenie or obshie:
+                    default_categories["водоотведение"] = sorted(set(vodootvedenie + default_categories["водоотведение"]), key=lambda s: s.lower())
+                    default_categories["водоснабжение"] = sorted(set(vodsnabshenie + default_categories["водоснабжение"]), key=lambda s: s.lower())
+                    default_categories["общие"] = sorted(set(obshie + default_categories["общие"]), key=lambda s: s.lower())
+
+        except Exception as e:
+            # Если ошибка при чтении, используем значения по умолчанию
+            pass
+
+    return default_categories, default_mapping
+
+
+def make_blank_classifier(problem_to_blank_category_raw, sections=None) -> BlankClassifier:
+    """Раздел бланка сведений по тексту проблемы для сопоставления содержаний из справочника.
+    sections — таблица категория -> раздел (см. refbook.py; по умолчанию blank.CATEGORY_SECTIONS)."""
+    # Преобразуем problem_to_blank_category_raw в разделы бланка
+    return BlankClassifier({content: section_for_category(cat, sections)
+                            for content, cat in problem_to_blank_category_raw.items()})
+
+
+def _sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_cache(cache_path) -> dict:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(cache_path, cache) -> None:
+    """Пишет кэш через временный файл; папка только для чтения — без кэша."""
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+
+
+def load_catalog(directory):
+    """(problem_categories, problem_to_blank_category) справочника из DOCX_NAME в directory.
+    Документ разбирается, только если изменился с прошлого разбора (см. CACHE_NAME)."""
+    doc_path = os.path.join(str(directory), DOCX_NAME)
+    cache_path = os.path.join(str(directory), CACHE_NAME)
+    try:
+        st = os.stat(doc_path)
+    except OSError:
+        # Документа нет — значения по умолчанию, разбирать нечего
+        return load_problem_categories_from_docx(doc_path)
+
+    cache = _read_cache(cache_path)
+    stats = cache.get("stats") or {"parses": 0, "hits": 0, "parse_ms": None}
+    key = {"parser": PARSER_VERSION, "path": os.path.abspath(doc_path), "size": st.st_size, "mtime": st.st_mtime_ns}
+    digest = None
+    hit = "categories" in cache and "mapping" in cache and all(cache.get(k) == v for k, v in key.items())
+    if not hit and "categories" in cache and cache.get("parser") == PARSER_VERSION:
+        # Файл скопирован или сохранён без изменений: время другое, содержимое то же
+        try:
+            digest = _sha256(doc_path)
+        except OSError:
+            digest = None
+        hit = digest is not None and digest == cache.get("sha256")
+
+    if hit:
+        stats["hits"] += 1
+        categories, mapping = cache["categories"], cache["mapping"]
+    else:
+        started = time.perf_counter()
+        categories, mapping = load_problem_categories_from_docx(doc_path)
+        stats["parse_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        stats["parses"] += 1
+        try:
+            digest = digest or _sha256(doc_path)
+        except OSError:
+            digest = None
+    _write_cache(cache_path, dict(key, sha256=digest or cache.get("sha256"), stats=stats,
+                                  categories=categories, mapping=mapping))
+    return categories, mapping
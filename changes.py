@@ -0,0 +1,242 @@
+"""Отслеживание изменений заявок в помесячных базах.
+
+В каждой базе триггеры на records пишут журнал change_log (op, id, version, ts).
+ChangeWatcher держит по отдельному подключению на наблюдаемую базу и на каждом
+опросе выполняет только PRAGMA data_version: значение меняется, лишь когда другое
+подключение (другое рабочее место или само приложение) зафиксировало запись.
+Журнал читается только после такого сигнала и только с последнего seq, поэтому
+подписчики получают точный список изменений, а не «что-то поменялось».
+Интервал опроса растёт в простое и сбрасывается к минимальному после активности;
+раз в TRIM_INTERVAL_S секунд журнал каждой наблюдаемой базы подрезается.
+"""
+
+import os
+import sqlite3
+import time
+from typing import NamedTuple
+
+# Сколько записей журнала хранить в каждой базе
+CHANGE_LOG_KEEP = 10000
+
+
+class Change(NamedTuple):
+    path: str      # нормализованный путь базы (см. shard_key)
+    seq: int
+    op: str        # "I" — добавление, "U" — изменение, "D" — удаление, "R" — перечитать базу целиком
+    shard: str     # имя файла наблюдаемой базы, например app_2025_11.db
+    rec_id: int
+    version: int
+    ts: str
+
+
+def shard_key(path) -> str:
+    """Ключ базы для сравнения путей (регистр и относительные пути на Windows)."""
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+# Отметка текущего варианта триггеров журнала: триггеры без неё пересоздаются
+_LOG_MARK = "-- журнал изменений v3"
+
+# Колонки, изменение которых попадает в журнал. Служебные колонки (version,
+# blank_category — её заполняет blank.backfill_blank_categories) в журнал не
+# пишутся: иначе заполнение разделов заставило бы все рабочие места перечитать базу.
+_LOGGED_COLUMNS = ("name", "surname", "description", "date", "user_id", "assignment_date", "status", "problem",
+                   "phone", "address", "created_at", "improvement", "brigade_number", "category")
+
+# Имя базы в журнал не пишется (колонка shard остаётся для совместимости и
+# заполняется пустой строкой): у скопированной или переименованной базы оно было
+# бы неверным. Имя файла подставляет ChangeWatcher по пути наблюдаемой базы.
+_LOG_TRIGGERS = {
+    "records_log_insert": f"""CREATE TRIGGER main.records_log_insert
+        AFTER INSERT ON records
+        {_LOG_MARK}
+        BEGIN
+            INSERT INTO change_log (op, shard, rec_id, version)
+            VALUES ('I', '', NEW.id, COALESCE(NEW.version, 0));
+        END""",
+    "records_log_update": f"""CREATE TRIGGER main.records_log_update
+        AFTER UPDATE OF {", ".join(_LOGGED_COLUMNS)} ON records
+        WHEN NEW.version IS OLD.version
+        {_LOG_MARK}
+        BEGIN
+            UPDATE records SET version = COALESCE(OLD.version, 0) + 1 WHERE id = NEW.id;
+            INSERT INTO change_log (op, shard, rec_id, version)
+            VALUES ('U', '', NEW.id, COALESCE(OLD.version, 0) + 1);
+        END""",
+    "records_log_delete": f"""CREATE TRIGGER main.records_log_delete
+        AFTER DELETE ON records
+        {_LOG_MARK}
+        BEGIN
+            INSERT INTO change_log (op, shard, rec_id, version)
+            VALUES ('D', '', OLD.id, COALESCE(OLD.version, 0));
+        END""",
+}
+
+
+def install_change_log(connection) -> None:
+    """Создаёт change_log и триггеры records в базе подключения (идемпотентно).
+
+    Триггер UPDATE заодно увеличивает records.version — так версия растёт при
+    любом изменении колонок _LOGGED_COLUMNS, с какого бы рабочего места оно ни пришло.
+    """
+    columns = [row[1] for row in connection.execute("PRAGMA main.table_info(records)")]
+    if "version" not in columns:
+        connection.execute("ALTER TABLE main.records ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    existing = dict(connection.execute(
+        "SELECT name, sql FROM main.sqlite_master WHERE type IN ('table', 'trigger')"))
+    statements = []
+    if "change_log" not in existing:
+        statements.append("""CREATE TABLE IF NOT EXISTS main.change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            shard TEXT NOT NULL DEFAULT '',
+            rec_id INTEGER NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            ts TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'))
+        )""")
+    if "records_version_bump" in existing:
+        # Ранний вариант триггера только с версией — заменён records_log_update
+        statements.append("DROP TRIGGER IF EXISTS main.records_version_bump")
+    for name, sql in _LOG_TRIGGERS.items():
+        current = existing.get(name)
+        if current is not None and _LOG_MARK in current:
+            continue
+        if current is not None:
+            # Прежний вариант (например, с именем файла базы в тексте триггера)
+            statements.append(f"DROP TRIGGER IF EXISTS main.{name}")
+        statements.append(sql)
+    for sql in statements:
+        connection.execute(sql)
+    if "change_log" in existing:
+        trim_change_log(connection)
+    connection.commit()
+
+
+def trim_change_log(connection) -> None:
+    """Оставляет в change_log последние CHANGE_LOG_KEEP записей (чистит, когда их вдвое больше).
+    Коммит — за вызывающим."""
+    lo, hi = connection.execute("SELECT MIN(seq), MAX(seq) FROM main.change_log").fetchone()
+    if lo is not None and hi - lo >= CHANGE_LOG_KEEP * 2:
+        connection.execute("DELETE FROM main.change_log WHERE seq <= ?", (hi - CHANGE_LOG_KEEP,))
+
+
+class _WatchedShard:
+    __slots__ = ("path", "name", "conn", "data_version", "last_seq", "trimmed_at")
+
+    def __init__(self, file_path: str, key: str):
+        self.path = key
+        self.name = os.path.basename(file_path)
+        self.conn = sqlite3.connect(file_path)
+        install_change_log(self.conn)
+        self.trimmed_at = time.monotonic()
+        self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self.last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+
+class ChangeWatcher:
+    """Опрашивает набор баз и раздаёт подписчикам списки Change."""
+
+    MIN_INTERVAL_MS = 500
+    MAX_INTERVAL_MS = 10000
+    BACKOFF = 1.5
+    # Как часто подрезать журнал наблюдаемых баз (см. trim_change_log)
+    TRIM_INTERVAL_S = 3600
+
+    def __init__(self):
+        self._shards: dict[str, _WatchedShard] = {}
+        self._subscribers = []
+        self.interval_ms = self.MIN_INTERVAL_MS
+
+    def watch(self, paths) -> None:
+        """Задаёт набор наблюдаемых баз; лишние подключения закрываются."""
+        wanted = {}
+        for p in paths:
+            if p and os.path.exists(str(p)):
+                wanted[shard_key(p)] = str(p)
+        for key in list(self._shards):
+            if key not in wanted:
+                self._shards.pop(key).conn.close()
+        for key, path in wanted.items():
+            if key not in self._shards:
+                try:
+                    self._shards[key] = _WatchedShard(path, key)
+                except sqlite3.Error:
+                    continue
+
+    def subscribe(self, callback) -> None:
+        """callback(changes: list[Change]) вызывается после опроса, если изменения есть."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def poke(self) -> None:
+        """Сигнал активности: следующий опрос — с минимальным интервалом."""
+        self.interval_ms = self.MIN_INTERVAL_MS
+
+    def next_delay_ms(self) -> int:
+        return int(self.interval_ms)
+
+    def _read_shard(self, shard: _WatchedShard):
+        dv = shard.conn.execute("PRAGMA data_version").fetchone()[0]
+        if dv == shard.data_version:
+            return []
+        shard.data_version = dv
+        rows = shard.conn.execute(
+            "SELECT seq, op, rec_id, version, ts FROM change_log WHERE seq > ? ORDER BY seq",
+            (shard.last_seq,),
+        ).fetchall()
+        if not rows:
+            return []
+        out = []
+        if rows[0][0] > shard.last_seq + 1:
+            # Пропущенная часть журнала уже вычищена — точной дельты нет, просим перечитать базу
+            out.append(Change(shard.path, rows[0][0], "R", shard.name, 0, 0, rows[0][4]))
+        out.extend(Change(shard.path, seq, op, shard.name, rec_id, version, ts)
+                   for seq, op, rec_id, version, ts in rows)
+        shard.last_seq = rows[-1][0]
+        return out
+
+    def _trim(self, shard: _WatchedShard) -> None:
+        now = time.monotonic()
+        if now - shard.trimmed_at < self.TRIM_INTERVAL_S:
+            return
+        shard.trimmed_at = now
+        try:
+            trim_change_log(shard.conn)
+            shard.conn.commit()
+        except sqlite3.Error:
+            # База занята другим рабочим местом — подрежем в следующий раз
+            shard.conn.rollback()
+
+    def poll(self):
+        """Проверяет все базы, оповещает подписчиков и пересчитывает интервал."""
+        changes = []
+        for shard in list(self._shards.values()):
+            try:
+                changes.extend(self._read_shard(shard))
+            except sqlite3.Error:
+                continue
+            self._trim(shard)
+        if changes:
+            self.interval_ms = self.MIN_INTERVAL_MS
+            for callback in list(self._subscribers):
+                try:
+                    callback(changes)
+                except Exception:
+                    pass
+        else:
+            self.interval_ms = min(self.MAX_INTERVAL_MS, self.interval_ms * self.BACKOFF)
+        return changes
+
+    def close(self) -> None:
+        for shard in self._shards.values():
+            try:
+                shard.conn.close()
+            except Exception:
+                pass
+        self._shards.clear()
+        self._subscribers.clear()
@@ -0,0 +1,189 @@
+"""Выгрузки из командной строки — без окна, входа в приложение и tkinter.
+
+Для планировщика заданий Windows (например, ночной бланк сведений):
+
+    python cli.py blank --day yesterday -o D:\\Бланки
+    Disp.exe export summary --week today -o D:\\Отчёты
+
+Команды:
+    period    заявки за период в Excel (как «Экспорт за период» / «Текущий список»)
+    filtered  сводка по фильтрам: шапка с фильтрами и таблица
+    summary   краткий отчёт за сутки (--day) или неделю по дату включительно (--week)
+    blank     бланк сведений за сутки
+    blanks    бланки сведений за месяц, по файлу на день (каталог)
+    csv       выгрузка CSV/TSV, .gz — сжатая
+
+-o — файл или существующий каталог (тогда имя файла — как в окне приложения).
+Базы берутся из каталога настроек приложения (.db_dir), --db-dir его заменяет;
+по умолчанию читаются все помесячные базы, --db выбирает отдельные.
+Даты: ГГГГ-ММ-ДД, ДД.ММ.ГГГГ, today/yesterday (сегодня/вчера).
+
+Коды завершения: 0 — готово, 1 — ошибка, 2 — неверные параметры, 3 — нет данных.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from export import csv_format
+from formatting import month_label
+from jobs import ExportJob, ExportJobRunner, NothingToExport
+from query import RecordFilter
+from refbook import load_refbook
+from reports import (blank_file_name, build_daily_blank, build_filtered_report, build_month_blanks, build_records_csv,
+                     build_records_xlsx, build_summary_report, month_blanks_dir_name, month_days, summary_file_name,
+                     summary_period)
+from settings import app_dir, blank_template, common_db_path, load_db_base_dir
+from shards import all_databases, open_shard, query_databases
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2       # так завершается argparse при неверных параметрах
+EXIT_EMPTY = 3
+
+_RELATIVE_DAYS = {"today": 0, "сегодня": 0, "yesterday": -1, "вчера": -1}
+
+
+def parse_day(text: str) -> date:
+    """Дата из ГГГГ-ММ-ДД, ДД.ММ.ГГГГ или today/yesterday."""
+    value = text.strip().lower()
+    if value in _RELATIVE_DAYS:
+        return date.today() + timedelta(days=_RELATIVE_DAYS[value])
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"неверная дата: {text} (ГГГГ-ММ-ДД, ДД.ММ.ГГГГ, today, yesterday)")
+
+
+def _build_parser(prog=None) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog=prog, description="Выгрузки Disp без окна приложения")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-o", "--output", required=True, help="файл или существующий каталог")
+    common.add_argument("--db-dir", help="каталог помесячных баз (по умолчанию — из настроек приложения)")
+    common.add_argument("--db", action="append", default=[], metavar="ФАЙЛ",
+                        help="помесячная база (можно несколько; по умолчанию — все)")
+
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--from", dest="start", type=parse_day, help="начало периода")
+    filters.add_argument("--to", dest="end", type=parse_day, help="конец периода")
+    filters.add_argument("--keyword", help="поиск по тексту или номер заявки")
+    filters.add_argument("--problem", help="содержание заявки")
+    filters.add_argument("--status", help="состояние (без отметки времени)")
+    filters.add_argument("--operator", help="пользователь, принявший заявку")
+
+    commands = parser.add_subparsers(dest="command", required=True, metavar="команда")
+    commands.add_parser("period", parents=[common, filters], help="заявки за период в Excel")
+    commands.add_parser("filtered", parents=[common, filters], help="сводка по фильтрам")
+    commands.add_parser("csv", parents=[common, filters], help="выгрузка CSV/TSV (.gz — сжатая)")
+    summary = commands.add_parser("summary", parents=[common], help="краткий отчёт за сутки или неделю")
+    period = summary.add_mutually_exclusive_group(required=True)
+    period.add_argument("--day", type=parse_day, help="отчёт за сутки")
+    period.add_argument("--week", type=parse_day, metavar="DAY", help="отчёт за 7 дней по DAY включительно")
+    commands.add_parser("blank", parents=[common], help="бланк сведений за сутки")\
+        .add_argument("--day", type=parse_day, required=True)
+    commands.add_parser("blanks", parents=[common], help="бланки сведений за месяц (каталог)")\
+        .add_argument("--month", type=parse_day, required=True, metavar="DAY",
+                      help="любой день месяца; бланки — по сегодняшний день")
+    return parser
+
+
+def _target(output: str, default_name: str) -> str:
+    """Путь результата: в существующий каталог output — под именем по умолчанию."""
+    return os.path.join(output, default_name) if os.path.isdir(output) else output
+
+
+def _blank_classifier(base_dir):
+    """Раздел бланка для заявок без blank_category — по справочнику общей базы, как в окне приложения."""
+    return load_refbook(common_db_path(base_dir), app_dir()).classifier()
+
+
+def _plan(args, base_dir, db_files, shard):
+    """(заголовок, путь, work, notice) задания для команды args.command."""
+    query = partial(query_databases, open_shard=shard)
+    now = datetime.now()
+    if args.command in ("period", "filtered", "csv"):
+        start_sql = args.start.strftime("%Y-%m-%d") if args.start else None
+        end_sql = args.end.strftime("%Y-%m-%d") if args.end else None
+        flt = RecordFilter(args.keyword or None, args.problem or None, args.status or None,
+                           args.operator or None, start_sql, end_sql)
+        if args.command == "period":
+            name = (f"отчёт_{args.start:%d.%m.%Y}_to_{args.end:%d.%m.%Y}.xlsx" if args.start
+                    else f"отчёт_{now:%d.%m.%Y_%H-%M}.xlsx")
+            return ("Список за период", _target(args.output, name),
+                    lambda job: build_records_xlsx(job, db_files, shard, flt, "Записей по фильтрам нет"),
+                    "Файл успешно сохранён")
+        if args.command == "csv":
+            path = _target(args.output, f"заявки_{now:%d.%m.%Y_%H-%M}.csv")
+            delimiter, compress = csv_format(path)
+            return ("Выгрузка " + ("TSV" if delimiter == "\t" else "CSV"), path,
+                    lambda job: build_records_csv(job, db_files, shard, flt, delimiter, compress),
+                    "Файл успешно сохранён")
+        start_h = args.start.strftime("%d.%m.%y") if args.start else ""
+        end_h = args.end.strftime("%d.%m.%y") if args.end else ""
+        return ("Сводка по фильтрам", _target(args.output, f"сводка_по_фильтрам_{now:%d.%m.%Y_%H-%M}.xlsx"),
+                lambda job: build_filtered_report(job, query, db_files, args.keyword or "", args.problem or "",
+                                                  args.status or "", args.operator or "",
+                                                  start_sql, end_sql, start_h, end_h),
+                "Файл успешно сохранён")
+    if args.command == "summary":
+        period = "day" if args.day else "week"
+        start, end, title_period = summary_period(period, args.day or args.week)
+        return (("Отчёт за сутки " if period == "day" else "Отчёт за неделю ") + title_period,
+                _target(args.output, summary_file_name(period, start, end)),
+                lambda job: build_summary_report(job, query, db_files, start.strftime("%Y-%m-%d"),
+                                                 end.strftime("%Y-%m-%d"), title_period),
+                "Отчёт успешно сохранён")
+    if args.command == "blank":
+        day = args.day
+        return (f"Бланк сведений {day.strftime('%d.%m.%Y')}", _target(args.output, blank_file_name(day)),
+                lambda job: build_daily_blank(job, query, db_files, day, _blank_classifier(base_dir), blank_template()),
+                "Бланк сохранён")
+    days = month_days(args.month, date.today())
+    if not days:
+        raise NothingToExport("Месяц ещё не начался")
+    first = days[0]
+    # Для бланков за месяц -o — всегда родительский каталог
+    return (f"Бланки сведений за {month_label(first.year * 100 + first.month)}",
+            os.path.join(args.output, month_blanks_dir_name(first)),
+            lambda job: build_month_blanks(job, query, db_files, days, _blank_classifier(base_dir), blank_template()),
+            "Бланки сохранены")
+
+
+def main(argv=None, prog=None) -> int:
+    parser = _build_parser(prog)
+    args = parser.parse_args(argv)
+    if (getattr(args, "start", None) is None) != (getattr(args, "end", None) is None):
+        parser.error("укажите обе даты периода: --from и --to")
+    base_dir = args.db_dir or load_db_base_dir()
+    if not os.path.isdir(base_dir):
+        print(f"Каталог баз не найден: {base_dir}", file=sys.stderr)
+        return EXIT_FAILED
+    db_files = args.db or all_databases(base_dir)
+    shard = partial(open_shard, common_path=common_db_path(base_dir))
+    try:
+        title, path, work, notice = _plan(args, base_dir, db_files, shard)
+    except NothingToExport as e:
+        print(e, file=sys.stderr)
+        return EXIT_EMPTY
+
+    job = ExportJobRunner().run(title, path, work, notice=notice)
+    if job.status == ExportJob.DONE:
+        print(f"{job.notice}: {job.path} (записей: {job.done}, {job.elapsed():.1f} с)")
+        if job.details:
+            print(job.details)
+        return EXIT_OK
+    if job.status == ExportJob.EMPTY:
+        print(f"{title}: {job.message}", file=sys.stderr)
+        return EXIT_EMPTY
+    print(f"{title}: {job.status}: {job.message}", file=sys.stderr)
+    return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Потоковое чтение таблиц из документов Word (.docx) и Excel (.xlsx).
+
+Справочники (содержания заявок, улицы, бригады) приходят таблицами в Word или
+Excel. iter_table_rows отдаёт строки таблиц по одной — списком текстов ячеек —
+не загружая документ в память целиком: word/document.xml читается прямо из
+архива через iterparse, и каждый разобранный элемент сразу удаляется из
+дерева; книга Excel открывается в режиме только для чтения.
+
+Модуль не зависит от tkinter и от формата конкретного справочника: как строка
+превращается в запись, решает вызывающий (см. catalog.py).
+"""
+
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_TR = f"{{{W_NS}}}tr"
+_TC = f"{{{W_NS}}}tc"
+_T = f"{{{W_NS}}}t"
+
+
+def iter_docx_rows(path, member: str = "word/document.xml"):
+    """Строки всех таблиц документа Word: [текст ячейки, ...] в порядке документа.
+
+    Текст ячейки — фрагменты w:t через пробел, без крайних пробелов. Строки
+    вложенной таблицы отдаются отдельно, а в строке внешней таблицы ячейка с
+    вложенной таблицей учитывается со всем её текстом.
+    """
+    with zipfile.ZipFile(path) as docx, docx.open(member) as stream:
+        stack = []      # открытые элементы от корня
+        rows = []       # открытые строки таблиц (вложенные — в конце): [ячейки]
+        cells = []      # открытые ячейки: [фрагменты текста]
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            if event == "start":
+                stack.append(elem)
+                if elem.tag == _TR:
+                    rows.append([])
+                elif elem.tag == _TC:
+                    cells.append([])
+                continue
+            stack.pop()
+            tag = elem.tag
+            if tag == _T:
+                if elem.text:
+                    # Фрагмент относится ко всем открытым ячейкам (вложенная таблица — и к внешней)
+                    for fragments in cells:
+                        fragments.append(elem.text)
+            elif tag == _TC:
+                text = " ".join(cells.pop()).strip()
+                if rows:
+                    rows[-1].append(text)
+            elif tag == _TR:
+                yield rows.pop()
+            # Разобранный элемент больше не нужен: у каждого открытого элемента
+            # остаётся не больше одного потомка, и память не растёт с размером документа
+            if stack:
+                stack[-1].remove(elem)
+
+
+def iter_xlsx_rows(path, sheet: str | None = None):
+    """Строки листа книги Excel (по умолчанию — первого): [текст ячейки, ...]."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        for row in ws.iter_rows(values_only=True):
+            yield ["" if value is None else str(value).strip() for value in row]
+    finally:
+        wb.close()
+
+
+def iter_table_rows(path, **kwargs):
+    """Строки таблиц документа по расширению: .docx — iter_docx_rows, .xlsx — iter_xlsx_rows."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext == ".docx":
+        return iter_docx_rows(path, **kwargs)
+    if ext in (".xlsx", ".xlsm"):
+        return iter_xlsx_rows(path, **kwargs)
+    raise ValueError(f"Неподдерживаемый формат таблицы: {ext or path}")
@@ -0,0 +1,395 @@
+"""Потоковый экспорт списка заявок в Excel и CSV/TSV.
+
+Строки читаются из баз страницами (query.iter_pages) и сразу пишутся в книгу
+openpyxl в режиме write_only: ширины колонок и перенос строк задаются до
+записи данных, лист не перечитывается, а в памяти одновременно лежит не больше
+SAMPLE_ROWS строк. Так память не растёт с длиной периода.
+
+Ширины колонок считает ColumnWidths прямо по мере формирования строк, без
+второго прохода по листу. В write_only ширины нужно задать до первой строки,
+поэтому потоковый экспорт меряет первые SAMPLE_ROWS строк (до этого они
+копятся в буфере), а дальше ширины уже не меняются.
+
+Для выгрузок в учётные и BI-системы есть write_records_csv: строки страницами
+идут из курсора прямо в csv.writer (UTF-8 с BOM, чтобы Excel узнал кодировку),
+при желании — сразу в gzip. Значения не форматируются: даты остаются в ISO.
+
+Модуль не зависит от tkinter: окно выбирает базы и путь, а здесь только
+чтение и запись.
+"""
+
+import csv
+import gzip
+import itertools
+import operator
+import os
+import sqlite3
+
+from formatting import format_timestamp
+from problems import parse_problem
+from query import PAGE_SIZE, RecordFilter, iter_pages, register_functions
+
+# Колонки CSV-выгрузки: база, затем поля RECORD_COLUMNS без служебных user_id и version
+CSV_COLUMNS = ("База", "ID", "Наименование", "Фамилия", "Категория", "Содержание заявки", "Номер бригады",
+               "Телефон", "Адрес", "Создана", "Постановка", "Состояние", "Оператор", "Дата", "Примечание")
+_CSV_FIELDS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14)
+
+# Строк в странице чтения для CSV: запись дешёвая, поэтому страницы крупнее
+CSV_PAGE_SIZE = 5000
+
+# Колонки листа экспорта: (заголовок, наименьшая ширина)
+EXPORT_COLUMNS = (
+    ("№ п/п", 8),
+    ("Номер заявки", 16),
+    ("Дата", 14),
+    ("Время", 12),
+    ("Содержание заявки", 50),
+    ("Категория", 20),
+    ("Номер бригады", 18),
+    ("Срок выполнения", 28),
+    ("Телефон", 20),
+    ("Адрес", 40),
+    ("Примечание", 30),
+    ("Заявитель", 25),
+    ("Оператор", 20),
+    ("Состояние выполнения", 28),
+)
+
+# Колонки с длинным текстом — с переносом по словам
+WRAP_COLUMNS = ("Содержание заявки", "Адрес", "Примечание", "Состояние выполнения")
+
+# Ширина колонки не больше MAX_WIDTH символов
+MAX_WIDTH = 80
+
+# Сколько первых строк потокового экспорта мерить для автоширины
+SAMPLE_ROWS = 1000
+
+SIGNATURES = ("Составил: __________________", "Утвердил: __________________")
+
+# Сводка по фильтрам: шапка таблицы и ширины колонок A..F
+FILTERED_HEADERS = ("№ п/п", "Номер заявки", "Дата/Время обращения", "Содержание заявки",
+                    "Постановка на выполнение", "Состояние выполнения")
+FILTERED_WIDTHS = (6, 12, 16, 58, 24, 26)
+
+
+class ColumnWidths:
+    """Наибольшая ширина значений по колонкам, накапливается по строкам.
+
+    Ширина — длина самой длинной строки значения (с учётом переносов строк).
+    Меряются все переданные строки; потоковый экспорт передаёт только первые
+    SAMPLE_ROWS (см. write_records_xlsx), так что ширины выгрузки определяет
+    её начало.
+    """
+
+    def __init__(self, headers, cap: int = MAX_WIDTH):
+        self.cap = cap
+        self._max = [self._measure(h) for h in headers]
+
+    @staticmethod
+    def _measure(value) -> int:
+        if value is None:
+            return 0
+        text = value if isinstance(value, str) else str(value)
+        if "\n" in text:
+            return max(len(line) for line in text.split("\n"))
+        return len(text)
+
+    def observe(self, values) -> None:
+        widest = self._max
+        cap = self.cap
+        for i, value in enumerate(values):
+            if value is None or widest[i] >= cap:
+                continue
+            text = value if value.__class__ is str else str(value)
+            n = len(text)
+            if n > widest[i]:
+                if "\n" in text:
+                    n = max(map(len, text.split("\n")))
+                if n > widest[i]:
+                    widest[i] = n
+
+    def widths(self, minimums=None, fixed=()):
+        """Ширины колонок: наибольшая длина + 2, не меньше minimums[i] и не больше cap.
+        Колонки из fixed (индексы) получают ровно minimums[i]."""
+        out = []
+        for i, n in enumerate(self._max):
+            low = minimums[i] if minimums else 0
+            out.append(low if i in fixed else max(low, min(self.cap, n + 2)))
+        return out
+
+    def apply(self, ws, minimums=None, fixed=()) -> None:
+        """Задаёт ширины колонок листа ws (обычного или write_only до первой строки)."""
+        from openpyxl.utils import get_column_letter
+
+        for col_idx, width in enumerate(self.widths(minimums, fixed), start=1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+
+def iter_record_rows(db_files, open_shard, flt: RecordFilter | None = None, page_size: int = PAGE_SIZE):
+    """Строки RECORD_COLUMNS по базам в порядке db_files, в каждой — по возрастанию id.
+
+    Базы, которых нет на диске, пропускаются; ошибка чтения базы печатается,
+    и экспорт продолжается со следующей (как в _execute_query_multiple_dbs).
+    """
+    for db_file in db_files:
+        db_path = str(db_file)
+        if not os.path.exists(db_path):
+            continue
+        connection = open_shard(db_path)
+        try:
+            register_functions(connection)
+            for rows in iter_pages(connection.cursor(), flt, page_size):
+                yield from rows
+        except sqlite3.Error as e:
+            print(f"Ошибка при запросе к {db_path}: {e}")
+        finally:
+            connection.close()
+
+
+def count_records(db_files, open_shard, flt: RecordFilter | None = None) -> int:
+    """Число строк, которые вернёт iter_record_rows с теми же аргументами."""
+    clauses, params = (flt or RecordFilter()).where()
+    sql = """SELECT COUNT(*)
+             FROM records r
+             LEFT JOIN common.users u ON r.user_id = u.id"""
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    total = 0
+    for db_file in db_files:
+        db_path = str(db_file)
+        if not os.path.exists(db_path):
+            continue
+        connection = open_shard(db_path)
+        try:
+            register_functions(connection)
+            total += connection.execute(sql, params).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Ошибка при запросе к {db_path}: {e}")
+        finally:
+            connection.close()
+    return total
+
+
+def split_deadline(problem):
+    """Отделяет «(срок выполнения ...)» от текста заявки: (текст, срок)."""
+    parsed = parse_problem(problem)
+    return parsed.body, parsed.deadline
+
+
+def export_values(idx: int, row):
+    """Значения строки листа (по EXPORT_COLUMNS) для строки RECORD_COLUMNS."""
+    (rec_id, name, surname, category, problem, brigade_number, phone, address,
+     dt_str, _assignment, status_full, operator_username, _date, _user_id, improvement) = row[:15]
+    ts = format_timestamp(dt_str)
+    problem_text, deadline_text = split_deadline(problem)
+    applicant_line = " ".join([p for p in [name, surname] if p]).strip()
+    return (
+        idx,
+        f"№ {rec_id}",
+        ts.date_short or "",
+        ts.time_full or "",
+        problem_text.upper() if problem_text else "",
+        category or "",
+        brigade_number or "",
+        deadline_text,
+        phone or "",
+        address or "",
+        improvement or "",
+        applicant_line,
+        operator_username or "",
+        status_full or "",
+    )
+
+
+def write_records_xlsx(path, rows, progress=None, progress_every: int = PAGE_SIZE) -> int:
+    """Пишет строки RECORD_COLUMNS в книгу path потоково. Возвращает число строк.
+
+    rows — любой итератор (например, iter_record_rows); progress(n) вызывается
+    каждые progress_every строк и может прервать запись исключением (jobs.ExportJob.report).
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    from report_styles import register
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Лист1")
+    register(wb)
+
+    # Первые SAMPLE_ROWS строк — в буфер, по ним ширины; колонки с переносом не расширяются
+    headers = [title for title, _ in EXPORT_COLUMNS]
+    wrap_indexes = [i for i, title in enumerate(headers) if title in WRAP_COLUMNS]
+    sizer = ColumnWidths(headers)
+    table = (export_values(idx, row) for idx, row in enumerate(rows, start=1))
+    sample = list(itertools.islice(table, SAMPLE_ROWS))
+    for values in sample:
+        sizer.observe(values)
+    sizer.apply(ws, [width for _, width in EXPORT_COLUMNS], fixed=wrap_indexes)
+
+    # Заголовок: жирный в рамке, как раньше у DataFrame.to_excel
+    header = []
+    for title, _ in EXPORT_COLUMNS:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.style = "disp_header"
+        header.append(cell)
+    ws.append(header)
+
+    count = 0
+    try:
+        for count, values in enumerate(itertools.chain(sample, table), start=1):
+            values = list(values)
+            for i in wrap_indexes:
+                if values[i]:
+                    cell = WriteOnlyCell(ws, value=values[i])
+                    cell.style = "disp_wrap"
+                    values[i] = cell
+            ws.append(values)
+            if progress is not None and count % progress_every == 0:
+                progress(count)
+    except BaseException:
+        # Запись прервана (например, отменой задания): закрываем лист сразу,
+        # иначе openpyxl попробует дописать его при сборке мусора
+        ws.close()
+        raise
+
+    # Подписи "Составил/Утвердил" одна под другой
+    ws.append([])
+    sig_row = count + 3
+    for offset, text in enumerate(SIGNATURES):
+        ws.append([text])
+        ws.merged_cells.add(f"A{sig_row + offset}:B{sig_row + offset}")
+
+    wb.save(path)
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def write_filtered_report(path, rows, period_caption: str, selection_caption: str, progress=None,
+                          progress_every: int = 200) -> int:
+    """Сводка заявок по фильтрам: шапка с периодом и отбором, таблица в рамке, подпись.
+
+    rows — строки _fetch_rows_for_local (id, problem, phone, address, improvement,
+    brigade_number, category, created_at, name, surname, username, status).
+    Оформление — именованными стилями report_styles. Возвращает число строк.
+    """
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    from report_styles import FILTERED_ROW, register, write_row
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Отчёт"
+    register(wb)
+
+    r = 1
+    for text, style in (("Сводка заявок", "disp_title"), (period_caption, "disp_center"),
+                        (selection_caption, "disp_center")):
+        ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
+        ws.cell(row=r, column=1, value=text).style = style
+        r += 1
+    r += 1
+
+    ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
+    ws.cell(row=r, column=1, value=f"Всего отобрано  {len(rows)} заявок.").style = "disp_bold"
+    r += 2
+
+    write_row(ws, r, FILTERED_HEADERS, ("disp_header",) * len(FILTERED_HEADERS))
+    r += 1
+
+    # Строки таблицы
+    for i, row in enumerate(rows, start=1):
+        (rec_id, problem, phone, address, _improvement, _brigade_number, category, dt_str,
+         applicant_name, applicant_surname, _operator_username, status_full) = row[:12]
+        # Дата/время
+        ts = format_timestamp(dt_str)
+        date_p = ts.date_short
+        time_p = ts.time_full
+
+        # Содержание и срок (часы)
+        parsed = parse_problem(problem or "")
+        txt = parsed.entry_text
+        hours = parsed.deadline_hours
+
+        fio = " ".join([p for p in [applicant_name, applicant_surname] if p]).strip()
+        content_lines = []
+        if category:
+            content_lines.append(f"КАТЕГОРИЯ: {category.upper()}")
+        if txt:
+            content_lines.append(txt.upper())
+        if phone:
+            content_lines.append(f"ТЕЛ. {phone}")
+        if address:
+            content_lines.append(str(address))
+        if fio:
+            content_lines.append(fio)
+
+        write_row(ws, r, (
+            i,
+            f"№ {rec_id}",
+            f"{date_p}\n{time_p}" if time_p else date_p,
+            "\n".join(content_lines),
+            f"СРОК ВЫПОЛНЕНИЯ: {hours} ч." if hours else "",
+            status_full,
+        ), FILTERED_ROW)
+        r += 1
+        if progress is not None and i % progress_every == 0:
+            progress(i)
+
+    # Ширины колонок
+    for col_idx, width in enumerate(FILTERED_WIDTHS, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    # Подпись
+    sig = r + 1
+    ws.merge_cells(start_row=sig, start_column=1, end_row=sig, end_column=3)
+    ws.cell(row=sig, column=1, value="Отчёт сформирован:")
+    wb.save(path)
+    return len(rows)
+
+
+def csv_format(path):
+    """(разделитель, gzip) по имени файла: .tsv — табуляция, окончание .gz — сжатие."""
+    name = str(path).lower()
+    compress = name.endswith(".gz")
+    if compress:
+        name = name[:-3]
+    return ("\t" if name.endswith(".tsv") else ","), compress
+
+
+def write_records_csv(path, db_files, open_shard, flt: RecordFilter | None = None, delimiter: str = ",",
+                      compress: bool = False, progress=None, page_size: int = CSV_PAGE_SIZE) -> int:
+    """Пишет заявки баз db_files по фильтру flt в CSV/TSV потоково. Возвращает число строк.
+
+    progress(n) вызывается после каждой страницы и может прервать запись исключением.
+    """
+    # BOM пишется один раз вручную: кодек utf-8-sig заметно дороже на каждой записи
+    if compress:
+        out = gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+    else:
+        out = open(path, "w", encoding="utf-8", newline="", buffering=1 << 20)
+    count = 0
+    with out:
+        out.write("\ufeff")
+        writer = csv.writer(out, delimiter=delimiter)
+        writer.writerow(CSV_COLUMNS)
+        pick = operator.itemgetter(*_CSV_FIELDS)
+        for db_file in db_files:
+            db_path = str(db_file)
+            if not os.path.exists(db_path):
+                continue
+            shard = os.path.basename(db_path)
+            connection = open_shard(db_path)
+            try:
+                register_functions(connection)
+                for rows in iter_pages(connection.cursor(), flt, page_size):
+                    writer.writerows([(shard,) + pick(row) for row in rows])
+                    count += len(rows)
+                    if progress is not None:
+                        progress(count)
+            except sqlite3.Error as e:
+                print(f"Ошибка при запросе к {db_path}: {e}")
+            finally:
+                connection.close()
+    return count
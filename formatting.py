@@ -0,0 +1,112 @@
+"""Форматирование дат заявок для таблиц и отчётов.
+
+created_at хранится строкой "YYYY-MM-DD HH:MM:SS" (у старых записей — "YYYY-MM-DD"),
+assignment_date — "YYYY-MM-DD". Раньше каждая строка списка и каждого отчёта
+разбиралась через strptime (иногда дважды), а название месяца переводилось
+циклом replace. Здесь разбор делается срезами строки и кэшируется по значению.
+"""
+
+from calendar import monthrange
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+MONTHS_RU = (
+    "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+)
+
+
+class DisplayTimestamp(NamedTuple):
+    """Готовые к показу части отметки времени."""
+    date: str        # dd.mm.yyyy (или исходная строка, если не распознана)
+    date_short: str  # dd.mm.yy
+    time: str        # HH:MM, пусто для записей без времени
+    time_full: str   # HH:MM:SS, пусто для записей без времени
+    month_key: int   # год * 100 + месяц, 0 если дата не распознана
+
+
+_EMPTY = DisplayTimestamp("", "", "", "", 0)
+
+
+def _is_digits(s: str) -> bool:
+    return s.isascii() and s.isdigit()
+
+
+@lru_cache(maxsize=8192)
+def _format_day(day: str):
+    """"YYYY-MM-DD" -> (dd.mm.yyyy, dd.mm.yy, month_key) или None. Различных дней немного — кэшируем."""
+    y, mo, d = day[0:4], day[5:7], day[8:10]
+    if (len(day) == 10 and day[4] == "-" and day[7] == "-"
+            and _is_digits(y) and _is_digits(mo) and _is_digits(d) and "01" <= mo <= "12"
+            # Как strptime: числа месяца, которого нет (30 февраля, 00), не принимаем
+            and 1 <= int(d) <= monthrange(int(y), int(mo))[1]):
+        return f"{d}.{mo}.{y}", f"{d}.{mo}.{y[2:]}", int(y) * 100 + int(mo)
+    return None
+
+
+def _is_time(t: str) -> bool:
+    return (len(t) == 8 and t[2] == ":" and t[5] == ":" and _is_digits(t[0:2] + t[3:5] + t[6:8])
+            and t[0:2] <= "23" and t[3:5] <= "59" and t[6:8] <= "59")
+
+
+@lru_cache(maxsize=4096)
+def _format_slow(s: str) -> DisplayTimestamp:
+    # Нестандартная запись (например, без ведущих нулей) — разбираем как раньше
+    for fmt, has_time in (("%Y-%m-%d %H:%M:%S", True), ("%Y-%m-%d", False)):
+        try:
+            dt = datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+        return DisplayTimestamp(
+            dt.strftime("%d.%m.%Y"), dt.strftime("%d.%m.%y"),
+            dt.strftime("%H:%M") if has_time else "",
+            dt.strftime("%H:%M:%S") if has_time else "",
+            dt.year * 100 + dt.month,
+        )
+    return DisplayTimestamp(s, s, "", "", 0)
+
+
+def format_timestamp(value) -> DisplayTimestamp:
+    """Разбирает created_at (дата-время или только дата) в строки для отображения.
+
+    Дата форматируется один раз на день (кэш), время берётся срезом строки.
+    """
+    if not value:
+        return _EMPTY
+    s = str(value)
+    n = len(s)
+    if n == 19 or n == 10:
+        day = _format_day(s[:10])
+        if day is not None:
+            if n == 10:
+                return DisplayTimestamp(day[0], day[1], "", "", day[2])
+            t = s[11:]
+            if s[10] == " " and _is_time(t):
+                return DisplayTimestamp(day[0], day[1], t[:5], t, day[2])
+    return _format_slow(s)
+
+
+@lru_cache(maxsize=4096)
+def format_date(value) -> str:
+    """assignment_date "YYYY-MM-DD" -> "dd.mm.yyyy"; нераспознанное значение возвращается как есть."""
+    if not value:
+        return ""
+    ts = format_timestamp(value)
+    if ts.month_key and not ts.time:
+        return ts.date
+    return str(value)
+
+
+def month_label(month_key: int) -> str:
+    """Метка месяца по числовому ключу year*100+month, например "Ноябрь 2025"."""
+    if not month_key:
+        return ""
+    return f"{MONTHS_RU[month_key % 100]} {month_key // 100}"
+
+
+def clear_cache() -> None:
+    """Сбрасывает кэши разбора (для бенчмарков и после массовой правки дат)."""
+    _format_day.cache_clear()
+    _format_slow.cache_clear()
+    format_date.cache_clear()
@@ -0,0 +1,187 @@
+"""Фоновые задания экспорта.
+
+Окно собирает параметры и путь сохранения в главном потоке, а запрос к базам
+и сборку книги выполняет ExportJobRunner в отдельном потоке. Задание пишет
+во временный файл рядом с целевым и заменяет целевой только после успешного
+завершения, поэтому отмена или ошибка не портят уже существующий файл.
+Задание может вместо файла создать каталог job.output (например, бланки за
+месяц — по файлу на день); тогда целевой каталог заменяется целиком.
+
+Ход выполнения (done/total) задание сообщает через report(); там же
+проверяется отмена. Окно опрашивает runner из after-цикла Tk: poll()
+возвращает задания, завершившиеся с прошлого опроса. Командная строка
+выполняет задание сразу, в своём потоке (run).
+"""
+
+import itertools
+import os
+import shutil
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """Задание отменено пользователем."""
+
+
+class NothingToExport(Exception):
+    """Выгружать нечего; текст исключения показывается пользователю."""
+
+
+class ExportJob:
+    # Состояния задания
+    QUEUED = "в очереди"
+    RUNNING = "выполняется"
+    DONE = "готово"
+    EMPTY = "нет данных"
+    CANCELLED = "отменено"
+    FAILED = "ошибка"
+
+    def __init__(self, job_id: int, title: str, path: str, work, total: int | None = None,
+                 notice: str = "Файл успешно сохранён"):
+        self.id = job_id
+        self.title = title
+        self.path = str(path)
+        self.work = work
+        self.notice = notice     # текст сообщения об успешном завершении
+        self.status = self.QUEUED
+        self.done = 0
+        self.total = total
+        self.message = ""
+        self.details = ""        # подробности к сообщению об успешном завершении
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        root, ext = os.path.splitext(self.path)
+        # Временный файл с тем же расширением: openpyxl проверяет его при сохранении.
+        # pid в имени: номера выгрузок у каждого процесса свои, а папка бывает общей
+        self.output = f"{root}.part{os.getpid()}-{job_id}{ext}"
+
+    @property
+    def active(self) -> bool:
+        return self.status in (self.QUEUED, self.RUNNING)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def set_total(self, total: int | None) -> None:
+        self.total = total
+
+    def report(self, done: int) -> None:
+        """Сообщает, сколько строк обработано; при отмене прерывает задание."""
+        self.done = done
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+
+class ExportJobRunner:
+    """Выполняет задания по одному в фоновом потоке и хранит последние KEEP."""
+
+    KEEP = 10
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._queue = []
+        self._jobs = []          # новые в начале
+        self._finished = []      # завершённые, ещё не отданные poll()
+        self._thread = None
+
+    def submit(self, title: str, path, work, total: int | None = None, **kwargs) -> ExportJob:
+        """work(job) выполняется в фоновом потоке и сохраняет результат в job.output.
+        Возвращаемое число (если есть) — сколько строк выгружено."""
+        job = ExportJob(next(self._ids), title, path, work, total, **kwargs)
+        with self._lock:
+            self._queue.append(job)
+            self._jobs.insert(0, job)
+            del self._jobs[self.KEEP:]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="export-jobs", daemon=True)
+                self._thread.start()
+        return job
+
+    def run(self, title: str, path, work, total: int | None = None, **kwargs) -> ExportJob:
+        """Выполняет задание сразу в текущем потоке (выгрузки из командной строки, см. cli.py)."""
+        job = ExportJob(next(self._ids), title, path, work, total, **kwargs)
+        self._execute(job)
+        return job
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def active(self):
+        return [job for job in self.jobs() if job.active]
+
+    def poll(self):
+        """Задания, завершившиеся с прошлого вызова (в порядке завершения)."""
+        with self._lock:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def cancel_all(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs) + list(self._queue)
+        for job in jobs:
+            job.cancel()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._thread = None
+                    return
+                job = self._queue.pop(0)
+            self._execute(job)
+            with self._lock:
+                self._finished.append(job)
+
+    @staticmethod
+    def _remove(path) -> None:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _execute(self, job: ExportJob) -> None:
+        job.started = time.perf_counter()
+        if job.cancelled:
+            job.status = ExportJob.CANCELLED
+            job.finished = job.started
+            return
+        job.status = ExportJob.RUNNING
+        try:
+            count = job.work(job)
+            if job.cancelled:
+                raise JobCancelled()
+            if os.path.isdir(job.output) and os.path.isdir(job.path):
+                shutil.rmtree(job.path)
+            os.replace(job.output, job.path)
+            if isinstance(count, int):
+                job.done = count
+            job.status = ExportJob.DONE
+        except JobCancelled:
+            self._remove(job.output)
+            job.status = ExportJob.CANCELLED
+        except NothingToExport as e:
+            self._remove(job.output)
+            job.status = ExportJob.EMPTY
+            job.message = str(e)
+        except Exception as e:
+            self._remove(job.output)
+            job.status = ExportJob.FAILED
+            job.message = str(e)
+        finally:
+            job.finished = time.perf_counter()
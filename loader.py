@@ -0,0 +1,184 @@
+"""Фоновая загрузка списка заявок по базам.
+
+ShardStreamLoader читает базы в заданном порядке (для окна списка — от текущего
+месяца к старым) в отдельном потоке и складывает страницы строк в очередь.
+Окно забирает их через drain() из after-цикла Tk и дорисовывает таблицу, так
+что первые строки видны сразу, а время до них не зависит от числа баз.
+Очередь ограничена: если окно не успевает, поток ждёт, а не копит весь архив
+в памяти. stop() прерывает чтение после текущей страницы.
+
+Базы, уже целиком лежащие в памяти (store.RecordStore), передаются в cached:
+их строки не читаются из SQLite, а фильтруются в потоке загрузки.
+
+С сортировкой (order) базы открываются все сразу и их упорядоченные потоки
+сливаются в один (query.merge_sorted). Тогда страницы выдаются по запросу:
+окно просит more(), когда список прокручен к концу, и в памяти остаются только
+показанные строки и по странице на базу.
+"""
+
+import queue
+import sqlite3
+import threading
+
+from query import PAGE_SIZE, RecordFilter, SortOrder, iter_pages, iter_sorted_pages, merge_sorted, register_functions
+
+# События очереди:
+#   ("rows", db_file, rows)   — очередная страница строк базы, прочитанная из SQLite
+#   ("cached", db_file, rows) — страница строк базы из cached
+#   ("rows", None, rows, files) — при сортировке: страница строк разных баз, files[i] — база rows[i]
+#   ("shard", db_file)        — база прочитана целиком
+#   ("error", db_file, exc)   — базу прочитать не удалось, загрузка продолжается
+#   ("done", stopped)         — загрузка закончена (stopped=True — прервана)
+
+
+class ShardStreamLoader:
+    QUEUE_PAGES = 8
+
+    # Сколько страниц отсортированного списка выдать до первого more()
+    SORTED_INITIAL_PAGES = 2
+
+    def __init__(self, db_files, open_shard, flt: RecordFilter | None = None, page_size: int = PAGE_SIZE,
+                 order: SortOrder | None = None, cached=None):
+        """open_shard(db_file) -> sqlite3.Connection с присоединённой common; вызывается в потоке загрузки.
+        cached — {db_file: строки базы} для баз, уже загруженных целиком (только без сортировки)."""
+        self.db_files = list(db_files)
+        self.cached = dict(cached or {})
+        self.flt = flt or RecordFilter()
+        self.page_size = page_size
+        self.order = order
+        self._open_shard = open_shard
+        self._queue = queue.Queue(maxsize=self.QUEUE_PAGES)
+        self._stop = threading.Event()
+        self._thread = None
+        self._demand = threading.Condition()
+        self._pages_sent = 0
+        self._pages_allowed = self.SORTED_INITIAL_PAGES if order is not None else None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="records-loader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._demand:
+            self._demand.notify_all()
+
+    def more(self, pages: int = 1) -> None:
+        """Разрешает выдать ещё pages страниц сверх уже выданных (только при сортировке).
+        Повторные вызовы до выдачи страницы не накапливаются."""
+        with self._demand:
+            if self._pages_allowed is not None:
+                self._pages_allowed = max(self._pages_allowed, self._pages_sent + pages)
+                self._demand.notify_all()
+
+    def _wait_demand(self) -> bool:
+        with self._demand:
+            while (not self._stop.is_set() and self._pages_allowed is not None
+                   and self._pages_sent >= self._pages_allowed):
+                self._demand.wait(0.5)
+            self._pages_sent += 1
+        return not self._stop.is_set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def _put(self, event) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(event, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self) -> None:
+        if self.order is not None:
+            self._run_sorted()
+        else:
+            self._run_by_shard()
+        # Финальное событие кладём и после stop(), чтобы окно узнало о завершении
+        stopped = self._stop.is_set()
+        try:
+            self._queue.put(("done", stopped), timeout=1)
+        except queue.Full:
+            pass
+
+    def _run_by_shard(self) -> None:
+        for db_file in self.db_files:
+            if self._stop.is_set():
+                break
+            if db_file in self.cached:
+                rows = [row for row in self.cached[db_file] if self.flt.matches(row)]
+                for start in range(0, len(rows), self.page_size):
+                    if not self._put(("cached", db_file, rows[start:start + self.page_size])):
+                        break
+                if not self._stop.is_set():
+                    self._put(("shard", db_file))
+                continue
+            try:
+                connection = self._open_shard(db_file)
+            except Exception as e:
+                self._put(("error", db_file, e))
+                continue
+            try:
+                register_functions(connection)
+                for rows in iter_pages(connection.cursor(), self.flt, self.page_size):
+                    if not self._put(("rows", db_file, rows)):
+                        break
+            except sqlite3.Error as e:
+                self._put(("error", db_file, e))
+            finally:
+                connection.close()
+            if not self._stop.is_set():
+                self._put(("shard", db_file))
+
+    def _run_sorted(self) -> None:
+        connections = []
+        streams = []
+        opened = []
+        try:
+            for db_file in self.db_files:
+                try:
+                    connection = self._open_shard(db_file)
+                    register_functions(connection)
+                except Exception as e:
+                    self._put(("error", db_file, e))
+                    continue
+                connections.append(connection)
+                opened.append(db_file)
+                streams.append(self._shard_stream(db_file, connection))
+            page, files = [], []
+            for rank, row in merge_sorted(streams, self.order):
+                page.append(row)
+                files.append(opened[rank])
+                if len(page) >= self.page_size:
+                    if not self._wait_demand() or not self._put(("rows", None, page, files)):
+                        return
+                    page, files = [], []
+            if page and self._wait_demand():
+                self._put(("rows", None, page, files))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def _shard_stream(self, db_file, connection):
+        try:
+            yield from iter_sorted_pages(connection.cursor(), self.flt, self.order, self.page_size)
+        except sqlite3.Error as e:
+            self._put(("error", db_file, e))
+
+    def drain(self, max_rows: int = 2000):
+        """События, накопившиеся к этому моменту (не блокирует).
+        Строк за вызов — не больше max_rows, чтобы один тик Tk оставался коротким."""
+        events = []
+        taken = 0
+        while taken < max_rows:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            events.append(event)
+            if event[0] == "rows":
+                taken += len(event[2])
+        return events
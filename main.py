@@ -1,25 +1,52 @@
+import multiprocessing
+import sys
+
+if __name__ == "__main__":
+    # Бланки за месяц пишутся в рабочих процессах (blank.write_blank_files). В собранном exe
+    # рабочий процесс запускается тем же файлом: freeze_support передаёт ему управление
+    # раньше всего остального — до импорта tkinter и подключения к базам
+    multiprocessing.freeze_support()
+
+    # Выгрузки из командной строки (планировщик Windows: Disp.exe export ...): управление
+    # сразу передаётся cli.py — без tkinter, окна входа и подключения к базам ниже
+    if sys.argv[1:2] == ["export"]:
+        from cli import main as export_main
+        sys.exit(export_main(sys.argv[2:], prog=f"{sys.argv[0]} export"))
+
 import sqlite3
 import re
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
-from datetime import datetime, timedelta
+from datetime import datetime
 from tkcalendar import DateEntry
 from tkinter import filedialog
 import ctypes
 import glob
+import importlib.util
 import os
-import sys
+import threading
 from pathlib import Path
-import zipfile
-import xml.etree.ElementTree as ET
 
-# Опциональный импорт pandas (используется только для экспорта)
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
-    pd = None
+from formatting import MONTHS_RU, format_timestamp, format_date, month_label
+from recent import RecentBuffer
+from changes import ChangeWatcher, shard_key
+from scheduler import RefreshScheduler
+from query import RecordFilter, SortOrder
+from loader import ShardStreamLoader
+from stalls import StallWatchdog
+from blank import backfill_blank_categories
+from blank_template import TemplateError, check_template
+from problems import clean_problem_text, parse_problem
+from refbook import RefbookWatcher, import_docx, load_refbook
+from settings import (app_dir, blank_template, common_db_path, load_blank_template_path, load_db_base_dir,
+                      save_blank_template_path, save_db_base_dir)
+from shards import all_databases, attach_common, ensure_schema_for_connection, open_shard, query_databases
+from store import COL_IMPROVEMENT, COL_USER_ID, Projection, RecordStore
+from export import csv_format
+from reports import (blank_file_name, build_daily_blank, build_filtered_report, build_month_blanks, build_records_csv,
+                     build_records_xlsx, build_summary_report, month_blanks_dir_name, month_days, summary_file_name,
+                     summary_period)
+from jobs import ExportJob, ExportJobRunner
 
 def get_month_year_label(db_filename):
     import re
@@ -28,45 +55,11 @@ def get_month_year_label(db_filename):
         return db_filename
     year = int(m.group(1))
     month = int(m.group(2))
-    months_ru = [
-        "", "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-    ]
-    return f"{months_ru[month]} {year}"
+    return f"{MONTHS_RU[month]} {year}"
 
 # ===== Создание базы =====
 # ...existing code...
 
-def _get_app_dir() -> Path:
-    """Папка приложения. Для .exe — папка, где лежит exe; для .py — текущая папка."""
-    try:
-        if getattr(sys, 'frozen', False):  # PyInstaller
-            return Path(sys.executable).parent
-    except Exception:
-        pass
-    return Path.cwd()
-
-
-def _load_db_base_dir() -> str:
-    """Возвращает каталог хранения помесячных БД. Хранится в .db_dir (иначе текущая папка)."""
-    try:
-        cfg = _get_app_dir() / ".db_dir"
-        if cfg.exists():
-            p = cfg.read_text(encoding="utf-8").strip().strip('"')
-            if p:
-                return str(Path(p).expanduser().resolve())
-    except Exception:
-        pass
-    return str(_get_app_dir())
-
-
-def _save_db_base_dir(directory: str) -> None:
-    try:
-        (_get_app_dir() / ".db_dir").write_text(str(directory), encoding="utf-8")
-    except Exception:
-        pass
-
-
 def get_db_name_by_date(date_str=None):
     if not date_str:
         now = datetime.now()
@@ -78,7 +71,7 @@ def get_db_name_by_date(date_str=None):
 
 
 def get_db_full_path_by_date(date_str=None) -> str:
-    base_dir = _load_db_base_dir()
+    base_dir = load_db_base_dir()
     return str(Path(base_dir) / get_db_name_by_date(date_str))
 
 current_db_file = get_db_full_path_by_date()
@@ -86,20 +79,8 @@ Path(current_db_file).parent.mkdir(parents=True, exist_ok=True)
 conn = sqlite3.connect(current_db_file)
 cursor = conn.cursor()
 
-def _get_common_db_path() -> str:
-    """Полный путь к постоянной БД пользователей (в том же каталоге, что и помесячные)."""
-    base_dir = _load_db_base_dir()
-    return str(Path(base_dir) / "app.db")
-
 # Присоединяем постоянную базу для пользователей из выбранного каталога (поддерживает сетевые пути)
-try:
-    _common_path = Path(_get_common_db_path())
-    _common_path.parent.mkdir(parents=True, exist_ok=True)
-    # Экранируем одинарные кавычки для безопасной подстановки в SQL
-    _common_escaped = str(_common_path).replace("'", "''")
-    conn.execute(f"ATTACH DATABASE '{_common_escaped}' AS common")
-except Exception:
-    pass
+attach_common(conn)
 
 def switch_db(db_file):
     global conn, cursor, current_db_file
@@ -109,13 +90,7 @@ def switch_db(db_file):
     cursor = conn.cursor()
     current_db_file = db_file
     # Повторно присоединяем постоянную базу для пользователей после переключения
-    try:
-        _common_path = Path(_get_common_db_path())
-        _common_path.parent.mkdir(parents=True, exist_ok=True)
-        _common_escaped = str(_common_path).replace("'", "''")
-        conn.execute(f"ATTACH DATABASE '{_common_escaped}' AS common")
-    except Exception:
-        pass
+    attach_common(conn)
     ensure_schema()
 # ...existing code...
 
@@ -135,45 +110,22 @@ cursor.execute("""CREATE TABLE IF NOT EXISTS records (
 )""")
 conn.commit()
 
-# ===== Миграция схемы =====
-def ensure_schema_for_connection(connection, cursor_to_use):
-    """Обновляет схему базы данных для указанного подключения."""
-    cursor_to_use.execute("PRAGMA table_info(records)")
-    existing_columns = [row[1] for row in cursor_to_use.fetchall()]
-    if "assignment_date" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN assignment_date TEXT")
-    if "status" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN status TEXT")
-        cursor_to_use.execute("UPDATE records SET status='не выполнено' WHERE status IS NULL")
-    else:
-        try:
-            cursor_to_use.execute("UPDATE records SET status='не выполнено' WHERE status='не начато'")
-        except Exception:
-            pass
-    # New fields for problem, phone, address
-    if "problem" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN problem TEXT")
-    if "phone" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN phone TEXT")
-    if "address" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN address TEXT")
-    if "created_at" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN created_at TEXT")
-    # Раздел благоустройства
-    if "improvement" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN improvement TEXT")
-    if "brigade_number" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN brigade_number TEXT")
-    if "category" not in existing_columns:
-        cursor_to_use.execute("ALTER TABLE records ADD COLUMN category TEXT")
-    connection.commit()
-
+# ===== Миграция схемы (см. shards.ensure_schema_for_connection) =====
 def ensure_schema():
     """Обновляет схему для текущего глобального подключения."""
     ensure_schema_for_connection(conn, cursor)
 
 ensure_schema()
 
+# Колонки окна списка -> ключи сортировки (query.SORT_KEYS)
+RECORDS_SORT_KEYS = {
+    'ID': "id", 'Наименование': "name", 'Фамилия': "surname", 'Категория': "category",
+    'Содержание заявки': "problem", 'Номер бригады': "brigade", 'Телефон': "phone", 'Адрес': "address",
+    'Дата': "created", 'Время': "time", 'Постановка': "assignment", 'Состояние': "status",
+    'Пользователь': "operator",
+}
+RECORDS_SORT_TITLES = {key: column for column, key in RECORDS_SORT_KEYS.items()}
+
 # ===== Настройка масштабирования =====
 def setup_scaling():
     """Настройка автоматического масштабирования для Windows"""
@@ -370,6 +322,15 @@ def open_main_window(user):
     # Настройка весов для масштабирования
     main.columnconfigure(0, weight=1)
     main.rowconfigure(2, weight=1)  # Список записей будет расширяться
+
+    # Сторож зависаний главного цикла: журнал logs/stalls.log, сводка — в админ-панели.
+    # Долгие действия отмечены @stall_watchdog.track, их имя попадает в запись о зависании.
+    stall_watchdog = StallWatchdog(main, app_dir() / "logs" / "stalls.log")
+    stall_watchdog.start()
+
+    # Фоновые выгрузки из меню «Экспорт» окна списка: запрос и сборка книги идут в
+    # отдельном потоке, окно показывает ход, кнопку отмены и последние выгрузки
+    export_jobs = ExportJobRunner()
     
     # ----   шапка ----
     top_frame = ttk.Frame(main)
@@ -414,7 +375,7 @@ def open_main_window(user):
             setup_scaling()
             admin_win.title("Админ панель")
             try:
-                fit_and_center_window(admin_win, min_width=520, min_height=220)
+                fit_and_center_window(admin_win, min_width=720, min_height=420)
             except Exception:
                 pass
 
@@ -425,7 +386,7 @@ def open_main_window(user):
             frm.columnconfigure(1, weight=1)
 
             ttk.Label(frm, text="Текущий каталог хранения помесячных БД:").grid(row=0, column=0, sticky=tk.W)
-            db_dir_var = tk.StringVar(value=_load_db_base_dir())
+            db_dir_var = tk.StringVar(value=load_db_base_dir())
             db_dir_entry = ttk.Entry(frm, textvariable=db_dir_var)
             db_dir_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(10, 0))
 
@@ -436,6 +397,66 @@ def open_main_window(user):
 
             ttk.Button(frm, text="Выбрать...", command=choose_dir).grid(row=0, column=2, padx=(10, 0))
 
+            # Шаблон бланка сведений: свой xlsx с разметкой {date}/{section}/{line}/{status}
+            ttk.Label(frm, text="Шаблон бланка сведений:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
+            template_var = tk.StringVar(value=load_blank_template_path() or "(стандартный)")
+            ttk.Entry(frm, textvariable=template_var, state="readonly")\
+                .grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=(10, 0))
+
+            def choose_template():
+                path = filedialog.askopenfilename(title="Шаблон бланка сведений",
+                                                  filetypes=[("Excel files", "*.xlsx")])
+                if not path:
+                    return
+                try:
+                    check_template(path)
+                except TemplateError as e:
+                    messagebox.showerror("Ошибка", str(e))
+                    return
+                save_blank_template_path(path)
+                template_var.set(path)
+                messagebox.showinfo("Готово", "Шаблон бланка сохранён.")
+
+            def reset_template():
+                save_blank_template_path("")
+                template_var.set("(стандартный)")
+
+            template_btns = ttk.Frame(frm)
+            template_btns.grid(row=1, column=2, padx=(10, 0), pady=(10, 0))
+            ttk.Button(template_btns, text="Выбрать...", command=choose_template).grid(row=0, column=0)
+            ttk.Button(template_btns, text="Стандартный", command=reset_template).grid(row=0, column=1, padx=(6, 0))
+
+            # Справочник содержаний в общей базе: загрузка из Word документа, новая версия — на всех местах
+            ttk.Label(frm, text="Справочник содержаний:").grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+            refbook_var = tk.StringVar()
+
+            def show_refbook():
+                refbook_var.set(f"версия {refbook.version}"
+                                + (f" от {refbook.updated_at}" if refbook.updated_at else "")
+                                + (f" ({refbook.source})" if refbook.source else ""))
+
+            ttk.Entry(frm, textvariable=refbook_var, state="readonly")\
+                .grid(row=2, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=(10, 0))
+
+            def import_refbook_docx():
+                path = filedialog.askopenfilename(title="Таблица содержаний",
+                                                  filetypes=[("Word files", "*.docx")])
+                if not path:
+                    return
+                try:
+                    version = import_docx(common_db_path(), path)
+                except (ValueError, sqlite3.Error) as e:
+                    messagebox.showerror("Ошибка", str(e))
+                    return
+                refbook_watcher.poll()
+                show_refbook()
+                messagebox.showinfo("Готово", f"Справочник загружен (версия {version}). "
+                                              "Рабочие места обновят его автоматически.")
+
+            show_refbook()
+            ttk.Button(frm, text="Загрузить...", command=import_refbook_docx)\
+                .grid(row=2, column=2, sticky=tk.W, padx=(10, 0), pady=(10, 0))
+
             def save_dir():
                 new_dir = db_dir_var.get().strip()
                 if not new_dir:
@@ -446,11 +467,54 @@ def open_main_window(user):
                 except Exception as e:
                     messagebox.showerror("Ошибка", f"Не удалось создать каталог: {e}")
                     return
-                _save_db_base_dir(new_dir)
+                save_db_base_dir(new_dir)
                 messagebox.showinfo("Готово", "Каталог сохранён. Перезапустите выбор базы или приложение.")
 
+            # Сводка зависаний интерфейса за текущий сеанс (подробности — в журнале)
+            stalls_frm = ttk.LabelFrame(admin_win, text="Зависания интерфейса (текущий сеанс)", padding="12")
+            stalls_frm.grid(row=1, column=0, padx=12, pady=(0, 12), sticky=(tk.N, tk.S, tk.E, tk.W))
+            stalls_frm.columnconfigure(0, weight=1)
+            stalls_frm.rowconfigure(1, weight=1)
+            admin_win.rowconfigure(1, weight=1)
+
+            stalls_info_var = tk.StringVar(value="")
+            ttk.Label(stalls_frm, textvariable=stalls_info_var).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 6))
+            stall_columns = ("Действие", "Раз", "Макс., мс", "Всего, мс", "Последнее место")
+            stalls_tree = ttk.Treeview(stalls_frm, columns=stall_columns, show='headings', height=6)
+            for col in stall_columns:
+                stalls_tree.heading(col, text=col)
+                if col == "Действие":
+                    stalls_tree.column(col, width=220, minwidth=160, stretch=True)
+                elif col == "Последнее место":
+                    stalls_tree.column(col, width=240, minwidth=160, stretch=True)
+                else:
+                    stalls_tree.column(col, width=80, minwidth=60, stretch=False, anchor="e")
+            stalls_tree.grid(row=1, column=0, sticky="nsew")
+            stalls_scroll = ttk.Scrollbar(stalls_frm, orient="vertical", command=stalls_tree.yview)
+            stalls_tree.configure(yscrollcommand=stalls_scroll.set)
+            stalls_scroll.grid(row=1, column=1, sticky="ns")
+
+            def refresh_stalls():
+                stalls_tree.delete(*stalls_tree.get_children())
+                last_where = {}
+                for stall in stall_watchdog.stalls:
+                    last_where[stall.action] = stall.where
+                for action, count, longest, total in stall_watchdog.summary():
+                    stalls_tree.insert('', 'end', values=(action or "(не отмечено)", count, longest, total,
+                                                          last_where.get(action, "")))
+                if stall_watchdog.stalls:
+                    last = stall_watchdog.stalls[-1]
+                    stalls_info_var.set(
+                        f"Всего: {len(stall_watchdog.stalls)}, последнее {last.started} — {last.duration_ms} мс. "
+                        f"Стеки: {app_dir() / 'logs' / 'stalls.log'}")
+                else:
+                    stalls_info_var.set(f"Зависаний дольше {stall_watchdog.threshold_ms} мс не было")
+
+            ttk.Button(stalls_frm, text="Обновить", command=refresh_stalls).grid(row=2, column=0, sticky=tk.E, pady=(6, 0))
+            refresh_stalls()
+
             btns = ttk.Frame(admin_win)
-            btns.grid(row=1, column=0, padx=12, pady=(0, 12), sticky="e")
+            btns.grid(row=2, column=0, padx=12, pady=(0, 12), sticky="e")
             ttk.Button(btns, text="Сохранить", command=save_dir).grid(row=0, column=0, padx=6)
             ttk.Button(btns, text="Закрыть", command=admin_win.destroy).grid(row=0, column=1, padx=6)
 
@@ -459,6 +523,15 @@ def open_main_window(user):
 
     # Кнопка выхода на экран входа
     def do_logout():
+        try:
+            change_watcher.close()
+            refbook_watcher.close()
+            stop_records_loading()
+            export_jobs.cancel_all()
+            stall_watchdog.stop()
+            record_store.close()
+        except Exception:
+            pass
         try:
             main.destroy()
         finally:
@@ -484,215 +557,23 @@ def open_main_window(user):
     surname_entry = ttk.Entry(frame_add, width=40)
     surname_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
 
-    # Функция для извлечения данных из Word документа
-    def load_problem_categories_from_docx():
-        """Загружает problem_categories и problem_to_blank_category из Word документа"""
-        doc_path = os.path.join(_get_app_dir(), "Таблица содержание 28.11.2025 ( исправление).docx")
-        
-        # Значения по умолчанию
-        default_categories = {
-            "водоотведение": [
-                "забой канализационного колодца",
-                "течь канализации по дороге",
-            ],
-            "водоснабжение": [
-                "течь воды",
-                "течь в / колонки",
-                "течь из-под земли",
-                "течь пожарного гидранта",
-                "течь из -под асфальта",
-                "течь трассы холодной воды",
-                "откачка воды из колодца",
-                "дефект водоразборной колонки",
-                "ржавая холодная вода в жилом фонде",
-                "Не работает в / колонка",
-                "слабое давление х/в",
-                "восстановить в/колонку",
-                "течь в/к",
-                "нет х/в"
-            ],
-            "общие": [
-                "перекладка",
-                "водопровод",
-                "частные врезки",
-                "открыт колодец (отсутствие/несоответствие крышки)",
-                "восстановление асфальтобетонного покрытия",
-                "разрушена плита колодца",
-                "привести к/к в нормативное состояние",
-                "привести в / к в нормативное состояние",
-                "обвал в/к",
-                "обвал к/к",
-            ]
-        }
-        
-        default_mapping = {
-            "течь канализации по дороге": "канализация",
-        }
-        
-        # Пытаемся загрузить из Word документа
-        if os.path.exists(doc_path):
-            try:
-                content_to_category = {}
-                all_contents = []
-                
-                with zipfile.ZipFile(doc_path, 'r') as docx:
-                    xml_content = docx.read('word/document.xml')
-                    root = ET.fromstring(xml_content)
-                    
-                    ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-                    rows = root.findall('.//w:tr', ns)
-                    
-                    for row in rows:
-                        cells = row.findall('.//w:tc', ns)
-                        cell_texts = []
-                        for cell in cells:
-                            texts = [t.text for t in cell.findall('.//w:t', ns) if t.text]
-                            cell_texts.append(' '.join(texts).strip())
-                        
-                        if not any(cell_texts):
-                            continue
-                        
-                        content = ""
-                        category = ""
-                        
-                        if cell_texts[0]:
-                            match = re.search(r'^(.+?)\s*\(([^)]+)\)\s*$', cell_texts[0])
-                            if match:
-                                content = match.group(1).strip()
-                                category = match.group(2).strip()
-                            else:
-                                content = cell_texts[0]
-                                if len(cell_texts) > 1:
-                                    category = cell_texts[1].strip()
-                        
-                        for cell_text in cell_texts:
-                            matches = re.findall(r'\(([^)]+)\)', cell_text)
-                            if matches:
-                                cat = matches[-1].strip()
-                                if "срок" not in cat.lower() and "выполнен" not in cat.lower():
-                                    if not category:
-                                        category = cat
-                                    clean = re.sub(r'\s*\([^)]+\)\s*$', '', cell_text).strip()
-                                    if clean and not content:
-                                        content = clean
-                        
-                        if content:
-                            all_contents.append(content)
-                            if category:
-                                content_to_category[content.lower()] = category.lower()
-                
-                # Обновляем маппинг
-                if content_to_category:
-                    # Преобразуем категории в формат для бланка сведений
-                    category_map_to_blank = {
-                        "канализация": "КАНАЛИЗАЦИЯ",
-                        "водопровод": "ВОДОПРОВОД",
-                        "водоотведение": "КАНАЛИЗАЦИЯ",
-                        "водоснабжение": "ВОДОПРОВОД",
-                        "перекладка": "ПЕРЕКЛАДКА",
-                        "в/колонки": "В/КОЛОНКИ",
-                        "колонки": "В/КОЛОНКИ",
-                        "пожарные гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                        "гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                        "частные врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                        "врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                    }
-                    
-                    problem_to_blank = {}
-                    for content, cat in content_to_category.items():
-                        # Преобразуем категорию
-                        blank_cat = category_map_to_blank.get(cat, "ВОДОПРОВОД")
-                        # Пробуем найти по ключевым словам
-                        for key, value in category_map_to_blank.items():
-                            if key in cat:
-                                blank_cat = value
-                                break
-                        problem_to_blank[content] = blank_cat
-                    
-                    default_mapping.update(problem_to_blank)
-                    
-                    # Обновляем problem_categories, группируя по категориям
-                    # Создаем временные списки
-                    vodootvedenie = []
-                    vodsnabshenie = []
-                    obshie = []
-                    
-                    for content in set(all_contents):
-                        content_lower = content.lower()
-                        cat = content_to_category.get(content_lower, "")
-                        
-                        # Определяем в какую категорию поместить
-                        if "канализац" in cat or "водоотвед" in cat:
-                            vodootvedenie.append(content)
-                        elif "водопровод" in cat or "водоснабж" in cat or "вод" in cat:
-                            vodsnabshenie.append(content)
-                        else:
-                            obshie.append(content)
-                    
-                    # Обновляем только если нашли данные
-                    if vodootvedenie or vodsnabshenie or obshie:
-                        default_categories["водоотведение"] = sorted(set(vodootvedenie + default_categories["водоотведение"]), key=lambda s: s.lower())
-                        default_categories["водоснабжение"] = sorted(set(vodsnabshenie + default_categories["водоснабжение"]), key=lambda s: s.lower())
-                        default_categories["общие"] = sorted(set(obshie + default_categories["общие"]), key=lambda s: s.lower())
-                
-            except Exception as e:
-                # Если ошибка при чтении, используем значения по умолчанию
-                pass
-        
-        return default_categories, default_mapping
-    
-    # Загружаем категории из Word документа
-    problem_categories, problem_to_blank_category_raw = load_problem_categories_from_docx()
-    
-    # Преобразуем problem_to_blank_category_raw в правильный формат
-    problem_to_blank_category = {}
-    category_map_to_blank = {
-        "канализация": "КАНАЛИЗАЦИЯ",
-        "водопровод": "ВОДОПРОВОД",
-        "водоотведение": "КАНАЛИЗАЦИЯ",
-        "водоснабжение": "ВОДОПРОВОД",
-        "перекладка": "ПЕРЕКЛАДКА",
-        "в/колонки": "В/КОЛОНКИ",
-        "колонки": "В/КОЛОНКИ",
-        "пожарные гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-        "гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-        "частные врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-        "врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-    }
-    
-    for content, cat in problem_to_blank_category_raw.items():
-        blank_cat = category_map_to_blank.get(cat, "ВОДОПРОВОД")
-        for key, value in category_map_to_blank.items():
-            if key in cat.lower():
-                blank_cat = value
-                break
-        problem_to_blank_category[content] = blank_cat
-    
-    def clean_problem_text(problem_text: str) -> str:
-        """
-        Удаляет категорию из скобок из текста проблемы.
-        Например: "Течь канализации по дороге (канализация)" -> "Течь канализации по дороге"
-        Но сохраняет "срок выполнения" в скобках.
-        """
-        if not problem_text:
-            return ""
-        import re
-        # Сначала сохраняем "срок выполнения" если он есть
-        deadline_match = re.search(r'\([^)]*срок[^)]*выполнен[^)]*\)', problem_text, flags=re.IGNORECASE)
-        deadline_text = deadline_match.group(0) if deadline_match else ""
-        # Удаляем все скобки (включая категории)
-        cleaned = re.sub(r'\s*\([^)]*\)', '', problem_text)
-        # Восстанавливаем "срок выполнения" если был
-        if deadline_text:
-            cleaned = cleaned.strip() + " " + deadline_text
-        return cleaned.strip()
-    
-    # Все проблемы для удобства (очищенные от категорий в скобках)
-    all_problems = []
-    for cat_problems in problem_categories.values():
-        # Очищаем каждую проблему от категорий в скобках для отображения
-        cleaned_problems = [clean_problem_text(p) for p in cat_problems]
-        all_problems.extend(cleaned_problems)
+    # Справочник содержаний из общей базы (см. refbook.py: пустая база заполняется из Word документа)
+    refbook = load_refbook(common_db_path(), app_dir())
+    problem_categories = refbook.categories
+    # Раздел бланка сведений по тексту проблемы (сохраняется в records.blank_category)
+    blank_classifier = refbook.classifier()
+    # Новая версия справочника с любого рабочего места подхватывается при фоновом опросе
+    refbook_watcher = RefbookWatcher(common_db_path(), refbook.version)
+
+    def _all_problems(book):
+        """Все проблемы справочника для удобства (очищенные от категорий в скобках)."""
+        return [clean_problem_text(p) for cat_problems in book.categories.values() for p in cat_problems]
+
+    def _problem_filter_options(book):
+        """Содержания справочника для фильтра «Проблема» окна списка: без повторов, по алфавиту."""
+        return sorted({p for cat_problems in book.categories.values() for p in cat_problems}, key=lambda s: s.lower())
+
+    all_problems = _all_problems(refbook)
 
     ttk.Label(frame_add, text="Категория:").grid(row=2, column=0, sticky=tk.W, pady=5)
     category_var = tk.StringVar(value="")
@@ -725,6 +606,19 @@ def open_main_window(user):
     problem_entry = ttk.Combobox(frame_add, textvariable=problem_var, values=sorted(problem_categories["общие"], key=lambda s: s.lower()), state="readonly", width=37)
     problem_entry.grid(row=3, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
 
+    def _on_refbook_changed(book):
+        """Справочник изменён администратором: новые списки содержаний и разделы бланка."""
+        nonlocal refbook, problem_categories, blank_classifier, all_problems
+        refbook = book
+        problem_categories = book.categories
+        all_problems = _all_problems(book)
+        blank_classifier = book.classifier()
+        update_problem_options()
+        # Разделы бланка, сохранённые по прежней версии, пересчитываются (один раз на базу)
+        _start_blank_backfill()
+
+    refbook_watcher.subscribe(_on_refbook_changed)
+
     ttk.Label(frame_add, text="Номер бригады:").grid(row=4, column=0, sticky=tk.W, pady=5)
     brigade_var = tk.StringVar()
     brigade_entry = ttk.Entry(frame_add, textvariable=brigade_var, width=37)
@@ -756,6 +650,7 @@ def open_main_window(user):
     improvement_entry = ttk.Entry(frame_add, width=40)
     improvement_entry.grid(row=10, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
 
+    @stall_watchdog.track
     def add_record():
         name = name_entry.get()
         surname = surname_entry.get()
@@ -830,22 +725,15 @@ def open_main_window(user):
         except Exception:
             pass
         
-        cursor.execute("INSERT INTO records (name, surname, problem, phone, address, date, assignment_date, status, user_id, created_at, improvement, brigade_number, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                       (name, surname, problem, phone, address, date, assignment_date, status_value, user[0], created_at, improvement, brigade_number, category))
+        cursor.execute("INSERT INTO records (name, surname, problem, phone, address, date, assignment_date, status, user_id, created_at, improvement, brigade_number, category, blank_category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                       (name, surname, problem, phone, address, date, assignment_date, status_value, user[0], created_at, improvement, brigade_number, category, blank_classifier(problem)))
         new_id = cursor.lastrowid
         conn.commit()
         try:
             show_auto_close_info(f"Заявка создана. Порядковый номер: {new_id}\nТелефон: {phone}", duration_ms=8000)
         except Exception:
             pass
-        try:
-            refresh_records_default()
-        except Exception:
-            pass
-        try:
-            refresh_recent()
-        except Exception:
-            pass
+        _after_local_write()
         name_entry.delete(0, tk.END)
         surname_entry.delete(0, tk.END)
         category_var.set("")
@@ -891,80 +779,139 @@ def open_main_window(user):
     scrollbar_recent_x.grid(row=1, column=0, sticky="ew")
     frame_recent.rowconfigure(0, weight=1)
 
-    def refresh_recent():
-        # Показываем три последних по id
-        for item in recent_tree.get_children():
-            recent_tree.delete(item)
+    # Общее хранилище заявок (база, id) для панели последних заявок, окна списка и
+    # диалогов правки: строки читаются один раз, изменения приходят из журнала
+    record_store = RecordStore(open_shard)
+
+    # Буфер последних заявок: при обновлении читаются только новые и изменённые строки
+    recent_buffer = RecentBuffer(record_store, size=11)
+
+    def _recent_values(row):
+        rec_id, name_v, surname_v, problem_v, phone_v, address_v, dt_str, assign_str, status_text, user_v = (
+            row[0], row[1], row[2], row[4], row[6], row[7], row[8], row[9], row[10], row[11])
+        ts = format_timestamp(dt_str)
+        date_fmt = f"{ts.date} {ts.time}" if ts.time else ts.date
+        return (
+            rec_id,
+            name_v or "",
+            surname_v or "",
+            problem_v or "",
+            phone_v or "",
+            address_v or "",
+            date_fmt,
+            format_date(assign_str),
+            status_text or "",
+            user_v or "",
+        )
+
+    @stall_watchdog.track
+    def refresh_recent(changes=None):
+        """Досинхронизирует панель с базой и правит строки на месте.
+        changes — список изменений из журнала (тогда таблица читается только при необходимости).
+        Возвращает True, если в панели что-то изменилось."""
         try:
-            cursor.execute(
-                """
-                SELECT * FROM (
-                    SELECT r.id, r.name, r.surname, r.problem, r.phone, r.address,
-                        COALESCE(r.created_at, r.date) AS created_at,
-                        r.assignment_date, r.status, u.username
-                    FROM records r
-                    LEFT JOIN common.users u ON r.user_id = u.id
-                    ORDER BY r.id DESC
-                    LIMIT 11
-                ) sub
-                ORDER BY sub.id ASC;
-
-                """
-            )
-            rows = cursor.fetchall()
+            if changes is None:
+                changed, removed = recent_buffer.sync(current_db_file)
+            else:
+                changed, removed = recent_buffer.apply(current_db_file, changes)
         except Exception:
-            rows = []
-        for row in rows:
-            rec_id, name_v, surname_v, problem_v, phone_v, address_v, dt_str, assign_str, status_text, user_v = row
-            # Форматируем дату
-            try:
-                dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                date_fmt = dt.strftime("%d.%m.%Y %H:%M")
-            except Exception:
-                try:
-                    d = datetime.strptime(dt_str, "%Y-%m-%d")
-                    date_fmt = d.strftime("%d.%m.%Y")
-                except Exception:
-                    date_fmt = dt_str or ""
-            # Форматируем дату постановки
-            assignment_formatted = ""
-            if assign_str:
-                try:
-                    assignment_formatted = datetime.strptime(assign_str, "%Y-%m-%d").strftime("%d.%m.%Y")
-                except Exception:
-                    assignment_formatted = assign_str
-            recent_tree.insert('', 'end', values=(
-                rec_id,
-                name_v or "",
-                surname_v or "",
-                problem_v or "",
-                phone_v or "",
-                address_v or "",
-                date_fmt,
-                assignment_formatted,
-                status_text or "",
-                user_v or "",
-            ))
+            return False
+        if not changed and not removed:
+            return False
+        for rec_id in removed:
+            if recent_tree.exists(str(rec_id)):
+                recent_tree.delete(str(rec_id))
+        for rec_id in changed:
+            values = _recent_values(recent_buffer.get(rec_id))
+            if recent_tree.exists(str(rec_id)):
+                recent_tree.item(str(rec_id), values=values)
+            else:
+                recent_tree.insert('', 'end', iid=str(rec_id), values=values)
+        # Порядок по возрастанию id, как и раньше (новые внизу)
+        for idx, rec_id in enumerate(recent_buffer.ids()):
+            recent_tree.move(str(rec_id), '', idx)
+        return True
     refresh_recent()
 
-    # Подпись состояния базы для автообновления (max(id), count(*))
-    last_seen_recent_sig = None
-    def _get_recent_signature():
-        try:
-            cursor.execute("SELECT COALESCE(MAX(id),0), COUNT(*) FROM records")
-            row = cursor.fetchone()
-            return (row[0] or 0, row[1] or 0)
-        except Exception:
-            return None
-    try:
-        last_seen_recent_sig = _get_recent_signature()
-    except Exception:
-        last_seen_recent_sig = None
-
     # Состояние отдельного окна со списком
     records_window = None
     records_tree = None
 
+    # ---- Отслеживание изменений и планировщик обновлений ----
+    # Наблюдаем текущую базу и базы, показанные в окне списка. В простое опрос —
+    # это только PRAGMA data_version; журнал изменений читается после сигнала.
+    # Изменения сначала применяет общее хранилище (дочитывает строки один раз),
+    # затем представления обновляются через планировщик: за кадр — один вызов на окно.
+    change_watcher = ChangeWatcher()
+    change_watcher.watch([current_db_file])
+    refresh_scheduler = RefreshScheduler(main)
+
+    def _watched_db_files():
+        files = [current_db_file]
+        if selected_db_files:
+            files.extend(selected_db_files)
+        if records_view_source is not None:
+            files.extend(records_view_source[0])
+        return files
+
+    def _refresh_recent_view(changes):
+        refresh_recent(changes)
+
+    @stall_watchdog.track
+    def _refresh_records_view(changes):
+        # Строки окна правятся на месте по дельте из хранилища; окно перечитывается
+        # целиком, только если журнал потерял изменения или новую строку некуда вставить
+        if changes is None or records_projection is None:
+            refresh_records_default()
+            return
+        if not records_projection.covers(changes):
+            return
+        upserts, removed, reset = records_projection.delta(changes)
+        if reset or not records_tree or not records_tree.winfo_exists():
+            load_records_progressive(*records_view_source)
+            return
+        for path, rec_id in removed:
+            iid = _records_iid(path, rec_id)
+            if records_tree.exists(iid):
+                records_tree.delete(iid)
+        for path, row in upserts:
+            iid = _records_iid(path, row[0])
+            if records_tree.exists(iid):
+                records_tree.item(iid, values=_records_values(row))
+            elif not _insert_records_row(path, row):
+                load_records_progressive(*records_view_source)
+                return
+
+    refresh_scheduler.register("recent", _refresh_recent_view, lambda: main)
+    refresh_scheduler.register("records", _refresh_records_view, lambda: records_window)
+
+    def _on_db_changes(changes):
+        current_key = shard_key(current_db_file)
+        own = [ch for ch in changes if ch.path == current_key]
+        if own:
+            refresh_scheduler.request("recent", own)
+        refresh_scheduler.request("records", changes)
+
+    change_watcher.subscribe(record_store.apply)
+    record_store.subscribe(_on_db_changes)
+
+    def _after_local_write():
+        """После записи в базу сразу снимаем дельту из журнала: представления обновятся
+        одним проходом планировщика, а фоновый опрос не увидит эту же запись повторно."""
+        try:
+            change_watcher.poke()
+            change_watcher.watch(_watched_db_files())
+            if change_watcher.poll():
+                return
+        except Exception:
+            pass
+        _request_full_refresh()
+
+    def _request_full_refresh():
+        """Полное обновление после смены набора баз (не записи)."""
+        refresh_scheduler.request("recent")
+        refresh_scheduler.request("records")
+
     def _execute_query_multiple_dbs(query_func, db_files=None):
         """
         Выполняет запрос к нескольким базам данных и объединяет результаты.
@@ -974,120 +921,16 @@ def open_main_window(user):
         if db_files is None:
             # Используем только текущую базу
             return query_func(cursor)
-        
-        all_results = []
-        original_db = current_db_file
-        original_conn = conn
-        original_cursor = cursor
-        
-        try:
-            for db_file in db_files:
-                db_path = str(db_file)
-                if not os.path.exists(db_path):
-                    continue
-                
-                # Подключаемся к базе
-                temp_conn = sqlite3.connect(db_path)
-                temp_cursor = temp_conn.cursor()
-                
-                # Обновляем схему базы данных (добавляем отсутствующие колонки)
-                try:
-                    ensure_schema_for_connection(temp_conn, temp_cursor)
-                except Exception as e:
-                    print(f"Предупреждение: не удалось обновить схему для {db_path}: {e}")
-                
-                # Присоединяем общую базу пользователей
-                try:
-                    _common_path = Path(_get_common_db_path())
-                    _common_escaped = str(_common_path).replace("'", "''")
-                    temp_conn.execute(f"ATTACH DATABASE '{_common_escaped}' AS common")
-                except Exception:
-                    pass
-                
-                try:
-                    # Выполняем запрос
-                    results = query_func(temp_cursor)
-                    all_results.extend(results)
-                except Exception as e:
-                    print(f"Ошибка при запросе к {db_path}: {e}")
-                finally:
-                    temp_conn.close()
-            
-            return all_results
-        finally:
-            # Восстанавливаем оригинальное подключение
-            pass  # Не переключаем обратно, так как это может нарушить работу интерфейса
-
-    def _get_all_databases():
-        """Возвращает список всех баз данных (кроме app.db)."""
-        base_dir = _load_db_base_dir()
-        db_files = []
-        for db_file in Path(base_dir).glob("app_*.db"):
-            if db_file.name != "app.db":  # Исключаем общую базу
-                db_files.append(db_file)
-        # Сортируем по дате (из имени файла)
-        db_files.sort(key=lambda x: x.name, reverse=True)
-        return db_files
-
-    def get_filtered_rows(keyword=None, start_date: str | None = None, end_date: str | None = None, db_files=None):
-        """Возвращает строки по текущим фильтрам и опциональному диапазону дат (из всех баз данных)."""
-        # Используем selected_db_files если db_files не указан
-        if db_files is None:
-            try:
-                db_files = selected_db_files
-            except:
-                pass
-        
-        def execute_query(cursor_to_use):
-            query = """SELECT r.id, r.name, r.surname, r.category, r.problem, r.brigade_number, r.phone, r.address,
-                               COALESCE(r.created_at, r.date) AS created_at,
-                               r.assignment_date, r.status, u.username 
-                       FROM records r 
-                       LEFT JOIN common.users u ON r.user_id = u.id"""
-            where_clauses = []
-            params = []
-            if keyword:
-                _kw = (keyword or "").lower()
-                where_clauses.append("(LOWER(r.name) LIKE ? OR LOWER(r.surname) LIKE ? OR LOWER(r.problem) LIKE ? OR LOWER(r.phone) LIKE ? OR LOWER(r.address) LIKE ? OR LOWER(u.username) LIKE ?)")
-                params.extend([f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%"])
-                # Поиск по ID (точное совпадение, если введены только цифры)
-                try:
-                    if str(keyword).isdigit():
-                        where_clauses.append("r.id = ?")
-                        params.append(int(keyword))
-                except Exception:
-                    pass
-            if problem_filter_var.get():
-                _pv = problem_filter_var.get().lower()
-                where_clauses.append("LOWER(r.problem) LIKE ?")
-                params.append(f"%{_pv}%")
-            if status_filter_var.get():
-                # Статус хранится с отметкой времени, фильтруем по префиксу
-                where_clauses.append("r.status LIKE ?")
-                params.append(status_filter_var.get() + "%")
-            if operator_filter_var.get():
-                where_clauses.append("u.username = ?")
-                params.append(operator_filter_var.get())
-            if start_date and end_date:
-                where_clauses.append("date(r.date) >= date(?) AND date(r.date) <= date(?)")
-                params.extend([start_date, end_date])
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-            cursor_to_use.execute(query, params)
-            return cursor_to_use.fetchall()
-        
-        # Используем selected_db_files если указан, иначе все базы
-        if db_files is None:
-            try:
-                db_files = selected_db_files
-            except:
-                pass
-            if db_files is None:
-                # Если selected_db_files не установлен, используем только текущую базу
-                return execute_query(cursor)
-        
-        # Используем функцию для запроса к нескольким базам
-        return _execute_query_multiple_dbs(execute_query, db_files)
+        return query_databases(query_func, db_files)
+
+    # Раздел бланка для заявок, сохранённых до появления blank_category: один раз по каждой базе
+    # на версию справочника, в фоне и по нескольку баз параллельно
+    def _start_blank_backfill():
+        classify, version = blank_classifier, refbook.version
+        threading.Thread(target=lambda: backfill_blank_categories(all_databases(), open_shard, classify, version),
+                         name="blank-backfill", daemon=True).start()
+
+    _start_blank_backfill()
 
     # Локальный ненавязчивый тост без кнопок, закрывается сам
     def show_auto_close_info(message_text: str, duration_ms: int = 8000):
@@ -1138,156 +981,253 @@ def open_main_window(user):
             except Exception:
                 pass
 
-    def get_filtered_rows_for(keyword: str | None, problem_value: str | None, status_value: str | None,
-                               operator_value: str | None, start_date: str | None = None, end_date: str | None = None):
-        """Возвращает строки по параметрам (для фильтров в окне списка) из всех баз данных."""
-        def execute_query(cursor_to_use):
-            query = """SELECT r.id, r.name, r.surname, r.category, r.problem, r.brigade_number, r.phone, r.address,
-                               COALESCE(r.created_at, r.date) AS created_at,
-                               r.assignment_date, r.status, u.username 
-                       FROM records r 
-                       LEFT JOIN common.users u ON r.user_id = u.id"""
-            where_clauses = []
-            params = []
-            # Поиск по ключевому слову
-            if keyword:
-                # Если поиск по ID - используем точный поиск
-                if str(keyword).isdigit():
-                    where_clauses.append("r.id = ?")
-                    params.append(int(keyword))
-                else:
-                    # Для текстового поиска - получаем все записи и фильтруем в Python
-                    # Это решает проблему с кириллицей в SQLite
-                    where_clauses.append("1=1")
-            if problem_value:
-                where_clauses.append("r.problem LIKE ?")
-                params.append(f"%{problem_value}%")
-            if status_value:
-                # Статус хранится с отметкой времени, фильтруем по префиксу
-                where_clauses.append("r.status LIKE ?")
-                params.append(status_value + "%")
-            if operator_value:
-                where_clauses.append("u.username = ?")
-                params.append(operator_value)
-            if start_date and end_date:
-                where_clauses.append("date(r.date) >= date(?) AND date(r.date) <= date(?)")
-                params.extend([start_date, end_date])
-            if where_clauses:
-                query += " WHERE " + " AND ".join(where_clauses)
-            cursor_to_use.execute(query, params)
-            return cursor_to_use.fetchall()
-        
-        # Получаем все базы данных
-        db_files = _get_all_databases()
-        if not db_files:
-            # Если баз нет, используем текущую
-            results = execute_query(cursor)
+    # ---- Заполнение окна списка ----
+    # Базы читаются в фоне (loader.ShardStreamLoader) от самого нового месяца к старым,
+    # строки дорисовываются порциями из after-цикла. Первая страница текущего месяца
+    # появляется сразу, сколько бы лет архива ни лежало в каталоге. Прочитанные строки
+    # попадают в общее хранилище; базы, загруженные целиком, при смене фильтра
+    # не перечитываются, а фильтруются в памяти.
+    records_loader = None
+    records_progress_var = None   # подпись «Загружено до …» в окне списка
+    records_stop_button = None
+    records_view_source = None    # (базы, фильтр) последней загрузки — для автообновления
+    records_projection = None     # вид хранилища для окна списка (store.Projection)
+    records_fill = None           # состояние заполнения таблицы (см. _begin_tree_fill)
+    records_sort = None           # SortOrder по щелчку на заголовке колонки, None — по месяцам
+
+    def _records_iid(path, rec_id):
+        """iid строки окна списка: база и id (id в разных базах повторяются)."""
+        return f"{os.path.basename(str(path))}|{rec_id}"
+
+    def _records_row_source(iid):
+        """(путь к базе, id) по iid строки окна списка или None для строки-разделителя."""
+        name, sep, rec_id = str(iid).partition("|")
+        if not sep or records_projection is None:
+            return None
+        for path in records_projection.paths.values():
+            if os.path.basename(path) == name:
+                return path, int(rec_id)
+        return None
+
+    def _records_values(row):
+        ts = format_timestamp(row[8])
+        return (
+            row[0], row[1], row[2], row[3] or "", row[4] or "", row[5] or "", row[6] or "",
+            ts.date, ts.time, format_date(row[9]), row[10] or "", row[11] or ""
+        )
+
+    def _begin_tree_fill(show_month_headers):
+        nonlocal records_fill
+        if not records_tree or not records_tree.winfo_exists():
+            return None
+        children = records_tree.get_children()
+        if children:
+            records_tree.delete(*children)
+        # last — последняя показанная строка каждой базы: туда вставляются новые заявки
+        records_fill = {"index": 0, "month_key": None, "headers": show_month_headers, "last": {}}
+        return records_fill
+
+    def _append_tree_rows(fill, rows, files):
+        # Группируем записи по месяцам для разграничения (только если выбрано несколько баз).
+        # Месяц сравнивается числовым ключом year*100+month, метка строится только при смене месяца.
+        # files — база строк: одна на всю страницу (str) или по строке (список при сортировке)
+        for n, row in enumerate(rows):
+            path = files if isinstance(files, str) else files[n]
+            # row[8] может содержать дату или дату-время (created_at)
+            ts = format_timestamp(row[8])
+            if fill["headers"] and ts.month_key and ts.month_key != fill["month_key"]:
+                fill["month_key"] = ts.month_key
+                # Вставляем строку-разделитель с названием месяца
+                records_tree.insert('', 'end', values=(
+                    "", "", f"═══════ {month_label(ts.month_key).upper()} ═══════", "", "", "", "", "", "", "", ""
+                ), tags=('header',))
+            tag = 'even' if fill["index"] % 2 == 0 else 'odd'
+            fill["index"] += 1
+            iid = _records_iid(path, row[0])
+            if records_tree.exists(iid):
+                # Строку уже вставила дельта из журнала, пока база дочитывалась
+                records_tree.item(iid, values=_records_values(row))
+            else:
+                records_tree.insert('', 'end', iid=iid, values=_records_values(row), tags=(tag,))
+            fill["last"][shard_key(path)] = (row[0], iid)
+
+    def _insert_records_row(path, row):
+        """Вставляет новую подходящую строку по дельте. False — позицию не определить, нужно перечитать."""
+        fill = records_fill
+        if fill is None or records_sort is not None:
+            return False
+        last = fill["last"].get(shard_key(path))
+        if last is None:
+            # База ещё не дочитана загрузчиком — строка придёт вместе с ней
+            return records_loader is not None
+        last_id, last_iid = last
+        if row[0] < last_id or not records_tree.exists(last_iid):
+            return False
+        prev_tags = records_tree.item(last_iid, 'tags') or ('odd',)
+        tag = 'even' if 'odd' in prev_tags else 'odd'
+        iid = _records_iid(path, row[0])
+        records_tree.insert('', records_tree.index(last_iid) + 1, iid=iid, values=_records_values(row), tags=(tag,))
+        fill["last"][shard_key(path)] = (row[0], iid)
+        return True
+
+    def _set_records_progress(text, loading):
+        try:
+            if records_progress_var is not None:
+                records_progress_var.set(text)
+            if records_stop_button is not None and records_stop_button.winfo_exists():
+                records_stop_button.configure(state=("normal" if loading else "disabled"))
+        except Exception:
+            pass
+
+    def stop_records_loading():
+        """Прерывает фоновую загрузку; уже показанные строки остаются."""
+        if records_loader is not None:
+            records_loader.stop()
+
+    def _records_need_more():
+        """Список прокручен к концу — просим следующую страницу отсортированного списка."""
+        if records_loader is not None and records_loader.order is not None:
+            records_loader.more()
+
+    @stall_watchdog.track
+    def load_records_progressive(db_files, flt=None):
+        """Заполняет окно списка из баз db_files начиная с самого нового месяца.
+        При выбранной сортировке строки всех баз идут одним упорядоченным потоком."""
+        nonlocal records_loader, records_view_source, records_projection
+        if records_loader is not None:
+            records_loader.stop()
+            records_loader = None
+        files = sorted({str(p) for p in db_files if p and os.path.exists(str(p))},
+                       key=lambda p: os.path.basename(p), reverse=True)
+        order = records_sort
+        flt = flt or RecordFilter()
+        fill = _begin_tree_fill(order is None and bool(selected_db_files and len(selected_db_files) > 1))
+        if fill is None:
+            return
+        records_view_source = (list(db_files), flt)
+        records_projection = Projection(record_store, files, flt)
+        if not files:
+            _set_records_progress("Базы данных не найдены", False)
+            return
+        for path in files:
+            record_store.track(path)
+
+        cached = {}
+        if order is None:
+            cached = {path: record_store.rows_of(path) for path in files if record_store.is_complete(path)}
+        loader = ShardStreamLoader(files, open_shard, flt, order=order, cached=cached)
+        records_loader = loader
+        progress = {"rows": 0, "loaded": None, "loading": os.path.basename(files[0])}
+        sort_title = ""
+        if order is not None:
+            sort_title = f"Сортировка: «{RECORDS_SORT_TITLES[order.key]}» {'▼' if order.descending else '▲'} — "
+
+        def loaded_text():
+            if order is not None:
+                return f"{sort_title}показано записей: {progress['rows']}"
+            if progress["loaded"]:
+                return f"Загружено до: {get_month_year_label(progress['loaded'])} (записей: {progress['rows']})"
+            return f"Записей: {progress['rows']}"
+
+        @stall_watchdog.track(name="load_records_progressive.pump")
+        def pump():
+            nonlocal records_loader
+            if records_loader is not loader:
+                return
+            if not records_tree or not records_tree.winfo_exists():
+                loader.stop()
+                records_loader = None
+                return
+            for event in loader.drain():
+                kind = event[0]
+                if kind == "rows" and event[1] is None:
+                    # Отсортированная страница: у каждой строки своя база
+                    for path, row in zip(event[3], event[2]):
+                        record_store.put_rows(path, (row,))
+                    _append_tree_rows(fill, event[2], event[3])
+                    progress["rows"] += len(event[2])
+                elif kind in ("rows", "cached"):
+                    if kind == "rows":
+                        record_store.put_rows(event[1], event[2])
+                    _append_tree_rows(fill, event[2], event[1])
+                    progress["rows"] += len(event[2])
+                    progress["loading"] = os.path.basename(event[1])
+                elif kind == "shard":
+                    progress["loaded"] = os.path.basename(event[1])
+                    if flt.is_empty():
+                        record_store.mark_complete(event[1])
+                elif kind == "error":
+                    print(f"Ошибка при запросе к {event[1]}: {event[2]}")
+                elif kind == "done":
+                    records_loader = None
+                    if event[1]:
+                        _set_records_progress(loaded_text() + " — загрузка остановлена", False)
+                    elif order is not None:
+                        _set_records_progress(f"{sort_title}показаны все записи: {progress['rows']}", False)
+                    else:
+                        _set_records_progress(f"Загружено всё: {len(files)} мес., записей: {progress['rows']}", False)
+                    return
+            if order is not None:
+                _set_records_progress(f"{loaded_text()}; прокрутите вниз, чтобы загрузить ещё", True)
+            else:
+                _set_records_progress(f"{loaded_text()}; загружается {get_month_year_label(progress['loading'])}…", True)
+            main.after(15, pump)
+
+        if order is not None:
+            _set_records_progress(f"{sort_title}загрузка…", True)
         else:
-            # Используем функцию для запроса к нескольким базам
-            results = _execute_query_multiple_dbs(execute_query, db_files)
-        
-        # Если есть текстовый поиск (не по ID), фильтруем результаты в Python
-        if keyword and not str(keyword).isdigit():
-            keyword_lower = keyword.lower()
-            filtered_results = []
-            for row in results:
-                # Проверяем все текстовые поля на совпадение
-                # row[0]=id, row[1]=name, row[2]=surname, row[3]=category, row[4]=problem, row[5]=brigade_number, row[6]=phone, row[7]=address, row[8]=created_at, row[9]=assignment_date, row[10]=status, row[11]=username
-                name = (row[1] or "").lower()
-                surname = (row[2] or "").lower()
-                category = (row[3] or "").lower()
-                problem = (row[4] or "").lower()
-                phone = (row[6] or "").lower()
-                address = (row[7] or "").lower()
-                username = (row[11] or "").lower()
-                
-                if (keyword_lower in name or keyword_lower in surname or 
-                    keyword_lower in category or keyword_lower in problem or keyword_lower in phone or 
-                    keyword_lower in address or keyword_lower in username):
-                    filtered_results.append(row)
-            return filtered_results
-        
-        return results
+            _set_records_progress(f"Загружается {get_month_year_label(progress['loading'])}…", True)
+        loader.start()
+        main.after(15, pump)
+
+    @stall_watchdog.track
+    def sort_records_by(column):
+        """Щелчок по заголовку: сортировка по колонке, повторный — в обратном порядке,
+        третий — снова по месяцам. Сортирует SQLite в каждой базе, потоки сливаются."""
+        nonlocal records_sort
+        key = RECORDS_SORT_KEYS.get(column)
+        if key is None:
+            return
+        if records_sort is None or records_sort.key != key:
+            records_sort = SortOrder(key)
+        elif not records_sort.descending:
+            records_sort = SortOrder(key, descending=True)
+        else:
+            records_sort = None
+        _update_sort_headings()
+        if records_view_source is not None:
+            load_records_progressive(*records_view_source)
+        else:
+            refresh_records_default()
 
-    def populate_tree_from_rows(rows):
-        nonlocal records_tree
+    def _update_sort_headings():
         if not records_tree or not records_tree.winfo_exists():
             return
-        for item in records_tree.get_children():
-            records_tree.delete(item)
-        
-        # Группируем записи по месяцам для разграничения (только если выбрано несколько баз)
-        current_month_label = None
-        months_ru = {
-            "January": "Январь", "February": "Февраль", "March": "Март",
-            "April": "Апрель", "May": "Май", "June": "Июнь",
-            "July": "Июль", "August": "Август", "September": "Сентябрь",
-            "October": "Октябрь", "November": "Ноябрь", "December": "Декабрь"
-        }
-        
-        for i, row in enumerate(rows):
-            # Определяем месяц записи (только если выбрано несколько баз)
-            month_label = None
-            if selected_db_files and len(selected_db_files) > 1:
-                try:
-                    dt = datetime.strptime(row[8], "%Y-%m-%d %H:%M:%S")
-                    month_label = dt.strftime("%B %Y")
-                except Exception:
-                    try:
-                        d = datetime.strptime(row[8], "%Y-%m-%d")
-                        month_label = d.strftime("%B %Y")
-                    except Exception:
-                        pass
-                
-                # Преобразуем месяц на русский
-                if month_label:
-                    for en, ru in months_ru.items():
-                        month_label = month_label.replace(en, ru)
-                
-                # Добавляем заголовок месяца если изменился
-                if month_label and month_label != current_month_label:
-                    current_month_label = month_label
-                    # Вставляем строку-разделитель с названием месяца
-                    records_tree.insert('', 'end', values=(
-                        "", "", f"═══════ {month_label.upper()} ═══════", "", "", "", "", "", "", "", ""
-                    ), tags=('header',))
-            
-            # row[8] может содержать дату или дату-время (created_at)
-            date_formatted = ""; time_formatted = ""
-            try:
-                dt = datetime.strptime(row[8], "%Y-%m-%d %H:%M:%S")
-                date_formatted = dt.strftime("%d.%m.%Y")
-                time_formatted = dt.strftime("%H:%M")
-            except Exception:
-                try:
-                    d = datetime.strptime(row[8], "%Y-%m-%d")
-                    date_formatted = d.strftime("%d.%m.%Y")
-                except Exception:
-                    date_formatted = str(row[8] or "")
-            assignment_formatted = ""
-            if row[9]:
-                try:
-                    assignment_formatted = datetime.strptime(row[9], "%Y-%m-%d").strftime("%d.%m.%Y")
-                except:
-                    assignment_formatted = row[9]
-            tag = 'even' if i % 2 == 0 else 'odd'
-            records_tree.insert('', 'end', values=(
-                row[0], row[1], row[2], row[3] or "", row[4] or "", row[5] or "", row[6] or "",
-                date_formatted, time_formatted, assignment_formatted, row[10] or "", row[11] or ""
-            ), tags=(tag,))
-
+        for column, key in RECORDS_SORT_KEYS.items():
+            mark = ""
+            if records_sort is not None and records_sort.key == key:
+                mark = " ▼" if records_sort.descending else " ▲"
+            records_tree.heading(column, text=column + mark)
+
+    def _records_filter_default():
+        """Фильтры главного окна (проблема, состояние, оператор) для окна списка."""
+        return RecordFilter(
+            problem=problem_filter_var.get() or None,
+            status=status_filter_var.get() or None,
+            operator=operator_filter_var.get() or None,
+        )
+
+    @stall_watchdog.track
     def refresh_records_default():
         """Обновляет окно списка по текущим фильтрам (без строки поиска)."""
-        rows = get_filtered_rows(None)
-        populate_tree_from_rows(rows)
+        load_records_progressive(selected_db_files or [current_db_file], _records_filter_default())
 
     def apply_filters():
         nonlocal records_window, records_tree
         if not records_window or not records_window.winfo_exists():
             open_records_window()
         # Без ограничения по датам; для дат используйте кнопку "Поиск по датам"
-        rows = get_filtered_rows(None, None, None)
-        populate_tree_from_rows(rows)
+        refresh_records_default()
 
 
 
@@ -1299,8 +1239,7 @@ def open_main_window(user):
         if not records_window or not records_window.winfo_exists():
             open_records_window()
         # Показать все записи без ограничений по датам
-        rows = get_filtered_rows(None, None, None)
-        populate_tree_from_rows(rows)
+        refresh_records_default()
 
     # Блок фильтров и поиск по датам на главном экране удалены по требованию
 
@@ -1309,8 +1248,9 @@ def open_main_window(user):
     # Переменная для хранения выбранных баз (None = текущая база, список = несколько баз)
     selected_db_files = None
     
+    @stall_watchdog.track
     def open_records_window():
-        nonlocal records_window, records_tree, selected_db_files
+        nonlocal records_window, records_tree, selected_db_files, records_progress_var, records_stop_button
         
         def choose_db_dialog(btn_choose_db):
             nonlocal selected_db_files
@@ -1352,7 +1292,7 @@ def open_main_window(user):
             def do_select():
                 nonlocal selected_db_files
                 mode = mode_var.get()
-                base_dir = _load_db_base_dir()
+                base_dir = load_db_base_dir()
                 
                 if mode == "current":
                     # Текущий месяц - возвращаемся к одной базе
@@ -1369,11 +1309,7 @@ def open_main_window(user):
                     
                 elif mode == "all":
                     # Вся база - выбираем все базы
-                    all_dbs = []
-                    for db_file in Path(base_dir).glob("app_*.db"):
-                        if db_file.name != "app.db":
-                            all_dbs.append(db_file)
-                    all_dbs.sort(key=lambda x: x.name)
+                    all_dbs = sorted(all_databases(), key=lambda x: x.name)
                     if not all_dbs:
                         messagebox.showwarning("База не найдена", "Базы данных не найдены!")
                         return
@@ -1382,11 +1318,7 @@ def open_main_window(user):
                     
                 elif mode == "multiple":
                     # Несколько месяцев - используем существующий диалог
-                    db_files = []
-                    for db_file in Path(base_dir).glob("app_*.db"):
-                        if db_file.name != "app.db":
-                            db_files.append(db_file)
-                    db_files.sort(key=lambda x: x.name, reverse=True)
+                    db_files = all_databases()
                     
                     if not db_files:
                         messagebox.showinfo("Информация", "Базы данных не найдены")
@@ -1443,11 +1375,7 @@ def open_main_window(user):
                         select_win.destroy()
                         win.destroy()
                         btn_choose_db.config(text=f"Сменить базу ({len(selected_dbs_list)} месяцев)")
-                        refresh_records_default()
-                        try:
-                            refresh_recent()
-                        except Exception:
-                            pass
+                        _request_full_refresh()
                     
                     def select_all_multiple():
                         listbox.selection_set(0, tk.END)
@@ -1461,11 +1389,7 @@ def open_main_window(user):
                     select_win.wait_window()
                     return
                 
-                refresh_records_default()
-                try:
-                    refresh_recent()
-                except Exception:
-                    pass
+                _request_full_refresh()
                 win.destroy()
 
             btn_frame = ttk.Frame(win)
@@ -1475,43 +1399,21 @@ def open_main_window(user):
 
 
     # ...дальше ваш код (filters_panel, таблица и т.д.)...
+        # Окно строится один раз; при закрытии оно скрывается, а повторное открытие
+        # только показывает его. Накопленные за время скрытия изменения применит
+        # планировщик обновлений по событию <Map>.
         if records_window and records_window.winfo_exists():
             try:
+                if records_window.state() in ("withdrawn", "iconic"):
+                    records_window.deiconify()
                 records_window.lift()
                 records_window.focus_force()
             except Exception:
                 pass
             return
 
-        # Определяем список проблем для фильтров
-        problem_options = [
-            "забой канализационного колодца",
-            "течь воды",
-            "течь в / колонки",
-            "течь канализации по дороге",
-            "течь из-под земли",
-            "течь пожарного гидранта",
-            "течь из -под асфальта",
-            "течь трассы холодной воды",
-            "перекладка",
-            "откачка воды из колодца",
-            "водопровод",
-            "частные врезки",
-            "открыт колодец (отсутствие/несоответствие крышки)",
-            "дефект водоразборной колонки",
-            "ржавая холодная вода в жилом фонде",
-            "восстановление асфальтобетонного покрытия",
-            "Не работает в / колонка",
-            "слабое давление х/в",
-            "разрушена плита колодца",
-            "восстановить в/колонку",
-            "привести к/к в нормативное состояние",
-            "привести в / к в нормативное состояние",
-            "обвал в/к",
-            "обвал к/к",
-            "течь в/к",
-            "нет х/в"
-        ]
+        # Список проблем для фильтров — из справочника (обновляется вместе с ним)
+        problem_options = _problem_filter_options(refbook)
 
         records_window = tk.Toplevel(main)
         setup_scaling()
@@ -1532,6 +1434,7 @@ def open_main_window(user):
         
         # --- Группа действий сверху слева (смена базы + папка экспорта) ---
         export_base_dir_var = tk.StringVar(value="")
+        export_pump_id = None   # after-цикл панели фоновых выгрузок
 
         def _choose_export_dir():
             try:
@@ -1558,6 +1461,13 @@ def open_main_window(user):
 
         btn_export_dir_top = ttk.Button(header_actions, text="📁", width=3, padding=6, command=_choose_export_dir)
         btn_export_dir_top.pack(side="left", padx=(6, 0))
+
+        # Ход фоновой загрузки и её остановка
+        records_progress_var = tk.StringVar(value="")
+        ttk.Label(header_actions, textvariable=records_progress_var).pack(side="left", padx=(16, 0))
+        records_stop_button = ttk.Button(header_actions, text="Остановить загрузку",
+                                         command=stop_records_loading, state="disabled")
+        records_stop_button.pack(side="left", padx=(8, 0))
         # --- Панель фильтров ---
         filters_panel = ttk.LabelFrame(records_window, text="Поиск и фильтры", padding="10")
         filters_panel.grid(row=1, column=0, padx=12, pady=(6, 4), sticky="ew")
@@ -1572,14 +1482,26 @@ def open_main_window(user):
         ttk.Label(filters_panel, text="Проблема:").grid(row=0, column=2, sticky="w", padx=(0, 6))
         local_problem_var = tk.StringVar(value="")
         local_problem = ttk.Combobox(filters_panel, textvariable=local_problem_var,
-                                     values=[""] + sorted([v for v in problem_options], key=lambda s: s.lower()), state="readonly", width=60)
+                                     values=[""] + problem_options, state="readonly", width=60)
         local_problem.grid(row=0, column=3, sticky=(tk.W, tk.E), padx=(0, 12))
         try:
             # Показать больше элементов в выпадающем списке и не обрезать длинные строки
-            local_problem.configure(height=min(len([""] + [v for v in problem_options]), 20))
+            local_problem.configure(height=min(len([""] + problem_options), 20))
         except Exception:
             pass
 
+        def _on_refbook_filter_changed(book):
+            """Новая версия справочника: список фильтра «Проблема» из неё."""
+            if not local_problem.winfo_exists():
+                return
+            values = [""] + _problem_filter_options(book)
+            local_problem.configure(values=values, height=min(len(values), 20))
+            if local_problem_var.get() not in values:
+                local_problem_var.set("")
+
+        # Окно строится один раз за сеанс, подписка — тоже одна
+        refbook_watcher.subscribe(_on_refbook_filter_changed)
+
         # Поднять окно перед показом выпадающего списка, чтобы список был поверх
         def _raise_for_dropdown(event=None):
             try:
@@ -1599,13 +1521,18 @@ def open_main_window(user):
 
         ttk.Label(filters_panel, text="Оператор:").grid(row=1, column=0, sticky="w", padx=(0, 6), pady=(8, 0))
         local_operator_var = tk.StringVar(value="")
-        try:
-            cursor.execute("SELECT username FROM users ORDER BY username")
-            _operator_opts = [""] + [row[0] for row in cursor.fetchall()]
-        except Exception:
-            _operator_opts = [""]
+
+        def _load_operator_options():
+            # Список пользователей читается при раскрытии списка, а не при каждом открытии окна
+            try:
+                cursor.execute("SELECT username FROM users ORDER BY username")
+                local_operator.configure(values=[""] + [row[0] for row in cursor.fetchall()])
+            except Exception:
+                pass
+
         local_operator = ttk.Combobox(filters_panel, textvariable=local_operator_var,
-                                      values=_operator_opts, state="readonly", width=24)
+                                      values=[""], state="readonly", width=24,
+                                      postcommand=_load_operator_options)
         local_operator.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=(8, 0))
 
         ttk.Label(filters_panel, text="Дата начала:").grid(row=0, column=4, sticky="w", padx=(0, 6))
@@ -1631,6 +1558,7 @@ def open_main_window(user):
                                     values=["", "в работе", "не выполнено", "выполнено"], state="readonly", width=18)
         local_status.grid(row=1, column=3, sticky=(tk.W, tk.E), pady=(8, 0))
 
+        @stall_watchdog.track
         def apply_local_filters():
             kw = local_keyword.get().strip()
             pv = local_problem_var.get().strip()
@@ -1650,10 +1578,11 @@ def open_main_window(user):
             if end_date and not start_date:
                 start_date = end_date
 
-            # Передаём keyword как есть - функция get_filtered_rows_for сама обработает регистр
-            rows = get_filtered_rows_for(kw or None, pv or None, sv or None, ov or None, start_date, end_date)
-            populate_tree_from_rows(rows)
+            # Регистр ключевого слова (в т.ч. кириллица) учитывается в запросе
+            load_records_progressive(all_databases(),
+                                     RecordFilter(kw or None, pv or None, sv or None, ov or None, start_date, end_date))
 
+        @stall_watchdog.track
         def reset_local_filters():
             local_keyword.delete(0, tk.END)
             local_problem_var.set("")
@@ -1664,8 +1593,7 @@ def open_main_window(user):
                 local_end.delete(0, tk.END)
             except Exception:
                 pass
-            rows = get_filtered_rows_for(None, None, None, None, None, None)
-            populate_tree_from_rows(rows)
+            load_records_progressive(all_databases())
 
     
 
@@ -1678,21 +1606,13 @@ def open_main_window(user):
         # --- Экспорт из окна списка (всплывающий список) ---
         def _select_multiple_databases():
             """Диалог выбора нескольких баз данных (месяцев). Возвращает список путей к базам или None."""
-            base_dir = _load_db_base_dir()
-            db_files = []
-            
-            # Находим все базы данных в директории
-            for db_file in Path(base_dir).glob("app_*.db"):
-                if db_file.name != "app.db":  # Исключаем общую базу
-                    db_files.append(db_file)
+            # Все базы каталога, от новых к старым
+            db_files = all_databases()
             
             if not db_files:
                 messagebox.showinfo("Информация", "Базы данных не найдены")
                 return None
             
-            # Сортируем по дате (из имени файла)
-            db_files.sort(key=lambda x: x.name, reverse=True)
-            
             # Создаем окно выбора
             select_win = tk.Toplevel(main)
             setup_scaling()
@@ -1774,373 +1694,173 @@ def open_main_window(user):
             select_win.wait_window()
             return selected_dbs if selected_dbs else None
         
-        def _fetch_rows_for_local(keyword: str | None, problem: str | None, status: str | None, operator: str | None, start_date: str | None, end_date: str | None, db_files=None):
-            """Возвращает строки для экспорта по текущим локальным фильтрам окна списка."""
-            def execute_query(cursor_to_use):
-                query = (
-                    """SELECT r.id, r.problem, r.phone, r.address, r.improvement, r.brigade_number, r.category, COALESCE(r.created_at, r.date), r.name, r.surname, u.username, r.status
-                        FROM records r
-                        LEFT JOIN common.users u ON r.user_id = u.id"""
-                )
-                where_clauses = []
-                params: list[str] = []
-                if keyword:
-                    _kw = (keyword or "").lower()
-                    where_clauses.append("(LOWER(r.name) LIKE ? OR LOWER(r.surname) LIKE ? OR LOWER(r.problem) LIKE ? OR LOWER(r.phone) LIKE ? OR LOWER(r.address) LIKE ? OR LOWER(u.username) LIKE ?)")
-                    params.extend([f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%", f"%{_kw}%"])
-                    try:
-                        if str(keyword).isdigit():
-                            where_clauses.append("r.id = ?")
-                            params.append(int(keyword))
-                    except Exception:
-                        pass
-                if problem:
-                    _pv = (problem or "").lower()
-                    where_clauses.append("LOWER(r.problem) LIKE ?")
-                    params.append(f"%{_pv}%")
-                if status:
-                    # Статус хранится с отметкой времени, фильтруем по префиксу
-                    where_clauses.append("r.status LIKE ?")
-                    params.append(status + "%")
-                if operator:
-                    where_clauses.append("u.username = ?")
-                    params.append(operator)
-                if start_date and end_date:
-                    where_clauses.append("date(r.date) >= date(?) AND date(r.date) <= date(?)")
-                    params.extend([start_date, end_date])
-                if where_clauses:
-                    query += " WHERE " + " AND ".join(where_clauses)
-                query += " ORDER BY r.id ASC"
-                cursor_to_use.execute(query, params)
-                return cursor_to_use.fetchall()
-            
-            return _execute_query_multiple_dbs(execute_query, db_files)
-
-        def _export_current_list():
-            """Экспортирует текущий список по локальным фильтрам в отдельный Excel."""
-            if not PANDAS_AVAILABLE:
-                messagebox.showerror("Ошибка", "Модуль pandas не установлен.\n\n"
-                                          "Установите зависимости:\n"
-                                          "pip install pandas openpyxl\n\n"
-                                          "Или запустите install_dependencies.bat")
-                return
-            try:
-                from openpyxl.utils import get_column_letter
-                from openpyxl.styles import Alignment
-            except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен модуль openpyxl: {e}\n\npip install openpyxl")
-                return
-
-            # Выбор баз данных
-            db_files = _select_multiple_databases()
-            if db_files is None:
-                return  # Пользователь отменил выбор
-
-            # Используем локальные даты, если заполнены обе
+        def _local_export_dates():
+            """Локальные даты окна списка (YYYY-MM-DD) или (None, None)."""
             try:
                 start_date = local_start.get_date().strftime("%Y-%m-%d") if local_start.get() else None
                 end_date = local_end.get_date().strftime("%Y-%m-%d") if local_end.get() else None
             except Exception:
                 start_date = None
                 end_date = None
+            return start_date, end_date
 
+        def _start_export_job(title, save_path, work, **kwargs):
+            """Ставит выгрузку в фоновую очередь (см. jobs.py) и показывает панель выгрузок."""
+            export_jobs.submit(title, save_path, work, **kwargs)
             try:
-                rows = _fetch_rows_for_local(
-                    local_keyword.get().strip() or None,
-                    local_problem_var.get().strip() or None,
-                    local_status_var.get().strip() or None,
-                    local_operator_var.get().strip() or None,
-                    start_date,
-                    end_date,
-                    db_files,
-                )
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка при получении данных: {e}")
-                return
+                frame_jobs.grid()
+            except Exception:
+                pass
+            if export_pump_id is None:
+                _pump_export_jobs()
+
+        def _cancel_export_job():
+            for job in export_jobs.active():
+                job.cancel()
+
+        def _notify_export_job(job):
+            if job.status == ExportJob.DONE:
+                details = f"\n\n{job.details}" if job.details else ""
+                messagebox.showinfo("Экспорт", f"{job.notice}:\n{job.path}{details}")
+            elif job.status == ExportJob.EMPTY:
+                messagebox.showinfo("Результат", job.message)
+            elif job.status == ExportJob.FAILED:
+                messagebox.showerror("Ошибка экспорта", f"Произошла ошибка при экспорте файла:\n{job.message}")
+
+        def _render_export_jobs():
+            active = export_jobs.active()
+            running = next((job for job in active if job.status == ExportJob.RUNNING), None)
+            if running is not None:
+                if running.total:
+                    export_job_var.set(f"{running.title}: {running.done} из {running.total}")
+                    export_job_bar.configure(value=min(100, 100 * running.done / running.total))
+                else:
+                    export_job_var.set(f"{running.title}: {running.done}")
+                    export_job_bar.configure(value=0)
+            else:
+                export_job_var.set(f"В очереди: {len(active)}" if active else "")
+                export_job_bar.configure(value=0)
+            export_cancel_button.configure(state=("normal" if active else "disabled"))
+            export_jobs_tree.delete(*export_jobs_tree.get_children())
+            for job in export_jobs.jobs():
+                status = job.status if not job.message else f"{job.status}: {job.message}"
+                export_jobs_tree.insert("", tk.END, values=(
+                    job.title, os.path.basename(job.path), job.done, f"{job.elapsed():.1f} с", status))
+
+        def _pump_export_jobs():
+            """after-цикл панели выгрузок: ход, сообщения о завершении; останавливается без заданий."""
+            nonlocal export_pump_id
+            export_pump_id = None
+            try:
+                for job in export_jobs.poll():
+                    _notify_export_job(job)
+                _render_export_jobs()
+                if export_jobs.active():
+                    export_pump_id = main.after(250, _pump_export_jobs)
+            except Exception:
+                pass
 
-            if not rows:
-                messagebox.showinfo("Результат", "Записей по текущим фильтрам нет")
+        def _openpyxl_available():
+            """openpyxl нужен всем выгрузкам; без него показывает ошибку и возвращает False."""
+            if importlib.util.find_spec("openpyxl") is None:
+                messagebox.showerror("Ошибка", "Не установлен модуль openpyxl\n\npip install openpyxl")
+                return False
+            return True
+
+        def _ask_export_path(default_name):
+            """Путь сохранения Excel-файла; None — пользователь отменил (сообщение уже показано)."""
+            save_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                initialfile=default_name,
+                filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
+                initialdir=(export_base_dir_var.get() or "")
+            )
+            if not save_path:
+                messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
+                return None
+            return save_path
+
+        def _export_records_xlsx(title, db_files, flt, default_name, empty_message):
+            """Потоковый экспорт заявок баз db_files по фильтру flt в Excel (см. export.py) фоновым заданием."""
+            if not _openpyxl_available():
                 return
 
-            formatted_rows = []
-            for idx, row in enumerate(rows, start=1):
-                rec_id, problem, phone, address, improvement, brigade_number, category, dt_str, applicant_name, applicant_surname, operator_username, status_full = row
-                # Дата и время
-                date_fmt = ""; time_fmt = ""
-                try:
-                    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                    date_fmt = dt.strftime("%d.%m.%y")
-                    time_fmt = dt.strftime("%H:%M:%S")
-                except Exception:
-                    try:
-                        d = datetime.strptime(dt_str, "%Y-%m-%d")
-                        date_fmt = d.strftime("%d.%m.%y")
-                        time_fmt = ""
-                    except Exception:
-                        date_fmt = str(dt_str)
-                        time_fmt = ""
-
-                problem_text = str(problem).strip() if problem is not None else ""
-                deadline_text = ""
-                if problem_text:
-                    m = re.search(r"\((\s*срок\s+выполнения\s*[^)]*)\)", problem_text, flags=re.IGNORECASE)
-                    if m:
-                        deadline_text = m.group(1).strip()
-                        problem_text = re.sub(r"\((\s*срок\s+выполнения\s*[^)]*)\)", "", problem_text, flags=re.IGNORECASE).strip()
-
-                applicant_line = " ".join([p for p in [applicant_name, applicant_surname] if p]).strip()
-
-                formatted_rows.append({
-                    "№ п/п": idx,
-                    "Номер заявки": f"№ {rec_id}",
-                    "Дата": date_fmt,
-                    "Время": time_fmt,
-                "Содержание заявки": problem_text.upper() if problem_text else "",
-                    "Категория": category or "",
-                    "Номер бригады": brigade_number or "",
-                    "Срок выполнения": deadline_text,
-                    "Телефон": phone or "",
-                    "Адрес": address or "",
-                    "Примечание": improvement or "",
-                    "Заявитель": applicant_line,
-                    "Оператор": operator_username or "",
-                    "Состояние выполнения": status_full or "",
-                })
+            save_path = _ask_export_path(default_name)
+            if not save_path:
+                return
 
-            try:
-                df = pd.DataFrame(formatted_rows, columns=[
-                    "№ п/п", "Номер заявки", "Дата", "Время", "Содержание заявки", "Категория", "Номер бригады", "Срок выполнения", "Телефон", "Адрес", "Примечание", "Заявитель", "Оператор", "Состояние выполнения"
-                ])
-                default_name = "экспорт_текущий_список.xlsx"
-                save_path = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    initialfile=default_name,
-                    filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
-                    initialdir=(export_base_dir_var.get() or "")
-                )
-                if not save_path:
-                    messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
-                    return
-                with pd.ExcelWriter(save_path, engine="openpyxl") as writer:
-                    df.to_excel(writer, index=False, sheet_name="Лист1")
-                    ws = writer.sheets["Лист1"]
-                    # Автоширины
-                    for idx_c, col in enumerate(df.columns, start=1):
-                        max_len = len(str(col))
-                        for val in df[col].astype(str).values:
-                            if val is None:
-                                continue
-                            for line in str(val).split("\n"):
-                                if len(line) > max_len:
-                                    max_len = len(line)
-                        ws.column_dimensions[get_column_letter(idx_c)].width = min(80, max_len + 2)
-                    # Фиксированные ширины
-                    try:
-                        name_to_width = {
-                            "№ п/п": 8,
-                            "Номер заявки": 16,
-                            "Дата": 14,
-                            "Время": 12,
-                            "Содержание заявки": 50,
-                            "Категория": 20,
-                            "Номер бригады": 18,
-                            "Срок выполнения": 28,
-                            "Телефон": 20,
-                            "Адрес": 40,
-                            "Примечание": 30,
-                            "Заявитель": 25,
-                            "Оператор": 20,
-                            "Состояние выполнения": 28,
-                        }
-                        for name, width in name_to_width.items():
-                            if name in df.columns:
-                                col_idx = list(df.columns).index(name) + 1
-                                ws.column_dimensions[get_column_letter(col_idx)].width = width
-                    except Exception:
-                        pass
+            _start_export_job(title, save_path,
+                              lambda job: build_records_xlsx(job, db_files, open_shard, flt, empty_message))
 
-                    # Подписи "Составил/Утвердил" одна под другой
-                    try:
-                        sig_row = ws.max_row + 2
-                        ws.merge_cells(start_row=sig_row, start_column=1, end_row=sig_row, end_column=2)
-                        ws.cell(row=sig_row, column=1, value="Составил: __________________")
-                        sig_row2 = sig_row + 1
-                        ws.merge_cells(start_row=sig_row2, start_column=1, end_row=sig_row2, end_column=2)
-                        ws.cell(row=sig_row2, column=1, value="Утвердил: __________________")
-                    except Exception:
-                        pass
+        @stall_watchdog.track
+        def _export_current_list():
+            """Экспортирует текущий список по локальным фильтрам в отдельный Excel."""
+            # Выбор баз данных
+            db_files = _select_multiple_databases()
+            if db_files is None:
+                return  # Пользователь отменил выбор
 
-                messagebox.showinfo("Экспорт", f"Файл успешно сохранён:\n{save_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка экспорта", f"Произошла ошибка при экспорте файла:\n{e}")
+            # Используем локальные даты, если заполнены обе
+            start_date, end_date = _local_export_dates()
+            flt = RecordFilter(
+                local_keyword.get().strip() or None,
+                local_problem_var.get().strip() or None,
+                local_status_var.get().strip() or None,
+                local_operator_var.get().strip() or None,
+                start_date,
+                end_date,
+            )
+            _export_records_xlsx("Текущий список", db_files, flt, "экспорт_текущий_список.xlsx",
+                                 "Записей по текущим фильтрам нет")
 
+        @stall_watchdog.track
         def _export_full_period_local():
             """Экспорт без учёта локальных фильтров за период из этого окна (local_start/local_end)."""
-            if not PANDAS_AVAILABLE:
-                messagebox.showerror("Ошибка", "Модуль pandas не установлен.\n\n"
-                                          "Установите зависимости:\n"
-                                          "pip install pandas openpyxl\n\n"
-                                          "Или запустите install_dependencies.bat")
-                return
-            try:
-                from openpyxl.utils import get_column_letter
-            except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен модуль openpyxl: {e}\n\n"
-                                          "pip install openpyxl")
-                return
-
             # Выбор баз данных
             db_files = _select_multiple_databases()
             if db_files is None:
                 return  # Пользователь отменил выбор
 
-            try:
-                start_date = local_start.get_date().strftime("%Y-%m-%d") if local_start.get() else None
-                end_date = local_end.get_date().strftime("%Y-%m-%d") if local_end.get() else None
-            except Exception:
-                start_date = None
-                end_date = None
+            start_date, end_date = _local_export_dates()
+            _export_records_xlsx("Список за период", db_files, RecordFilter(start_date=start_date, end_date=end_date),
+                                 f"отчёт_{local_start.get()}_to_{local_end.get()}.xlsx",
+                                 "Записей в этом диапазоне нет")
 
-            def execute_query(cursor_to_use):
-                base_query = (
-                    """SELECT r.id, r.problem, r.phone, r.address, r.improvement, r.brigade_number, r.category, COALESCE(r.created_at, r.date), r.name, r.surname, u.username, r.status
-                                FROM records r 
-                                LEFT JOIN common.users u ON r.user_id = u.id"""
-                )
-                params = []
-                if start_date and end_date:
-                    base_query += " WHERE date(r.date) >= date(?) AND date(r.date) <= date(?)"
-                    params.extend([start_date, end_date])
-                base_query += " ORDER BY r.id ASC"
-                cursor_to_use.execute(base_query, params)
-                return cursor_to_use.fetchall()
-            
-            try:
-                rows = _execute_query_multiple_dbs(execute_query, db_files)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка при получении данных из базы: {e}")
-                return
+        @stall_watchdog.track
+        def _export_csv_local():
+            """Выгрузка CSV/TSV по локальным фильтрам — для учёта и BI (см. export.write_records_csv)."""
+            # Выбор баз данных
+            db_files = _select_multiple_databases()
+            if db_files is None:
+                return  # Пользователь отменил выбор
 
-            if not rows:
-                messagebox.showinfo("Результат", "Записей в этом диапазоне нет")
+            start_date, end_date = _local_export_dates()
+            flt = RecordFilter(
+                local_keyword.get().strip() or None,
+                local_problem_var.get().strip() or None,
+                local_status_var.get().strip() or None,
+                local_operator_var.get().strip() or None,
+                start_date,
+                end_date,
+            )
+            save_path = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                initialfile=f"заявки_{datetime.now().strftime('%d.%m.%Y_%H-%M')}.csv",
+                filetypes=[("CSV", "*.csv"), ("TSV", "*.tsv"), ("CSV, сжатый gzip", "*.csv.gz"),
+                           ("TSV, сжатый gzip", "*.tsv.gz"), ("Все файлы", "*.*")],
+                initialdir=(export_base_dir_var.get() or "")
+            )
+            if not save_path:
+                messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
                 return
+            delimiter, compress = csv_format(save_path)
+            _start_export_job("Выгрузка " + ("TSV" if delimiter == "\t" else "CSV"), save_path,
+                              lambda job: build_records_csv(job, db_files, open_shard, flt, delimiter, compress))
 
-            formatted_rows = []
-            for idx, row in enumerate(rows, start=1):
-                rec_id, problem, phone, address, improvement, brigade_number, category, dt_str, applicant_name, applicant_surname, operator_username, status_full = row
-                date_fmt = ""; time_fmt = ""
-                try:
-                    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                    date_fmt = dt.strftime("%d.%m.%y")
-                    time_fmt = dt.strftime("%H:%M:%S")
-                except Exception:
-                    try:
-                        d = datetime.strptime(dt_str, "%Y-%m-%d")
-                        date_fmt = d.strftime("%d.%m.%y")
-                        time_fmt = ""
-                    except Exception:
-                        date_fmt = str(dt_str)
-                        time_fmt = ""
-
-                problem_text = str(problem).strip() if problem is not None else ""
-                deadline_text = ""
-                if problem_text:
-                    m = re.search(r"\((\s*срок\s+выполнения\s*[^)]*)\)", problem_text, flags=re.IGNORECASE)
-                    if m:
-                        deadline_text = m.group(1).strip()
-                        problem_text = re.sub(r"\((\s*срок\s+выполнения\s*[^)]*)\)", "", problem_text, flags=re.IGNORECASE).strip()
-
-                applicant_line = " ".join([p for p in [applicant_name, applicant_surname] if p]).strip()
-
-                formatted_rows.append({
-                    "№ п/п": idx,
-                    "Номер заявки": f"№ {rec_id}",
-                    "Дата": date_fmt or "",
-                    "Время": time_fmt or "",
-                    "Содержание заявки": problem_text.upper() if problem_text else "",
-                    "Категория": category or "",
-                    "Номер бригады": brigade_number or "",
-                    "Срок выполнения": deadline_text or "",
-                    "Телефон": phone or "",
-                    "Адрес": address or "",
-                    "Примечание": improvement or "",
-                    "Заявитель": applicant_line or "",
-                    "Оператор": operator_username or "",
-                    "Состояние выполнения": status_full or "",
-                })
-
-            try:
-                df = pd.DataFrame(formatted_rows, columns=[
-                    "№ п/п", "Номер заявки", "Дата", "Время", "Содержание заявки", "Категория", "Номер бригады", "Срок выполнения", "Телефон", "Адрес", "Примечание", "Заявитель", "Оператор", "Состояние выполнения"
-                ])
-                default_name = f"отчёт_{local_start.get()}_to_{local_end.get()}.xlsx"
-                save_path = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    initialfile=default_name,
-                    filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
-                    initialdir=(export_base_dir_var.get() or "")
-                )
-                if not save_path:
-                    messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
-                    return
-                with pd.ExcelWriter(save_path, engine="openpyxl") as writer:
-                    df.to_excel(writer, index=False, sheet_name="Лист1")
-                    ws = writer.sheets["Лист1"]
-                    
-                    # Расширенные ширины колонок
-                    try:
-                        name_to_width = {
-                            "№ п/п": 8,
-                            "Номер заявки": 16,
-                            "Дата": 14,
-                            "Время": 12,
-                            "Содержание заявки": 50,
-                            "Категория": 20,
-                            "Номер бригады": 18,
-                            "Срок выполнения": 28,
-                            "Телефон": 20,
-                            "Адрес": 40,
-                            "Примечание": 30,
-                            "Заявитель": 25,
-                            "Оператор": 20,
-                            "Состояние выполнения": 28,
-                        }
-                        for name, width in name_to_width.items():
-                            if name in df.columns:
-                                col_idx = list(df.columns).index(name) + 1
-                                ws.column_dimensions[get_column_letter(col_idx)].width = width
-                    except Exception:
-                        # Фолбэк: автоширины
-                            for idx_c, col in enumerate(df.columns, start=1):
-                                max_len = len(str(col))
-                                for val in df[col].astype(str).values:
-                                    if val is None:
-                                        continue
-                                    for line in str(val).split("\n"):
-                                        if len(line) > max_len:
-                                            max_len = len(line)
-                                ws.column_dimensions[get_column_letter(idx_c)].width = min(80, max_len + 2)
-                    
-                    # Подписи "Составил/Утвердил"
-                    try:
-                        sig_row = ws.max_row + 2
-                        ws.merge_cells(start_row=sig_row, start_column=1, end_row=sig_row, end_column=2)
-                        ws.cell(row=sig_row, column=1, value="Составил: __________________")
-                        sig_row2 = sig_row + 1
-                        ws.merge_cells(start_row=sig_row2, start_column=1, end_row=sig_row2, end_column=2)
-                        ws.cell(row=sig_row2, column=1, value="Утвердил: __________________")
-                    except Exception:
-                        pass
-            except Exception as e:
-                messagebox.showerror("Ошибка экспорта", f"Произошла ошибка при экспорте файла:\n{e}")
-
+        @stall_watchdog.track
         def _export_filtered_local():
             """Экспорт по фильтрам в формат, как на образце: шапка с фильтрами и таблица."""
-            try:
-                from openpyxl import Workbook
-                from openpyxl.styles import Alignment, Font, Border, Side
-            except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен openpyxl: {e}\n\npip install openpyxl")
+            if not _openpyxl_available():
                 return
 
             # Выбор баз данных
@@ -2161,218 +1881,18 @@ def open_main_window(user):
             except Exception:
                 start_sql = None; end_sql = None; start_h = ""; end_h = ""
 
-            # Данные
-            try:
-                rows = _fetch_rows_for_local(kw or None, pv or None, sv or None, ov or None, start_sql, end_sql, db_files)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка при получении данных: {e}")
-                return
-            if not rows:
-                messagebox.showinfo("Результат", "Записей по текущим фильтрам нет")
-                return
-
-            wb = Workbook(); ws = wb.active; ws.title = "Отчёт"
-            bold = Font(bold=True); thin = Side(style="thin"); border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-            r = 1
-            ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-            ws.cell(row=r, column=1, value="Сводка заявок").font = Font(bold=True, size=14)
-            ws.cell(row=r, column=1).alignment = Alignment(horizontal="center")
-            r += 1
-            ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-            ws.cell(row=r, column=1, value=f"за период с  {start_h or '...'}  по  {end_h or '...'} г.г.").alignment = Alignment(horizontal="center")
-            r += 1
-
-            parts = []
-            if sv: parts.append(f"Состояние выполнения: {sv}")
-            if pv: parts.append(f"Содержание: {pv}")
-            if ov: parts.append(f"Оператор: {ov}")
-            if kw: parts.append(f"Поиск: {kw}")
-            ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-            ws.cell(row=r, column=1, value=("Отбор: " + "; ".join(parts)) if parts else "Отбор: не задан").alignment = Alignment(horizontal="center")
-            r += 2
-
-            ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-            ws.cell(row=r, column=1, value=f"Всего отобрано  {len(rows)} заявок.").font = bold
-            r += 2
-
-            headers = ["№ п/п", "Номер заявки", "Дата/Время обращения", "Содержание заявки", "Постановка на выполнение", "Состояние выполнения"]
-            for c, h in enumerate(headers, start=1):
-                ws.cell(row=r, column=c, value=h).font = bold
-                ws.cell(row=r, column=c).border = border
-                ws.cell(row=r, column=c).alignment = Alignment(horizontal="center", vertical="center")
-            r += 1
-
-            # Строки таблицы
-            for i, row in enumerate(rows, start=1):
-                # rows получены из _fetch_rows_for_local: там теперь есть r.category и r.status
-                if len(row) >= 12:
-                    rec_id, problem, phone, address, improvement, brigade_number, category, dt_str, applicant_name, applicant_surname, operator_username, status_full = row
-                elif len(row) >= 11:
-                    rec_id, problem, phone, address, improvement, brigade_number, category, dt_str, applicant_name, applicant_surname, operator_username = row
-                    status_full = ""
-                elif len(row) >= 10:
-                    rec_id, problem, phone, address, improvement, dt_str, applicant_name, applicant_surname, operator_username, status_full = row
-                    category = ""
-                else:
-                    rec_id, problem, phone, address, improvement, dt_str, applicant_name, applicant_surname, operator_username = row
-                    status_full = ""
-                    category = ""
-                # Дата/время
-                date_p = ""; time_p = ""
-                try:
-                    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S"); date_p = dt.strftime("%d.%m.%y"); time_p = dt.strftime("%H:%M:%S")
-                except Exception:
-                    try:
-                        d = datetime.strptime(dt_str, "%Y-%m-%d"); date_p = d.strftime("%d.%m.%y"); time_p = ""
-                    except Exception:
-                        date_p = str(dt_str or "")
-
-                # Содержание и срок (часы)
-                txt = str(problem or "").strip()
-                hours = ""
-                if txt:
-                    m = re.search(r"\(\s*срок\s+выполнения\s*(\d+)\s*ч\s*\)", txt, flags=re.IGNORECASE)
-                    if m:
-                        hours = m.group(1)
-                        txt = re.sub(r"\(\s*срок\s+выполнения\s*\d+\s*ч\s*\)", "", txt, flags=re.IGNORECASE).strip()
-
-                fio = " ".join([p for p in [applicant_name, applicant_surname] if p]).strip()
-                content_lines = []
-                if category: content_lines.append(f"КАТЕГОРИЯ: {category.upper()}")
-                if txt: content_lines.append(txt.upper())
-                if phone: content_lines.append(f"ТЕЛ. {phone}")
-                if address: content_lines.append(str(address))
-                if fio: content_lines.append(fio)
-                content_val = "\n".join(content_lines)
-
-                ws.cell(row=r, column=1, value=i)
-                ws.cell(row=r, column=2, value=f"№ {rec_id}")
-                ws.cell(row=r, column=3, value=f"{date_p}\n{time_p}" if time_p else date_p)
-                ws.cell(row=r, column=4, value=content_val)
-                ws.cell(row=r, column=5, value=(f"СРОК ВЫПОЛНЕНИЯ: {hours} ч." if hours else ""))
-                ws.cell(row=r, column=6, value=status_full)
-
-                for c in range(1,7):
-                    cell = ws.cell(row=r, column=c); cell.border = border
-                    if c in (3,4,5):
-                        cell.alignment = Alignment(wrap_text=True, vertical="top")
-                    else:
-                        cell.alignment = Alignment(vertical="top")
-                r += 1
-
-            # Ширины колонок
-            ws.column_dimensions['A'].width = 6
-            ws.column_dimensions['B'].width = 12
-            ws.column_dimensions['C'].width = 16
-            ws.column_dimensions['D'].width = 58
-            ws.column_dimensions['E'].width = 24
-            ws.column_dimensions['F'].width = 26
-
-            # Подпись
-            sig = r + 1
-            ws.merge_cells(start_row=sig, start_column=1, end_row=sig, end_column=3)
-            ws.cell(row=sig, column=1, value="Отчёт сформирован:")
-
             default_name = f"сводка_по_фильтрам_{datetime.now().strftime('%d.%m.%Y_%H-%M')}.xlsx"
-            save_path = filedialog.asksaveasfilename(defaultextension=".xlsx", initialfile=default_name, filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")], initialdir=(export_base_dir_var.get() or ""))
+            save_path = _ask_export_path(default_name)
             if not save_path:
-                messagebox.showinfo("Отмена", "Экспорт отменён пользователем"); return
-            try:
-                wb.save(save_path)
-                messagebox.showinfo("Экспорт", f"Файл успешно сохранён:\n{save_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
-
-        def _collect_summary_counts(start_date: str, end_date: str, db_files=None):
-            """Собирает статистику по проблемам за период для сводных отчётов."""
-            def execute_query(cursor_to_use):
-                cursor_to_use.execute(
-                    """
-                    SELECT problem, COUNT(*) as count
-                    FROM records 
-                    WHERE date(date) >= date(?) AND date(date) <= date(?)
-                    GROUP BY problem
-                    """,
-                    (start_date, end_date)
-                )
-                return cursor_to_use.fetchall()
-            
-            try:
-                rows = _execute_query_multiple_dbs(execute_query, db_files)
-                
-                # Инициализируем счётчики
-                counts = {
-                    "течь водопровода": 0,
-                    "течь канализации": 0,
-                    "ав. на водоводе": 0,
-                    "дефект водоразборной колонки": 0,
-                    "рж. х/в": 0,
-                    "засор канализации": 0,
-                    "ав. на к/коллекторе": 0,
-                    "забит колодец": 0,
-                    "открыт колодец": 0,
-                }
-                
-                # Заполняем счётчики на основе данных
-                for problem, count in rows:
-                    problem_lower = (problem or "").lower()
-                    # Течь канализации
-                    if "течь" in problem_lower and ("канализац" in problem_lower or "к/к" in problem_lower or "коллектор" in problem_lower):
-                        counts["течь канализации"] += count
-                        continue
-                    # Течь воды (включая гидрант, водовод, колонки, трассу х/в)
-                    if "течь" in problem_lower and (
-                        "вод" in problem_lower or "х/в" in problem_lower or "гидрант" in problem_lower or "колонк" in problem_lower or "водовод" in problem_lower or "трасс" in problem_lower
-                    ):
-                        counts["течь воды"] += count
-                        continue
-                    # Авария на водоводе (не считать как течь)
-                    if ("ав" in problem_lower or "ав." in problem_lower or "авар" in problem_lower) and (
-                        "водовод" in problem_lower or ("трасс" in problem_lower and "х/в" in problem_lower)
-                    ) and "течь" not in problem_lower:
-                        counts["ав. на водоводе"] += count
-                        continue
-                    # Дефект колонки
-                    if "дефект" in problem_lower and "колонк" in problem_lower:
-                        counts["дефект водоразборной колонки"] += count
-                        continue
-                    # Ржавая х/в
-                    if ("рж" in problem_lower or "ржа" in problem_lower) and ("х/в" in problem_lower or ("холодн" in problem_lower and "вод" in problem_lower)):
-                        counts["рж. х/в"] += count
-                        continue
-                    # Засор канализации
-                    if "засор" in problem_lower and "канализац" in problem_lower:
-                        counts["засор канализации"] += count
-                        continue
-                    # Авария на к/коллекторе
-                    if ("ав" in problem_lower or "ав." in problem_lower or "авар" in problem_lower) and "к/коллектор" in problem_lower:
-                        counts["ав. на к/коллекторе"] += count
-                        continue
-                    # Прочие колодцы
-                    if "забит" in problem_lower and "колодец" in problem_lower:
-                        counts["забит колодец"] += count
-                        continue
-                    if "открыт" in problem_lower and "колодец" in problem_lower:
-                        counts["открыт колодец"] += count
-                
-                # Подсчитываем общие суммы
-                water_total = counts["течь воды"] + counts["ав. на водоводе"] + counts["дефект водоразборной колонки"] + counts["рж. х/в"]
-                sewer_total = counts["течь канализации"] + counts["засор канализации"] + counts["ав. на к/коллекторе"] + counts["забит колодец"] + counts["открыт колодец"]
-                
-                return counts, water_total, sewer_total
-            except Exception as e:
-                # Возвращаем пустые счётчики в случае ошибки
-                counts = {key: 0 for key in ["течь воды", "течь канализации", "ав. на водоводе", "дефект водоразборной колонки", "рж. х/в", "засор канализации", "ав. на к/коллекторе", "забит колодец", "открыт колодец"]}
-                return counts, 0, 0
+                return
+            _start_export_job("Сводка по фильтрам", save_path,
+                              lambda job: build_filtered_report(job, _execute_query_multiple_dbs, db_files,
+                                                                kw, pv, sv, ov, start_sql, end_sql, start_h, end_h))
 
+        @stall_watchdog.track
         def _export_summary_local(period: str):
             """Краткие отчёты (сутки/неделя) по датам из этого окна."""
-            try:
-                from openpyxl import Workbook
-                from openpyxl.styles import Font, Alignment
-            except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен openpyxl: {e}\n\npip install openpyxl")
+            if not _openpyxl_available():
                 return
 
             # Выбор баз данных
@@ -2381,86 +1901,36 @@ def open_main_window(user):
                 return  # Пользователь отменил выбор
 
             try:
-                if period == "day":
-                    start = local_start.get_date()
-                    end = start
-                    title_period = start.strftime("%d.%m.%Y")
-                else:
-                    end = local_end.get_date()
-                    start = end - timedelta(days=6)
-                    title_period = f"{start.strftime('%d.%m.%Y')} - {end.strftime('%d.%m.%Y')}"
+                start, end, title_period = summary_period(
+                    period, local_start.get_date() if period == "day" else local_end.get_date())
                 start_sql = start.strftime("%Y-%m-%d")
                 end_sql = end.strftime("%Y-%m-%d")
-                counts, water_total, sewer_total = _collect_summary_counts(start_sql, end_sql, db_files)
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Ошибка при подготовке данных: {e}")
                 return
 
-            default_name = (
-                f"отчёт_за_сутки_{start.strftime('%d.%m.%Y')}.xlsx" if period == "day"
-                else f"отчёт_за_неделю_{start.strftime('%d.%m.%Y')}_to_{end.strftime('%d.%m.%Y')}.xlsx"
-            )
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                initialfile=default_name,
-                filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
-                initialdir=(export_base_dir_var.get() or ""),
-            )
+            save_path = _ask_export_path(summary_file_name(period, start, end))
             if not save_path:
-                messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
                 return
+            _start_export_job(("Отчёт за сутки " if period == "day" else "Отчёт за неделю ") + title_period, save_path,
+                              lambda job: build_summary_report(job, _execute_query_multiple_dbs, db_files,
+                                                                 start_sql, end_sql, title_period),
+                              notice="Отчёт успешно сохранён")
+
+        def _submit_daily_blank(day, db_files):
+            """Спрашивает путь и ставит бланк сведений за сутки в очередь выгрузок."""
+            save_path = _ask_export_path(blank_file_name(day))
+            if not save_path:
+                return
+            _start_export_job(f"Бланк сведений {day.strftime('%d.%m.%Y')}", save_path,
+                              lambda job: build_daily_blank(job, _execute_query_multiple_dbs, db_files, day,
+                                                            blank_classifier, blank_template()),
+                              notice="Бланк сохранён")
 
-            try:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Отчёт"
-                bold = Font(bold=True)
-                row = 1
-                ws.cell(row=row, column=1, value="Система водоснабжения").font = bold; row += 1
-                ws.cell(row=row, column=1, value="Общее количество:").font = bold
-                ws.cell(row=row, column=2, value=water_total); row += 1
-                ws.cell(row=row, column=1, value="течь воды"); ws.cell(row=row, column=2, value=counts["течь воды"]); row += 1
-                ws.cell(row=row, column=1, value="ав. на водоводе"); ws.cell(row=row, column=2, value=counts["ав. на водоводе"]); row += 1
-                ws.cell(row=row, column=1, value="дефект водоразборной колонки"); ws.cell(row=row, column=2, value=counts["дефект водоразборной колонки"]); row += 1
-                ws.cell(row=row, column=1, value="рж. х/в"); ws.cell(row=row, column=2, value=counts["рж. х/в"]); row += 2
-                ws.cell(row=row, column=1, value="Система водоотведения").font = bold; row += 1
-                ws.cell(row=row, column=1, value="Общее кол-во:").font = bold
-                ws.cell(row=row, column=2, value=sewer_total); row += 1
-                ws.cell(row=row, column=1, value="течь канализации"); ws.cell(row=row, column=2, value=counts["течь канализации"]); row += 1
-                ws.cell(row=row, column=1, value="засор канализации"); ws.cell(row=row, column=2, value=counts["засор канализации"]); row += 1
-                ws.cell(row=row, column=1, value="с/м. засор канализации"); ws.cell(row=row, column=2, value=""); row += 1
-                ws.cell(row=row, column=1, value="ав. на к/коллекторе"); ws.cell(row=row, column=2, value=counts["ав. на к/коллекторе"]); row += 1
-                ws.cell(row=row, column=1, value="с/м. ав. на к/коллекторе"); ws.cell(row=row, column=2, value=""); row += 1
-                ws.cell(row=row, column=1, value="забит колодец"); ws.cell(row=row, column=2, value=counts["забит колодец"]); row += 1
-                ws.cell(row=row, column=1, value="открыт колодец"); ws.cell(row=row, column=2, value=counts["открыт колодец"]); row += 2
-                ws.cell(row=row, column=1, value="Период").font = bold
-                ws.cell(row=row, column=2, value=title_period); row += 1
-                ws.cell(row=row, column=1, value="Смену сдал(а):"); ws.cell(row=row, column=2, value=""); row += 1
-                ws.column_dimensions['A'].width = 45
-                ws.column_dimensions['B'].width = 12
-                try:
-                    row += 2
-                    ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
-                    ws.cell(row=row, column=1, value="Составил: __________________")
-                    ws.cell(row=row, column=1).alignment = Alignment(horizontal="left")
-                    row2 = row + 1
-                    ws.merge_cells(start_row=row2, start_column=1, end_row=row2, end_column=3)
-                    ws.cell(row=row2, column=1, value="Утвердил: __________________")
-                    ws.cell(row=row2, column=1).alignment = Alignment(horizontal="left")
-                except Exception:
-                    pass
-                wb.save(save_path)
-                messagebox.showinfo("Экспорт", f"Отчёт успешно сохранён:\n{save_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка экспорта", f"Произошла ошибка при создании отчёта:\n{e}")
-
+        @stall_watchdog.track
         def _export_daily_blank_local():
             """Бланк сведений за сутки по локальной дате начала."""
-            try:
-                from openpyxl import Workbook
-                from openpyxl.styles import Font, Alignment, Border, Side
-            except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен openpyxl: {e}\n\npip install openpyxl")
+            if not _openpyxl_available():
                 return
 
             # Выбор баз данных
@@ -2473,265 +1943,49 @@ def open_main_window(user):
             except Exception:
                 messagebox.showerror("Ошибка", "Выберите дату начала для формирования бланка")
                 return
-            day_sql = day.strftime("%Y-%m-%d")
-
-            def execute_query(cursor_to_use):
-                cursor_to_use.execute(
-                    """
-                    SELECT r.problem, r.address, r.phone, r.name, r.surname, r.brigade_number, COALESCE(r.created_at, r.date), r.status, r.category
-                    FROM records r
-                    WHERE date(r.date) = date(?)
-                    ORDER BY r.id ASC
-                    """,
-                    (day_sql,)
-                )
-                return cursor_to_use.fetchall()
+            _submit_daily_blank(day, db_files)
 
-            try:
-                rows = _execute_query_multiple_dbs(execute_query, db_files)
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка чтения из базы: {e}")
+        @stall_watchdog.track
+        def _export_month_blanks_local():
+            """Бланки сведений за каждый день месяца локальной даты начала (по сегодняшний день)."""
+            if not _openpyxl_available():
                 return
-
-            def category_for(problem_text: str) -> str:
-                t = (problem_text or "").lower()
-                
-                # Сначала проверяем, есть ли категория в скобках в самом тексте проблемы
-                # Формат: "содержание (категория)" - извлекаем категорию из скобок
-                import re
-                # Ищем категорию в скобках, но не "срок выполнения"
-                category_match = re.search(r'\(([^)]+)\)', t)
-                if category_match:
-                    category_in_parens = category_match.group(1).lower().strip()
-                    # Игнорируем "срок выполнения" и другие служебные скобки
-                    if "срок" not in category_in_parens and "выполнен" not in category_in_parens:
-                        # Маппинг категорий из скобок в названия секций бланка
-                        category_map = {
-                            "канализация": "КАНАЛИЗАЦИЯ",
-                            "водопровод": "ВОДОПРОВОД",
-                            "водоотведение": "КАНАЛИЗАЦИЯ",
-                            "водоснабжение": "ВОДОПРОВОД",
-                            "перекладка": "ПЕРЕКЛАДКА",
-                            "в/колонки": "В/КОЛОНКИ",
-                            "колонки": "В/КОЛОНКИ",
-                            "пожарные гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                            "гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                            "частные врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                            "врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                        }
-                        # Проверяем точное совпадение или частичное
-                        for key, value in category_map.items():
-                            if key in category_in_parens:
-                                return value
-                            # Если не нашли точное совпадение, пробуем по первым словам
-                            if "канализац" in category_in_parens:
-                                return "КАНАЛИЗАЦИЯ"
-                            if "водопровод" in category_in_parens or "водоснабж" in category_in_parens:
-                                return "ВОДОПРОВОД"
-                            if "перекладк" in category_in_parens:
-                                return "ПЕРЕКЛАДКА"
-                            if "колонк" in category_in_parens:
-                                return "В/КОЛОНКИ"
-                            if "гидрант" in category_in_parens:
-                                return "ПОЖАРНЫЕ ГИДРАНТЫ"
-                            if "врезк" in category_in_parens:
-                                return "ЧАСТНЫЕ ВРЕЗКИ"
-                
-                # Проверяем маппинг из problem_to_blank_category
-                problem_clean = clean_problem_text(problem_text).lower()
-                if problem_clean in problem_to_blank_category:
-                    return problem_to_blank_category[problem_clean]
-                
-                # ПЕРЕКЛАДКА: прокладка водопровода, врезка водопровода, разрытие, прокол канализации, прокол водопровода, замена водовода
-                # Приоритет: проверяем сначала ПЕРЕКЛАДКУ
-                if "перекладк" in t or "прокладк" in t:
-                    # Если есть "перекладка" или "прокладка" - это ПЕРЕКЛАДКА
-                    return "ПЕРЕКЛАДКА"
-                if "разрытие" in t and "восстанов" not in t:
-                    # "разрытие" само по себе - ПЕРЕКЛАДКА, но "восстановить разрытие" - ВОДОПРОВОД
-                    return "ПЕРЕКЛАДКА"
-                if "прокол" in t:
-                    # прокол канализации или прокол водопровода
-                    return "ПЕРЕКЛАДКА"
-                if "замен" in t and "водовод" in t:
-                    # замена водовода
-                    return "ПЕРЕКЛАДКА"
-                if "врезк" in t and "водопровод" in t and "частн" not in t:
-                    # врезка водопровода (но не частная)
-                    return "ПЕРЕКЛАДКА"
-                
-                # ЧАСТНЫЕ ВРЕЗКИ: ч/врезка, ч/врезка (нужна откачка воды из колодца)
-                if ("врезк" in t and "частн" in t) or ("ч/" in t and "врезк" in t) or \
-                   ("частн" in t and "врезк" in t):
-                    return "ЧАСТНЫЕ ВРЕЗКИ"
-                
-                # ПОЖАРНЫЕ ГИДРАНТЫ: неисправен ПГ, домонтирован ПГ, нет воды в ПГ, соран шток ПГ и затоплен водой
-                if "гидрант" in t or "пг" in t:
-                    return "ПОЖАРНЫЕ ГИДРАНТЫ"
-                
-                # В/КОЛОНКИ: ремонт в/колонки
-                if "колонк" in t:
-                    return "В/КОЛОНКИ"
-                
-                # ВОДОПРОВОД: перекладка водопровода, течь, замена крана (оплачено), течь, открыт в/к и течь в/к, 
-                # перекрыть/открыть х/в (оплачено), восстановить благоустройство, сл.давление х/воды, восстановить разрытие
-                if "течь" in t and "канализац" not in t:
-                    # течь (но не течь канализации)
-                    return "ВОДОПРОВОД"
-                if "замен" in t and "кран" in t:
-                    # замена крана
-                    return "ВОДОПРОВОД"
-                if "открыт" in t and ("в/к" in t or "в/колонк" in t):
-                    # открыт в/к и течь в/к
-                    return "ВОДОПРОВОД"
-                if ("перекрыт" in t or "открыт" in t) and ("х/в" in t or "холодн" in t):
-                    # перекрыть/открыть х/в
-                    return "ВОДОПРОВОД"
-                if "восстанов" in t and ("благоустр" in t or "разрытие" in t):
-                    # восстановить благоустройство, восстановить разрытие
-                    return "ВОДОПРОВОД"
-                if ("слаб" in t or "сл." in t) and ("давл" in t or "х/в" in t or "холодн" in t):
-                    # сл.давление х/воды
-                    return "ВОДОПРОВОД"
-                if "водопровод" in t:
-                    # все остальное с водопроводом
-                    return "ВОДОПРОВОД"
-                
-                # КАНАЛИЗАЦИЯ: все остальное, связанное с канализацией
-                if ("засор" in t) or ("колодец" in t and ("канализац" in t or "забой" in t)) or ("канализац" in t):
-                    return "КАНАЛИЗАЦИЯ"
-                
-                # По умолчанию - ВОДОПРОВОД
-                return "ВОДОПРОВОД"
-
-            sections = {
-                "ПЕРЕКЛАДКА": [],
-                "ВОДОПРОВОД": [],
-                "В/КОЛОНКИ": [],
-                "ПОЖАРНЫЕ ГИДРАНТЫ": [],
-                "ЧАСТНЫЕ ВРЕЗКИ": [],
-                "КАНАЛИЗАЦИЯ": [],
-            }
-
-            for rec in rows:
-                if len(rec) >= 9:
-                    problem, address, phone, name_, surname_, brigade_number, dt_str, status_full, category = rec
-                else:
-                    problem, address, phone, name_, surname_, brigade_number, dt_str, status_full = rec
-                    category = ""
-                who = " ".join([p for p in [name_ or "", surname_ or ""] if p]).strip()
-                time_part = ""; date_part = ""
-                try:
-                    from datetime import datetime as _dt
-                    dt = _dt.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                    time_part = dt.strftime("%H:%M"); date_part = dt.strftime("%d.%m.%y")
-                except Exception:
-                    time_part = ""; date_part = ""
-                line_parts = []
-                if time_part:
-                    line_parts.append(time_part)
-                if category:
-                    line_parts.append(f"Категория: {category}")
-                if address:
-                    line_parts.append(str(address))
-                if problem:
-                    line_parts.append(str(problem))
-                if phone:
-                    line_parts.append(f"тел: {phone}")
-                if who:
-                    line_parts.append(who)
-                if brigade_number:
-                    # Отображаем номер бригады без суффикса .бр если он есть
-                    brigade_display = str(brigade_number).replace(".бр", "").strip()
-                    if brigade_display:
-                        line_parts.append(f"бригада: {brigade_display}")
-                text_line = " — ".join(line_parts)
-                # Правый текст: дата/время и статус
-                right_text = ""
-                try:
-                    right_text = (date_part + (" " + time_part if time_part else "")).strip()
-                    if status_full:
-                        right_text = (right_text + (" — " if right_text else "") + status_full).strip()
-                except Exception:
-                    right_text = status_full or ""
-                sections[category_for(problem)].append((text_line, right_text))
-
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Бланк"
-            title = f"БЛАНК - СВЕДЕНИЙ  {day.strftime('%d.%m.%y')}"
-            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
-            ws.cell(row=1, column=1, value=title).font = Font(bold=True, size=14)
-            ws.cell(row=1, column=1).alignment = Alignment(horizontal="center")
-
-            thin = Side(style="thin")
-            border_all = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-            row_idx = 3
-            for section_name, lines in sections.items():
-                ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=6)
-                ws.cell(row=row_idx, column=1, value=section_name).font = Font(bold=True)
-                ws.cell(row=row_idx, column=1).alignment = Alignment(horizontal="left")
-                row_idx += 1
-                start_box = row_idx
-                if not lines:
-                    lines = [("", "")]
-                for line in lines:
-                    # line может быть строкой из старых форматов — приведём к кортежу
-                    if isinstance(line, tuple):
-                        left_text, right_text = line
-                    else:
-                        left_text, right_text = (str(line), "")
-                    # Слева объединяем столбцы A..E, справа пишем статус/дату в F с выравниванием вправо
-                    ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=5)
-                    ws.cell(row=row_idx, column=1, value=left_text)
-                    ws.cell(row=row_idx, column=1).alignment = Alignment(wrap_text=True)
-                    ws.cell(row=row_idx, column=6, value=right_text)
-                    ws.cell(row=row_idx, column=6).alignment = Alignment(horizontal="right")
-                    row_idx += 1
-                for r in range(start_box - 1, row_idx):
-                    for c in range(1, 7):
-                        ws.cell(row=r, column=c).border = border_all
-                row_idx += 1
-
-            ws.column_dimensions['A'].width = 16
-            for col in ['B', 'C', 'D', 'E']:
-                ws.column_dimensions[col].width = 24
-            ws.column_dimensions['F'].width = 44
             try:
-                sig_row = ws.max_row + 2
-                ws.merge_cells(start_row=sig_row, start_column=1, end_row=sig_row, end_column=3)
-                ws.cell(row=sig_row, column=1, value="Составил: __________________")
-                sig_row2 = sig_row + 1
-                ws.merge_cells(start_row=sig_row2, start_column=1, end_row=sig_row2, end_column=3)
-                ws.cell(row=sig_row2, column=1, value="Утвердил: __________________")
+                days = month_days(local_start.get_date(), datetime.now().date())
             except Exception:
-                pass
+                messagebox.showerror("Ошибка", "Выберите дату начала для формирования бланков")
+                return
+            if not days:
+                messagebox.showinfo("Результат", "Месяц ещё не начался")
+                return
+            first = days[0]
 
-            default_name = f"бланк_сведений_{day.strftime('%d.%m.%Y')}.xlsx"
-            save_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                initialfile=default_name,
-                filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
-                initialdir=(export_base_dir_var.get() or ""),
-            )
-            if not save_path:
+            db_files = _select_multiple_databases()
+            if db_files is None:
+                return  # Пользователь отменил выбор
+
+            parent_dir = filedialog.askdirectory(title="Каталог для бланков сведений",
+                                                 initialdir=(export_base_dir_var.get() or ""))
+            if not parent_dir:
                 messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
                 return
-            try:
-                wb.save(save_path)
-                messagebox.showinfo("Экспорт", f"Бланк сохранён:\n{save_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось сохранить файл: {e}")
+            target = os.path.join(parent_dir, month_blanks_dir_name(first))
+            if os.path.exists(target) and not messagebox.askyesno(
+                    "Бланки сведений", f"Каталог уже существует и будет заменён:\n{target}\n\nПродолжить?"):
+                return
+            _start_export_job(f"Бланки сведений за {month_label(first.year * 100 + first.month)}", target,
+                              lambda job: build_month_blanks(job, _execute_query_multiple_dbs, db_files, days,
+                                                             blank_classifier, blank_template()),
+                              notice="Бланки сохранены")
 
         def _export_daily_blank_custom():
             """Бланк сведений за выбранную дату."""
+            if not _openpyxl_available():
+                return
             try:
-                from openpyxl import Workbook
-                from openpyxl.styles import Font, Alignment, Border, Side
                 from tkcalendar import DateEntry
             except ImportError as e:
-                messagebox.showerror("Ошибка", f"Не установлен openpyxl или tkcalendar: {e}\n\npip install openpyxl tkcalendar")
+                messagebox.showerror("Ошибка", f"Не установлен tkcalendar: {e}\n\npip install tkcalendar")
                 return
 
             # Окно выбора даты
@@ -2754,6 +2008,7 @@ def open_main_window(user):
             date_entry.grid(row=0, column=1, sticky=tk.W, padx=(10, 0), pady=5)
             date_entry.set_date(datetime.now())
 
+            @stall_watchdog.track(name="_export_daily_blank_custom")
             def export_with_date():
                 try:
                     day = date_entry.get_date()
@@ -2767,235 +2022,7 @@ def open_main_window(user):
                 if db_files is None:
                     return  # Пользователь отменил выбор
                 
-                day_sql = day.strftime("%Y-%m-%d")
-
-                def execute_query(cursor_to_use):
-                    cursor_to_use.execute(
-                        """
-                        SELECT r.problem, r.address, r.phone, r.name, r.surname, r.brigade_number, COALESCE(r.created_at, r.date), r.status, r.category
-                        FROM records r
-                        WHERE date(r.date) = date(?)
-                        ORDER BY r.id ASC
-                        """,
-                        (day_sql,)
-                    )
-                    return cursor_to_use.fetchall()
-
-                try:
-                    rows = _execute_query_multiple_dbs(execute_query, db_files)
-                except Exception as e:
-                    messagebox.showerror("Ошибка", f"Ошибка чтения из базы: {e}")
-                    return
-
-                def category_for(problem_text: str) -> str:
-                    t = (problem_text or "").lower()
-                    
-                    # Сначала проверяем, есть ли категория в скобках в самом тексте проблемы
-                    # Формат: "содержание (категория)" - извлекаем категорию из скобок
-                    import re
-                    # Ищем категорию в скобках, но не "срок выполнения"
-                    category_match = re.search(r'\(([^)]+)\)', t)
-                    if category_match:
-                        category_in_parens = category_match.group(1).lower().strip()
-                        # Игнорируем "срок выполнения" и другие служебные скобки
-                        if "срок" not in category_in_parens and "выполнен" not in category_in_parens:
-                            # Маппинг категорий из скобок в названия секций бланка
-                            category_map = {
-                                "канализация": "КАНАЛИЗАЦИЯ",
-                                "водопровод": "ВОДОПРОВОД",
-                                "водоотведение": "КАНАЛИЗАЦИЯ",
-                                "водоснабжение": "ВОДОПРОВОД",
-                                "перекладка": "ПЕРЕКЛАДКА",
-                                "в/колонки": "В/КОЛОНКИ",
-                                "колонки": "В/КОЛОНКИ",
-                                "пожарные гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                                "гидранты": "ПОЖАРНЫЕ ГИДРАНТЫ",
-                                "частные врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                                "врезки": "ЧАСТНЫЕ ВРЕЗКИ",
-                            }
-                            # Проверяем точное совпадение или частичное
-                            for key, value in category_map.items():
-                                if key in category_in_parens:
-                                    return value
-                            # Если не нашли точное совпадение, пробуем по первым словам
-                            if "канализац" in category_in_parens:
-                                return "КАНАЛИЗАЦИЯ"
-                            if "водопровод" in category_in_parens or "водоснабж" in category_in_parens:
-                                return "ВОДОПРОВОД"
-                            if "перекладк" in category_in_parens:
-                                return "ПЕРЕКЛАДКА"
-                            if "колонк" in category_in_parens:
-                                return "В/КОЛОНКИ"
-                            if "гидрант" in category_in_parens:
-                                return "ПОЖАРНЫЕ ГИДРАНТЫ"
-                            if "врезк" in category_in_parens:
-                                return "ЧАСТНЫЕ ВРЕЗКИ"
-                    
-                    # Проверяем маппинг из problem_to_blank_category (используем оригинальный problem_text)
-                    try:
-                        problem_clean = clean_problem_text(problem_text).lower()
-                        if problem_clean in problem_to_blank_category:
-                            return problem_to_blank_category[problem_clean]
-                    except Exception:
-                        pass
-                    
-                    if "перекладк" in t or "прокладк" in t:
-                        return "ПЕРЕКЛАДКА"
-                    if "разрытие" in t and "восстанов" not in t:
-                        return "ПЕРЕКЛАДКА"
-                    if "прокол" in t:
-                        return "ПЕРЕКЛАДКА"
-                    if "замен" in t and "водовод" in t:
-                        return "ПЕРЕКЛАДКА"
-                    if "врезк" in t and "водопровод" in t and "частн" not in t:
-                        return "ПЕРЕКЛАДКА"
-                    
-                    if ("врезк" in t and "частн" in t) or ("ч/" in t and "врезк" in t) or \
-                       ("частн" in t and "врезк" in t):
-                        return "ЧАСТНЫЕ ВРЕЗКИ"
-                    
-                    if "гидрант" in t or "пг" in t:
-                        return "ПОЖАРНЫЕ ГИДРАНТЫ"
-                    
-                    if "колонк" in t:
-                        return "В/КОЛОНКИ"
-                    
-                    if "течь" in t and "канализац" not in t:
-                        return "ВОДОПРОВОД"
-                    if "замен" in t and "кран" in t:
-                        return "ВОДОПРОВОД"
-                    if "открыт" in t and ("в/к" in t or "в/колонк" in t):
-                        return "ВОДОПРОВОД"
-                    if ("перекрыт" in t or "открыт" in t) and ("х/в" in t or "холодн" in t):
-                        return "ВОДОПРОВОД"
-                    if "восстанов" in t and ("благоустр" in t or "разрытие" in t):
-                        return "ВОДОПРОВОД"
-                    if ("слаб" in t or "сл." in t) and ("давл" in t or "х/в" in t or "холодн" in t):
-                        return "ВОДОПРОВОД"
-                    if "водопровод" in t:
-                        return "ВОДОПРОВОД"
-                    
-                    if ("засор" in t) or ("колодец" in t and ("канализац" in t or "забой" in t)) or ("канализац" in t):
-                        return "КАНАЛИЗАЦИЯ"
-                    
-                    return "ВОДОПРОВОД"
-
-                sections = {
-                    "ПЕРЕКЛАДКА": [],
-                    "ВОДОПРОВОД": [],
-                    "В/КОЛОНКИ": [],
-                    "ПОЖАРНЫЕ ГИДРАНТЫ": [],
-                    "ЧАСТНЫЕ ВРЕЗКИ": [],
-                    "КАНАЛИЗАЦИЯ": [],
-                }
-
-                for rec in rows:
-                    if len(rec) >= 9:
-                        problem, address, phone, name_, surname_, brigade_number, dt_str, status_full, category = rec
-                    else:
-                        problem, address, phone, name_, surname_, brigade_number, dt_str, status_full = rec
-                        category = ""
-                    who = " ".join([p for p in [name_ or "", surname_ or ""] if p]).strip()
-                    time_part = ""; date_part = ""
-                    try:
-                        from datetime import datetime as _dt
-                        dt = _dt.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-                        time_part = dt.strftime("%H:%M"); date_part = dt.strftime("%d.%m.%y")
-                    except Exception:
-                        time_part = ""; date_part = ""
-                    line_parts = []
-                    if time_part:
-                        line_parts.append(time_part)
-                    if category:
-                        line_parts.append(f"Категория: {category}")
-                    if address:
-                        line_parts.append(str(address))
-                    if problem:
-                        line_parts.append(str(problem))
-                    if phone:
-                        line_parts.append(f"тел: {phone}")
-                    if who:
-                        line_parts.append(who)
-                    if brigade_number:
-                        # Отображаем номер бригады без суффикса .бр если он есть
-                        brigade_display = str(brigade_number).replace(".бр", "").strip()
-                        if brigade_display:
-                            line_parts.append(f"бригада: {brigade_display}")
-                    text_line = " — ".join(line_parts)
-                    right_text = ""
-                    try:
-                        right_text = (date_part + (" " + time_part if time_part else "")).strip()
-                        if status_full:
-                            right_text = (right_text + (" — " if right_text else "") + status_full).strip()
-                    except Exception:
-                        right_text = status_full or ""
-                    sections[category_for(problem)].append((text_line, right_text))
-
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Бланк"
-                title = f"БЛАНК - СВЕДЕНИЙ  {day.strftime('%d.%m.%y')}"
-                ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=6)
-                ws.cell(row=1, column=1, value=title).font = Font(bold=True, size=14)
-                ws.cell(row=1, column=1).alignment = Alignment(horizontal="center")
-
-                thin = Side(style="thin")
-                border_all = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-                row_idx = 3
-                for section_name, lines in sections.items():
-                    ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=6)
-                    ws.cell(row=row_idx, column=1, value=section_name).font = Font(bold=True)
-                    ws.cell(row=row_idx, column=1).alignment = Alignment(horizontal="left")
-                    row_idx += 1
-                    start_box = row_idx
-                    if not lines:
-                        lines = [("", "")]
-                    for line in lines:
-                        if isinstance(line, tuple):
-                            left_text, right_text = line
-                        else:
-                            left_text, right_text = (str(line), "")
-                        ws.merge_cells(start_row=row_idx, start_column=1, end_row=row_idx, end_column=5)
-                        ws.cell(row=row_idx, column=1, value=left_text)
-                        ws.cell(row=row_idx, column=1).alignment = Alignment(wrap_text=True)
-                        ws.cell(row=row_idx, column=6, value=right_text)
-                        ws.cell(row=row_idx, column=6).alignment = Alignment(horizontal="right")
-                        row_idx += 1
-                    for r in range(start_box - 1, row_idx):
-                        for c in range(1, 7):
-                            ws.cell(row=r, column=c).border = border_all
-                    row_idx += 1
-
-                ws.column_dimensions['A'].width = 16
-                for col in ['B', 'C', 'D', 'E']:
-                    ws.column_dimensions[col].width = 24
-                ws.column_dimensions['F'].width = 44
-                try:
-                    sig_row = ws.max_row + 2
-                    ws.merge_cells(start_row=sig_row, start_column=1, end_row=sig_row, end_column=3)
-                    ws.cell(row=sig_row, column=1, value="Составил: __________________")
-                    sig_row2 = sig_row + 1
-                    ws.merge_cells(start_row=sig_row2, start_column=1, end_row=sig_row2, end_column=3)
-                    ws.cell(row=sig_row2, column=1, value="Утвердил: __________________")
-                except Exception:
-                    pass
-
-                default_name = f"бланк_сведений_{day.strftime('%d.%m.%Y')}.xlsx"
-                save_path = filedialog.asksaveasfilename(
-                    defaultextension=".xlsx",
-                    initialfile=default_name,
-                    filetypes=[("Excel файлы", "*.xlsx"), ("Все файлы", "*.*")],
-                    initialdir=(export_base_dir_var.get() or ""),
-                )
-                if not save_path:
-                    messagebox.showinfo("Отмена", "Экспорт отменён пользователем")
-                    return
-                try:
-                    wb.save(save_path)
-                    messagebox.showinfo("Экспорт", f"Бланк сохранён:\n{save_path}")
-                except Exception as e:
-                    messagebox.showerror("Ошибка", f"Ошибка сохранения: {e}")
+                _submit_daily_blank(day, db_files)
 
             btns = ttk.Frame(frm, padding="10")
             btns.grid(row=1, column=0, columnspan=2, sticky=(tk.E, tk.W))
@@ -3008,11 +2035,14 @@ def open_main_window(user):
             export_menu.add_command(label="Экспорт текущего списка (локальные фильтры)", command=_export_current_list)
             export_menu.add_command(label="Экспорт за период (локальные даты)", command=_export_full_period_local)
             export_menu.add_command(label="Экспорт с фильтрами (локальные)", command=_export_filtered_local)
+            export_menu.add_command(label="Выгрузка CSV/TSV (локальные фильтры)", command=_export_csv_local)
             export_menu.add_separator()
             export_menu.add_command(label="Отчёт за сутки (локальная дата начала)", command=lambda: _export_summary_local("day"))
             export_menu.add_command(label="Отчёт за неделю (локальная дата конца)", command=lambda: _export_summary_local("week"))
             export_menu.add_command(label="Бланк сведений за сутки (локальная дата начала)", command=_export_daily_blank_local)
             export_menu.add_command(label="Бланк сведений (выбор даты)", command=_export_daily_blank_custom)
+            export_menu.add_command(label="Бланки сведений за месяц (месяц локальной даты начала)",
+                                    command=_export_month_blanks_local)
 
             def open_export_menu(event=None):
                 try:
@@ -3038,7 +2068,7 @@ def open_main_window(user):
         columns = ('ID', 'Наименование', 'Фамилия', 'Категория', 'Содержание заявки', 'Номер бригады', 'Телефон', 'Адрес', 'Дата', 'Время', 'Постановка', 'Состояние', 'Пользователь')
         records_tree = ttk.Treeview(frame_list, columns=columns, show='headings', height=22)
         for col in columns:
-            records_tree.heading(col, text=col)
+            records_tree.heading(col, text=col, command=lambda c=col: sort_records_by(c))
             if col == 'ID':
                 records_tree.column(col, width=70, minwidth=60, stretch=False)
             elif col in ('Наименование', 'Фамилия', 'Пользователь'):
@@ -3060,11 +2090,41 @@ def open_main_window(user):
         records_tree.tag_configure('header', background='#e0e0e0', font=('', 10, 'bold'))
         scrollbar_y = ttk.Scrollbar(frame_list, orient="vertical", command=records_tree.yview)
         scrollbar_x = ttk.Scrollbar(frame_list, orient="horizontal", command=records_tree.xview)
-        records_tree.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+        def _records_yscroll(first, last):
+            scrollbar_y.set(first, last)
+            # Дочитываем отсортированный список, когда видна его нижняя часть
+            try:
+                if float(last) >= 0.9:
+                    _records_need_more()
+            except Exception:
+                pass
+
+        records_tree.configure(yscrollcommand=_records_yscroll, xscrollcommand=scrollbar_x.set)
         records_tree.grid(row=0, column=0, sticky="nsew")
+        _update_sort_headings()
         scrollbar_y.grid(row=0, column=1, sticky="ns")
         scrollbar_x.grid(row=1, column=0, sticky="ew")
 
+        # Панель фоновых выгрузок: появляется с первой выгрузкой
+        frame_jobs = ttk.LabelFrame(records_window, text="Выгрузки", padding="8")
+        # Строка 3 — кнопки под списком, панель выгрузок ниже них; растягивается только список
+        frame_jobs.grid(row=4, column=0, padx=12, pady=(0, 8), sticky="ew")
+        frame_jobs.columnconfigure(1, weight=1)
+        export_job_var = tk.StringVar(value="")
+        ttk.Label(frame_jobs, textvariable=export_job_var, width=48).grid(row=0, column=0, sticky="w")
+        export_job_bar = ttk.Progressbar(frame_jobs, mode="determinate", maximum=100)
+        export_job_bar.grid(row=0, column=1, sticky="ew", padx=8)
+        export_cancel_button = ttk.Button(frame_jobs, text="Отменить", state="disabled", command=_cancel_export_job)
+        export_cancel_button.grid(row=0, column=2)
+        job_columns = ("Выгрузка", "Файл", "Строк", "Время", "Состояние")
+        export_jobs_tree = ttk.Treeview(frame_jobs, columns=job_columns, show="headings", height=4)
+        for col, width in zip(job_columns, (220, 260, 80, 80, 220)):
+            export_jobs_tree.heading(col, text=col)
+            export_jobs_tree.column(col, width=width, stretch=(col == "Файл"))
+        export_jobs_tree.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(6, 0))
+        if not export_jobs.jobs():
+            frame_jobs.grid_remove()
+
         # Копирование выбранной строки в буфер обмена (двойной клик по строке или Ctrl+C)
         def _copy_selected_row(event=None):
             try:
@@ -3114,18 +2174,36 @@ def open_main_window(user):
             pass
 
         # ---- Кнопки администратора ----
-        def delete_record():
+        def _selected_record():
+            """(база, id, строка из хранилища) выбранной записи или None.
+            Запись правится в своей базе, а не в текущей: id в разных месяцах повторяются."""
             selection = records_tree.selection()
-            if not selection:
+            source = _records_row_source(selection[0]) if selection else None
+            if source is None:
                 messagebox.showwarning("Ошибка", "Выберите запись")
+                return None
+            path, record_id = source
+            row = record_store.fetch(path, [record_id]).get(record_id)
+            if row is None:
+                messagebox.showwarning("Ошибка", "Запись не найдена (возможно, удалена)")
+                return None
+            return path, record_id, row
+
+        def _connection_for(path):
+            if shard_key(path) == shard_key(current_db_file):
+                return conn
+            return record_store.connection(path)
+
+        @stall_watchdog.track
+        def delete_record():
+            selected = _selected_record()
+            if selected is None:
                 return
-            record_id = records_tree.item(selection[0])['values'][0]
+            path, record_id, row = selected
 
             # Проверка прав: обычный пользователь может удалять только свои записи
             if user[3] != "admin":
-                cursor.execute("SELECT user_id FROM records WHERE id=?", (record_id,))
-                rec = cursor.fetchone()
-                if not rec or rec[0] != user[0]:
+                if row[COL_USER_ID] != user[0]:
                     messagebox.showwarning("Ошибка", "Вы можете удалять только свои записи")
                     return
 
@@ -3133,26 +2211,19 @@ def open_main_window(user):
             if not confirm:
                 return
 
-            cursor.execute("DELETE FROM records WHERE id=?", (record_id,))
-            conn.commit()
-            refresh_records_default()
-            try:
-                refresh_recent()
-            except Exception:
-                pass
+            write_conn = _connection_for(path)
+            write_conn.execute("DELETE FROM records WHERE id=?", (record_id,))
+            write_conn.commit()
+            _after_local_write()
 
         def edit_record():
-            selection = records_tree.selection()
-            if not selection:
-                messagebox.showwarning("Ошибка", "Выберите запись")
+            selected = _selected_record()
+            if selected is None:
                 return
-            record_id = records_tree.item(selection[0])['values'][0]
+            path, record_id, row = selected
 
             # Все пользователи могут редактировать любые записи
-            cursor.execute("SELECT name, surname, problem, phone, address, assignment_date, status, improvement, brigade_number, category FROM records WHERE id= ?", (record_id,))
-            rec = cursor.fetchone()
-            if not rec:
-                return
+            rec = (row[1], row[2], row[4], row[6], row[7], row[9], row[10], row[COL_IMPROVEMENT], row[5], row[3])
 
             edit_win = tk.Toplevel(main)
             setup_scaling()
@@ -3179,42 +2250,9 @@ def open_main_window(user):
             surname_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
             surname_entry.insert(0, rec[1])
 
-            # Определение категорий (такие же как в основной форме)
-            problem_categories_edit = {
-                "водоотведение": [
-                    "забой канализационного колодца",
-                    "течь канализации по дороге",
-                ],
-                "водоснабжение": [
-                    "течь воды",
-                    "течь в / колонки",
-                    "течь из-под земли",
-                    "течь пожарного гидранта",
-                    "течь из -под асфальта",
-                    "течь трассы холодной воды",
-                    "откачка воды из колодца",
-                    "дефект водоразборной колонки",
-                    "ржавая холодная вода в жилом фонде",
-                    "Не работает в / колонка",
-                    "слабое давление х/в",
-                    "восстановить в/колонку",
-                    "течь в/к",
-                    "нет х/в"
-                ],
-                "общие": [
-                    "перекладка",
-                    "водопровод",
-                    "частные врезки",
-                    "открыт колодец (отсутствие/несоответствие крышки)",
-                    "восстановление асфальтобетонного покрытия",
-                    "разрушена плита колодца",
-                    "привести к/к в нормативное состояние",
-                    "привести в / к в нормативное состояние",
-                    "обвал в/к",
-                    "обвал к/к",
-                ]
-            }
-            
+            # Категории — из справочника, как в основной форме
+            problem_categories_edit = problem_categories
+
             # Загружаем категорию из записи
             saved_category = rec[9] if len(rec) > 9 else ""
             category_display = saved_category if saved_category else ""
@@ -3226,20 +2264,11 @@ def open_main_window(user):
 
             ttk.Label(frm, text="Содержание заявки:").grid(row=3, column=0, sticky=tk.W, pady=5)
             # Разбираем исходный текст проблемы: отделяем срок выполнения, если он был сохранён ранее
-            _orig_problem_text = rec[2] or ""
-            try:
-                # Ищем число часов в самых распространённых форматах
-                _m_deadline = (
-                    re.search(r"\(\s*срок\s+выполнения\s*(\d+)\s*ч\s*\)", _orig_problem_text, flags=re.IGNORECASE)
-                    or re.search(r"срок\s+выполнения\s*[:\-]?\s*(\d+)\s*ч", _orig_problem_text, flags=re.IGNORECASE)
-                    or re.search(r"\b(\d+)\s*ч\b", _orig_problem_text)
-                )
-                _prefill_deadline = _m_deadline.group(1) if _m_deadline else ""
-                # Удаляем фрагмент со сроком из текста проблемы, если он в скобках
-                _base_problem_text = re.sub(r"\(\s*срок\s+выполнения\s*\d+\s*ч\s*\)", "", _orig_problem_text, flags=re.IGNORECASE).strip()
-            except Exception:
-                _prefill_deadline = ""
-                _base_problem_text = _orig_problem_text
+            _parsed_problem = parse_problem(rec[2] or "")
+            # Число часов — в самых распространённых форматах (см. problems.py)
+            _prefill_deadline = _parsed_problem.hours_hint
+            # Фрагмент со сроком в скобках из текста проблемы убираем
+            _base_problem_text = _parsed_problem.entry_text
             problem_var = tk.StringVar(value=_base_problem_text)
             
             def update_problem_options_edit(*args):
@@ -3314,6 +2343,7 @@ def open_main_window(user):
             improvement_entry.grid(row=10, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=5)
             improvement_entry.insert(0, rec[7] or "")
 
+            @stall_watchdog.track
             def save_changes():
                 new_name = name_entry.get()
                 new_surname = surname_entry.get()
@@ -3359,15 +2389,12 @@ def open_main_window(user):
                     if not new_brigade_number.endswith(".бр"):
                         new_brigade_number = f"{new_brigade_number}.бр"
                 new_category = category_var_edit.get()
-                cursor.execute("UPDATE records SET name=?, surname=?, problem=?, phone=?, address=?, assignment_date=?, status=?, improvement=?, brigade_number=?, category=? WHERE id=?",
-                               (new_name, new_surname, new_problem, new_phone, new_address, new_assignment, new_status, new_improvement, new_brigade_number, new_category, record_id))
-                conn.commit()
-                refresh_records_default()
+                write_conn = _connection_for(path)
+                write_conn.execute("UPDATE records SET name=?, surname=?, problem=?, phone=?, address=?, assignment_date=?, status=?, improvement=?, brigade_number=?, category=?, blank_category=? WHERE id=?",
+                                   (new_name, new_surname, new_problem, new_phone, new_address, new_assignment, new_status, new_improvement, new_brigade_number, new_category, blank_classifier(new_problem), record_id))
+                write_conn.commit()
                 edit_win.destroy()
-                try:
-                    refresh_recent()
-                except Exception:
-                    pass
+                _after_local_write()
 
             btns = ttk.Frame(edit_win, padding="10")
             btns.grid(row=1, column=0, sticky=(tk.E, tk.W))
@@ -3378,14 +2405,11 @@ def open_main_window(user):
 
         # Функция изменения статуса - доступна всем пользователям
         def update_status_record():
-            selection = records_tree.selection()
-            if not selection:
-                messagebox.showwarning("Ошибка", "Выберите запись")
+            selected = _selected_record()
+            if selected is None:
                 return
-            record_id = records_tree.item(selection[0])['values'][0]
-
-            cursor.execute("SELECT status FROM records WHERE id=?", (record_id,))
-            rec = cursor.fetchone()
+            path, record_id, row = selected
+            rec = (row[10],)
             try:
                 curr_status = re.sub(r"\s*\(\d{2}\.\d{2}\.\d{4}\s+\d{2}:\d{2}\)\s*$", "", ((rec[0] if rec else "не выполнено") or "не выполнено")).strip()
             except Exception:
@@ -3409,18 +2433,16 @@ def open_main_window(user):
             st_combo = ttk.Combobox(frm, textvariable=st_var, values=["в работе", "не выполнено", "выполнено"], state="readonly", width=22)
             st_combo.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(10, 0), pady=6)
 
+            @stall_watchdog.track
             def save_status():
                 base_status = st_var.get()
                 ts = datetime.now().strftime("%d.%m.%Y %H:%M")
                 new_status = f"{base_status} ({ts})"
-                cursor.execute("UPDATE records SET status=? WHERE id=?", (new_status, record_id))
-                conn.commit()
-                refresh_records_default()
+                write_conn = _connection_for(path)
+                write_conn.execute("UPDATE records SET status=? WHERE id=?", (new_status, record_id))
+                write_conn.commit()
                 st_win.destroy()
-                try:
-                    refresh_recent()
-                except Exception:
-                    pass
+                _after_local_write()
 
             btns = ttk.Frame(st_win, padding="10")
             btns.grid(row=1, column=0, sticky=(tk.E, tk.W))
@@ -3437,47 +2459,36 @@ def open_main_window(user):
         btn_status = ttk.Button(button_frame, text="Изменить статус", command=update_status_record)
         btn_status.pack(side="left", padx=10)
 
-        # Первичное заполнение — без сохранения фильтров (показываем все записи)
+        # Первичное заполнение — без сохранения фильтров (все записи, начиная с текущего месяца)
         try:
-            rows = get_filtered_rows_for(None, None, None, None, None, None)
-            populate_tree_from_rows(rows)
+            load_records_progressive(all_databases())
         except Exception:
             try:
-                rows = get_filtered_rows(None)
-                populate_tree_from_rows(rows)
+                refresh_records_default()
             except Exception:
                 pass
 
         def on_close():
-            nonlocal records_window, records_tree
+            # Не уничтожаем окно: виджеты, фильтры и загруженный список остаются до
+            # следующего открытия. Фоновая загрузка продолжается и в скрытом окне.
             try:
-                records_window.destroy()
-            finally:
-                records_window = None
-                records_tree = None
+                records_window.withdraw()
+            except Exception:
+                pass
 
         records_window.protocol("WM_DELETE_WINDOW", on_close)
 
     # ---- Фоновый опрос базы и автообновление ----
+    @stall_watchdog.track
     def _poll_updates():
-        nonlocal last_seen_recent_sig, records_window
         try:
-            current_sig = _get_recent_signature()
+            change_watcher.watch(_watched_db_files())
+            change_watcher.poll()
         except Exception:
-            current_sig = None
-        if current_sig and current_sig != last_seen_recent_sig:
-            last_seen_recent_sig = current_sig
-            try:
-                refresh_recent()
-            except Exception:
-                pass
-            try:
-                if records_window and records_window.winfo_exists():
-                    refresh_records_default()
-            except Exception:
-                pass
+            pass
+        refbook_watcher.poll()
         try:
-            main.after(3000, _poll_updates)
+            main.after(change_watcher.next_delay_ms(), _poll_updates)
         except Exception:
             pass
 
@@ -3611,4 +2622,5 @@ def open_login_window():
 
     login_window.mainloop()
 
-open_login_window()
+if __name__ == "__main__":
+    open_login_window()
@@ -0,0 +1,213 @@
+"""Разбор текста проблемы заявки — один на все места, где он нужен.
+
+Текст проблемы («Течь воды (водопровод) (срок выполнения 4 ч)») разбирают
+форма добавления и правки, поиск, выгрузки, бланк сведений и краткий отчёт.
+Раньше каждый из них заново переводил строку в нижний регистр и прогонял свои
+регулярные выражения. parse_problem разбирает текст один раз: шаблоны
+скомпилированы заранее, результат — неизменяемый ParsedProblem — запоминается
+по исходному тексту (LRU на PROBLEM_CACHE_SIZE формулировок; формулировки в
+базе часто повторяются).
+
+Здесь же правила по тексту: вид неисправности для краткого отчёта
+(classify_problem) и раздел бланка сведений по категории в скобках и по
+ключевым словам. Таблицу содержаний из справочника (refbook.py) разбор не
+учитывает — её применяет blank.BlankClassifier, иначе запомненный результат
+зависел бы от версии справочника. Модуль не зависит от tkinter.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+PEREKLADKA = "ПЕРЕКЛАДКА"
+VODOPROVOD = "ВОДОПРОВОД"
+KOLONKI = "В/КОЛОНКИ"
+GIDRANTY = "ПОЖАРНЫЕ ГИДРАНТЫ"
+VREZKI = "ЧАСТНЫЕ ВРЕЗКИ"
+KANALIZACIYA = "КАНАЛИЗАЦИЯ"
+
+# Сколько различных формулировок помнить
+PROBLEM_CACHE_SIZE = 16384
+
+# Категория в скобках в тексте проблемы: (раздел, основы слов) по порядку проверки
+_PAREN_RULES = (
+    (KANALIZACIYA, ("канализац",)),
+    (VODOPROVOD, ("водопровод", "водоснабж")),
+    (PEREKLADKA, ("перекладк",)),
+    (KOLONKI, ("колонк",)),
+    (GIDRANTY, ("гидрант",)),
+    (VREZKI, ("врезк",)),
+    (KANALIZACIYA, ("водоотведение",)),
+)
+
+# Ключевые слова: (раздел, группы — в тексте есть хотя бы одно слово каждой группы,
+# исключения — ни одного из слов). Первое сработавшее правило определяет раздел.
+_KEYWORD_RULES = (
+    # ПЕРЕКЛАДКА: прокладка/врезка водопровода, разрытие, прокол, замена водовода
+    (PEREKLADKA, (("перекладк", "прокладк"),), ()),
+    (PEREKLADKA, (("разрытие",),), ("восстанов",)),
+    (PEREKLADKA, (("прокол",),), ()),
+    (PEREKLADKA, (("замен",), ("водовод",)), ()),
+    (PEREKLADKA, (("врезк",), ("водопровод",)), ("частн",)),
+    # ЧАСТНЫЕ ВРЕЗКИ: ч/врезка, частная врезка
+    (VREZKI, (("врезк",), ("частн", "ч/")), ()),
+    # ПОЖАРНЫЕ ГИДРАНТЫ: неисправен ПГ, нет воды в ПГ
+    (GIDRANTY, (("гидрант", "пг"),), ()),
+    (KOLONKI, (("колонк",),), ()),
+    # ВОДОПРОВОД: течь (кроме канализации), замена крана, открыт в/к, перекрыть/открыть х/в,
+    # восстановить благоустройство/разрытие, слабое давление х/в
+    (VODOPROVOD, (("течь",),), ("канализац",)),
+    (VODOPROVOD, (("замен",), ("кран",)), ()),
+    (VODOPROVOD, (("открыт",), ("в/к",)), ()),
+    (VODOPROVOD, (("перекрыт", "открыт"), ("х/в", "холодн")), ()),
+    (VODOPROVOD, (("восстанов",), ("благоустр", "разрытие")), ()),
+    (VODOPROVOD, (("слаб", "сл."), ("давл", "х/в", "холодн")), ()),
+    (VODOPROVOD, (("водопровод",),), ()),
+    # КАНАЛИЗАЦИЯ: засор, канализационный колодец
+    (KANALIZACIYA, (("засор", "канализац"),), ()),
+    (KANALIZACIYA, (("колодец",), ("забой",)), ()),
+)
+
+_PARENS_RE = re.compile(r"\(([^)]+)\)")
+_ALL_PARENS_RE = re.compile(r"\s*\([^)]*\)")
+_DEADLINE_PARENS_RE = re.compile(r"\([^)]*срок[^)]*выполнен[^)]*\)", re.IGNORECASE)
+# «(срок выполнения ...)» — так срок дописывает к тексту форма заявки
+_DEADLINE_RE = re.compile(r"\((\s*срок\s+выполнения\s*[^)]*)\)", re.IGNORECASE)
+_DEADLINE_HOURS_RE = re.compile(r"\(\s*срок\s+выполнения\s*(\d+)\s*ч\s*\)", re.IGNORECASE)
+# Срок в свободной записи старых заявок: «срок выполнения: 4 ч», «4 ч»
+_LOOSE_HOURS_RES = (
+    re.compile(r"срок\s+выполнения\s*[:\-]?\s*(\d+)\s*ч", re.IGNORECASE),
+    re.compile(r"\b(\d+)\s*ч\b"),
+)
+
+
+class ParsedProblem(NamedTuple):
+    """Разобранный текст проблемы. Пустой текст — все поля пустые (раздел — ВОДОПРОВОД)."""
+    raw: str              # исходный текст
+    folded: str           # исходный текст в нижнем регистре (поиск)
+    text: str             # без категорий в скобках, срок выполнения сохранён (см. clean_problem_text)
+    key: str              # text в нижнем регистре — ключ таблицы содержаний справочника
+    body: str             # без «(срок выполнения ...)»
+    deadline: str         # «срок выполнения 4 ч» из скобок или ""
+    deadline_hours: str   # часы из «(срок выполнения 4 ч)» или ""
+    hours_hint: str       # часы из скобок или свободной записи — подсказка в форме правки
+    bracket: str          # категория в первых скобках (в нижнем регистре), если это не срок
+    bucket: str           # вид неисправности для краткого отчёта (см. classify_problem)
+    blank_section: str    # раздел бланка по скобкам или ключевым словам
+    by_bracket: bool      # blank_section определён по категории в скобках
+    entry_text: str       # без «(срок выполнения N ч)» — часы вынесены в отдельное поле формы
+
+
+def clean_problem_text(problem_text: str) -> str:
+    """
+    Удаляет категорию из скобок из текста проблемы.
+    Например: "Течь канализации по дороге (канализация)" -> "Течь канализации по дороге"
+    Но сохраняет "срок выполнения" в скобках.
+    """
+    if not problem_text:
+        return ""
+    return parse_problem(problem_text).text
+
+
+def _clean(raw: str) -> str:
+    deadline_match = _DEADLINE_PARENS_RE.search(raw)
+    cleaned = _ALL_PARENS_RE.sub("", raw)
+    if deadline_match:
+        cleaned = cleaned.strip() + " " + deadline_match.group(0)
+    return cleaned.strip()
+
+
+def _bucket(t: str) -> str:
+    """Вид неисправности по тексту проблемы в нижнем регистре (правила краткого отчёта)."""
+    is_accident = "ав" in t  # «ав.», «авар.», «авария»
+    # Течь канализации
+    if "течь" in t and ("канализац" in t or "к/к" in t or "коллектор" in t):
+        return "течь канализации"
+    # Течь воды (включая гидрант, водовод, колонки, трассу х/в)
+    if "течь" in t and ("вод" in t or "х/в" in t or "гидрант" in t or "колонк" in t or "трасс" in t):
+        return "течь воды"
+    # Авария на водоводе (не считать как течь)
+    if is_accident and ("водовод" in t or ("трасс" in t and "х/в" in t)) and "течь" not in t:
+        return "ав. на водоводе"
+    # Дефект колонки
+    if "дефект" in t and "колонк" in t:
+        return "дефект водоразборной колонки"
+    # Ржавая х/в
+    if "рж" in t and ("х/в" in t or ("холодн" in t and "вод" in t)):
+        return "рж. х/в"
+    # Засор канализации
+    if "засор" in t and "канализац" in t:
+        return "засор канализации"
+    # Авария на к/коллекторе
+    if is_accident and "к/коллектор" in t:
+        return "ав. на к/коллекторе"
+    # Прочие колодцы
+    if "забит" in t and "колодец" in t:
+        return "забит колодец"
+    if "открыт" in t and "колодец" in t:
+        return "открыт колодец"
+    return ""
+
+
+def _keyword_section(folded: str) -> str:
+    for section, groups, excluded in _KEYWORD_RULES:
+        if all(any(word in folded for word in group) for group in groups) and not any(word in folded for word in excluded):
+            return section
+    return VODOPROVOD
+
+
+@lru_cache(maxsize=PROBLEM_CACHE_SIZE)
+def _parse(raw: str) -> ParsedProblem:
+    folded = raw.lower()
+    text = _clean(raw)
+
+    stripped = raw.strip()
+    deadline = ""
+    body = stripped
+    m = _DEADLINE_RE.search(stripped)
+    if m:
+        deadline = m.group(1).strip()
+        body = _DEADLINE_RE.sub("", stripped).strip()
+    m = _DEADLINE_HOURS_RE.search(raw)
+    deadline_hours = m.group(1) if m else ""
+    entry_text = _DEADLINE_HOURS_RE.sub("", stripped).strip() if m else stripped
+    hours_hint = deadline_hours
+    if not hours_hint:
+        for pattern in _LOOSE_HOURS_RES:
+            m = pattern.search(raw)
+            if m:
+                hours_hint = m.group(1)
+                break
+
+    # Категория в скобках ("содержание (категория)"); скобки со сроком выполнения не в счёт
+    bracket = ""
+    m = _PARENS_RE.search(folded)
+    if m:
+        in_parens = m.group(1).strip()
+        if "срок" not in in_parens and "выполнен" not in in_parens:
+            bracket = in_parens
+    section = ""
+    if bracket:
+        for candidate, stems in _PAREN_RULES:
+            if any(stem in bracket for stem in stems):
+                section = candidate
+                break
+
+    return ParsedProblem(raw, folded, text, text.lower(), body, deadline, deadline_hours, hours_hint, bracket,
+                         _bucket(folded), section or _keyword_section(folded), bool(section), entry_text)
+
+
+def classify_problem(problem) -> str:
+    """Вид неисправности по тексту проблемы; "" — в краткий отчёт не попадает.
+    При изменении правил увеличить summary.RULES_VERSION."""
+    return parse_problem(problem).bucket
+
+
+def parse_problem(problem) -> ParsedProblem:
+    """Разбор текста проблемы (None — как пустой текст); результат запоминается по тексту."""
+    return _parse("" if problem is None else str(problem))
+
+
+def clear_cache() -> None:
+    """Сбрасывает запомненные разборы (для бенчмарков и после смены правил)."""
+    _parse.cache_clear()
@@ -0,0 +1,210 @@
+"""Запросы списка заявок по помесячным базам.
+
+RecordFilter описывает фильтры окна списка и строит условие WHERE для одной базы.
+Поиск по словам выполняется в SQL через функцию py_lower (str.lower из Python):
+встроенный LOWER в SQLite не понимает кириллицу, из-за чего раньше все строки
+читались в память и фильтровались в Python.
+
+iter_pages() читает одну базу страницами по первичному ключу (keyset):
+в памяти не бывает больше одной страницы. iter_sorted_pages() делает то же для
+сортировки по колонке: ORDER BY с типизированным ключом выполняется в SQLite,
+следующая страница начинается после (ключ, id) последней строки, а
+merge_sorted() сливает уже отсортированные потоки разных баз.
+"""
+
+import heapq
+from typing import NamedTuple
+
+from problems import parse_problem
+
+# Первые 12 колонок — в порядке колонок окна списка; дальше — для фильтра по дате,
+# проверки прав, диалога правки и сверки версий (см. store.COL_*)
+RECORD_COLUMNS = """r.id, r.name, r.surname, r.category, r.problem, r.brigade_number, r.phone, r.address,
+                   COALESCE(r.created_at, r.date) AS created_at,
+                   r.assignment_date, r.status, u.username,
+                   r.date, r.user_id, r.improvement, r.version"""
+
+# Индексы колонок RECORD_COLUMNS, по которым фильтр проверяет строку в памяти
+_KEYWORD_INDEXES = (1, 2, 3, 4, 6, 7, 11)
+_PROBLEM, _STATUS, _OPERATOR, _DATE = 4, 10, 11, 12
+
+# Строк в одной странице чтения
+PAGE_SIZE = 500
+
+# Поля, в которых ищется ключевое слово
+_KEYWORD_FIELDS = ("r.name", "r.surname", "r.category", "r.problem", "r.phone", "r.address", "u.username")
+
+
+# Ключи сортировки: SQL-выражения в порядке сравнения (id добавляется последним).
+# Даты сортируются по исходным строкам YYYY-MM-DD[ HH:MM:SS], а не по показанным dd.mm.yyyy;
+# номер бригады — как число, затем как текст. NULL заменён пустым значением того же типа,
+# чтобы ключи разных строк сравнивались и в SQL, и в Python при слиянии баз.
+SORT_KEYS = {
+    "id": (),
+    "name": ("py_lower(COALESCE(r.name, ''))",),
+    "surname": ("py_lower(COALESCE(r.surname, ''))",),
+    "category": ("py_lower(COALESCE(r.category, ''))",),
+    "problem": ("py_lower(COALESCE(r.problem, ''))",),
+    "brigade": ("CAST(COALESCE(r.brigade_number, '') AS INTEGER)", "py_lower(COALESCE(r.brigade_number, ''))"),
+    "phone": ("COALESCE(r.phone, '')",),
+    "address": ("py_lower(COALESCE(r.address, ''))",),
+    "created": ("COALESCE(r.created_at, r.date, '')",),
+    "time": ("substr(COALESCE(r.created_at, r.date, ''), 12)", "COALESCE(r.created_at, r.date, '')"),
+    "assignment": ("COALESCE(r.assignment_date, '')",),
+    "status": ("py_lower(COALESCE(r.status, ''))",),
+    "operator": ("py_lower(COALESCE(u.username, ''))",),
+}
+
+
+class SortOrder(NamedTuple):
+    key: str                 # ключ SORT_KEYS
+    descending: bool = False
+
+
+def _py_lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def register_functions(connection) -> None:
+    """Регистрирует в подключении py_lower — регистронезависимый поиск по кириллице."""
+    connection.create_function("py_lower", 1, _py_lower, deterministic=True)
+
+
+class RecordFilter(NamedTuple):
+    """Фильтры окна списка. Пустые значения не ограничивают выборку."""
+    keyword: str | None = None
+    problem: str | None = None
+    status: str | None = None
+    operator: str | None = None
+    start_date: str | None = None   # YYYY-MM-DD, учитывается вместе с end_date
+    end_date: str | None = None
+
+    def where(self):
+        """Возвращает (список условий, параметры)."""
+        clauses = []
+        params = []
+        if self.keyword:
+            if str(self.keyword).isdigit():
+                # Только цифры — поиск по ID
+                clauses.append("r.id = ?")
+                params.append(int(self.keyword))
+            else:
+                kw = str(self.keyword).lower()
+                clauses.append("(" + " OR ".join(
+                    f"instr(py_lower({field}), ?) > 0" for field in _KEYWORD_FIELDS) + ")")
+                params.extend([kw] * len(_KEYWORD_FIELDS))
+        if self.problem:
+            clauses.append("instr(py_lower(r.problem), ?) > 0")
+            params.append(str(self.problem).lower())
+        if self.status:
+            # Статус хранится с отметкой времени, фильтруем по префиксу
+            clauses.append("r.status LIKE ?")
+            params.append(self.status + "%")
+        if self.operator:
+            clauses.append("u.username = ?")
+            params.append(self.operator)
+        if self.start_date and self.end_date:
+            clauses.append("date(r.date) >= date(?) AND date(r.date) <= date(?)")
+            params.extend([self.start_date, self.end_date])
+        return clauses, params
+
+    def is_empty(self) -> bool:
+        return not any(self)
+
+    def matches(self, row) -> bool:
+        """То же условие, что where(), для строки RECORD_COLUMNS в памяти."""
+        if self.keyword:
+            if str(self.keyword).isdigit():
+                if row[0] != int(self.keyword):
+                    return False
+            else:
+                kw = str(self.keyword).lower()
+                if not any(kw in str(row[i] or "").lower() for i in _KEYWORD_INDEXES):
+                    return False
+        if self.problem and str(self.problem).lower() not in parse_problem(row[_PROBLEM]).folded:
+            return False
+        if self.status and not (row[_STATUS] or "").lower().startswith(self.status.lower()):
+            return False
+        if self.operator and row[_OPERATOR] != self.operator:
+            return False
+        if self.start_date and self.end_date:
+            day = str(row[_DATE] or "")[:10]
+            if len(day) != 10 or not (self.start_date <= day <= self.end_date):
+                return False
+        return True
+
+
+def iter_pages(cursor, flt: RecordFilter | None = None, page_size: int = PAGE_SIZE):
+    """Строки одной базы по возрастанию id страницами по page_size.
+
+    Каждая следующая страница начинается после последнего прочитанного id,
+    поэтому чтение не замедляется к концу базы, как LIMIT/OFFSET.
+    """
+    clauses, params = (flt or RecordFilter()).where()
+    clauses.append("r.id > ?")
+    sql = f"""SELECT {RECORD_COLUMNS}
+              FROM records r
+              LEFT JOIN common.users u ON r.user_id = u.id
+              WHERE {" AND ".join(clauses)}
+              ORDER BY r.id
+              LIMIT {int(page_size)}"""
+    last_id = 0
+    while True:
+        cursor.execute(sql, params + [last_id])
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1][0]
+
+
+def iter_sorted_pages(cursor, flt: RecordFilter | None, order: SortOrder, page_size: int = PAGE_SIZE):
+    """Строки одной базы в порядке order страницами по page_size.
+
+    К каждой строке в конце добавлены значения ключа сортировки и id — по ним
+    ищется начало следующей страницы и сливаются потоки баз (merge_sorted).
+    """
+    exprs = list(SORT_KEYS[order.key]) + ["r.id"]
+    direction = " DESC" if order.descending else ""
+    seek = f"({', '.join(exprs)}) {'<' if order.descending else '>'} ({', '.join('?' * len(exprs))})"
+    clauses, params = (flt or RecordFilter()).where()
+    base = f"""SELECT {RECORD_COLUMNS}, {", ".join(exprs)}
+               FROM records r
+               LEFT JOIN common.users u ON r.user_id = u.id"""
+    tail = f"ORDER BY {', '.join(e + direction for e in exprs)} LIMIT {int(page_size)}"
+    width = len(exprs)
+    last = None
+    while True:
+        where = clauses if last is None else clauses + [seek]
+        sql = base + (" WHERE " + " AND ".join(where) if where else "") + " " + tail
+        cursor.execute(sql, params if last is None else params + list(last))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][-width:]
+
+
+def merge_sorted(streams, order: SortOrder):
+    """Сливает строки из iter_sorted_pages нескольких баз в один упорядоченный поток.
+
+    streams — итераторы страниц в порядке баз; при равных ключах порядок задают
+    номер базы в streams и id. Возвращает пары (номер базы, строка без служебных
+    колонок ключа).
+    """
+    width = len(SORT_KEYS[order.key]) + 1
+
+    def rows_of(rank, pages):
+        for page in pages:
+            for row in page:
+                key = row[-width:]
+                yield key[:-1] + (rank,) + key[-1:], row[:-width]
+
+    merged = heapq.merge(*(rows_of(rank, pages) for rank, pages in enumerate(streams)),
+                         key=lambda item: item[0], reverse=order.descending)
+    for key, row in merged:
+        yield key[-2], row
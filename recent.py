@@ -0,0 +1,111 @@
+"""Буфер панели «Последние заявки».
+
+Панель показывает N самых новых заявок текущей базы. Вместо очистки таблицы и
+повторного JOIN-запроса при каждом обновлении буфер хранит id показанных записей
+с их версиями и при синхронизации делает один проход по первичному ключу
+(id >= наименьшего показанного) либо разбирает готовый список изменений из
+журнала (см. changes.py). Сами строки лежат в общем хранилище (store.RecordStore):
+их дочитывает хранилище, и только для новых и изменившихся заявок.
+"""
+
+from collections import OrderedDict
+
+from store import COL_VERSION
+
+
+class RecentBuffer:
+    """Последние N заявок одной базы (id -> version); строки — в RecordStore."""
+
+    def __init__(self, store, size: int = 11):
+        self.store = store
+        self.size = size
+        self.db_file = None
+        self.last_seen_id = 0
+        self._versions = OrderedDict()
+
+    def rows(self):
+        """Строки буфера по возрастанию id (раскладка query.RECORD_COLUMNS)."""
+        return [self.get(i) for i in self._versions]
+
+    def ids(self):
+        return list(self._versions.keys())
+
+    def reset(self):
+        self.db_file = None
+        self.last_seen_id = 0
+        self._versions.clear()
+
+    def _store(self, rows):
+        for row in rows:
+            self._versions[row[0]] = row[COL_VERSION]
+        self._versions = OrderedDict(sorted(self._versions.items()))
+        while len(self._versions) > self.size:
+            self._versions.popitem(last=False)
+        if self._versions:
+            self.last_seen_id = max(self.last_seen_id, next(reversed(self._versions)))
+
+    def sync(self, db_file):
+        """Синхронизирует буфер с базой.
+
+        Возвращает (changed, removed): changed — id добавленных/изменённых строк,
+        removed — id строк, ушедших из буфера. Пустые списки — изменений нет.
+        """
+        if db_file != self.db_file or not self._versions:
+            before = set(self._versions)
+            self.reset()
+            self.db_file = db_file
+            self.store.track(db_file)
+            self._store(self.store.query(db_file, "1=1", (), f"ORDER BY r.id DESC LIMIT {int(self.size)}"))
+            return self.ids(), sorted(before - set(self._versions))
+
+        # Единственный запрос в установившемся режиме: диапазон по первичному ключу
+        low_id = next(iter(self._versions))
+        cursor = self.store.connection(db_file).cursor()
+        cursor.execute("SELECT id, version FROM records WHERE id >= ? ORDER BY id", (low_id,))
+        probe = dict(cursor.fetchall())
+
+        gone = [i for i in self._versions if i not in probe]
+        wanted = [i for i, ver in probe.items()
+                  if i > self.last_seen_id or (i in self._versions and self._versions[i] != ver)]
+        return self._update(gone, wanted, probe)
+
+    def apply(self, db_file, changes):
+        """То же, что sync, но по списку изменений из журнала, уже применённому
+        хранилищем: в базу буфер обращается, только чтобы дозаполниться после удаления."""
+        if db_file != self.db_file or not self._versions:
+            return self.sync(db_file)
+        wanted = {}
+        gone = set()
+        for ch in changes:
+            if ch.op == "R":
+                self.db_file = None
+                return self.sync(db_file)
+            if ch.op == "D":
+                wanted.pop(ch.rec_id, None)
+                if ch.rec_id in self._versions:
+                    gone.add(ch.rec_id)
+            elif ch.rec_id > self.last_seen_id or (
+                    ch.rec_id in self._versions and self._versions[ch.rec_id] != ch.version):
+                wanted[ch.rec_id] = ch.version
+        return self._update(sorted(gone), list(wanted), wanted)
+
+    def _update(self, gone, wanted, versions):
+        if not gone and not wanted:
+            return [], []
+        before = set(self._versions)
+        for i in gone:
+            del self._versions[i]
+        if wanted:
+            self._store(self.store.fetch(self.db_file, wanted, versions).values())
+        if len(self._versions) < self.size:
+            # После удаления дозаполняем буфер более старыми заявками
+            low_id = next(iter(self._versions)) if self._versions else self.last_seen_id + 1
+            need = self.size - len(self._versions)
+            older = self.store.query(self.db_file, "r.id < ?", (low_id,), f"ORDER BY r.id DESC LIMIT {int(need)}")
+            self._store(older)
+            wanted = list(wanted) + [row[0] for row in older]
+        after = set(self._versions)
+        return [i for i in self._versions if i in wanted], sorted(before - after)
+
+    def get(self, rec_id):
+        return self.store.get(self.db_file, rec_id) if rec_id in self._versions else None
@@ -0,0 +1,257 @@
+"""Справочник содержаний в общей базе app.db — один для всех рабочих мест.
+
+Таблицы:
+    ref_version           одна строка: номер версии, когда и откуда загружен
+    ref_problems          содержания заявок по группам (водоотведение, водоснабжение, общие)
+    ref_problem_category  содержание (в нижнем регистре) -> категория из docx
+    ref_category_section  категория -> раздел бланка сведений (по порядку проверки)
+
+Категория в раздел бланка переводится только при чтении (Refbook.classifier), так
+что правка ref_category_section меняет раздел и уже загруженных содержаний.
+Справочники первого формата хранили в ref_problem_category готовые разделы —
+install_refbook переводит их обратно в категории и увеличивает версию.
+
+Справочник заменяется целиком одной транзакцией, и версия при этом
+увеличивается (import_refbook). Администратор загружает его из Word-документа
+(import_docx); пустая база заполняется при первом входе из документа в папке
+приложения или значениями по умолчанию (load_refbook). RefbookWatcher следит
+за версией: окно приложения подхватывает новый справочник без перезапуска и
+без разбора документа на каждом рабочем месте. Модуль не зависит от tkinter.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple
+
+from blank import CATEGORY_SECTIONS
+from catalog import iter_docx_entries, load_catalog, load_problem_categories_from_docx, make_blank_classifier
+
+# Группы содержаний в порядке вывода (ключи problem_categories)
+GROUPS = ("водоотведение", "водоснабжение", "общие")
+
+# Формат таблиц справочника (ref_version.format): 2 — в ref_problem_category категории, а не разделы
+REFBOOK_FORMAT = 2
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS ref_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL,
+        updated_at TEXT,
+        source TEXT,
+        format INTEGER NOT NULL DEFAULT 1
+    )""",
+    """CREATE TABLE IF NOT EXISTS ref_problems (
+        grp TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        PRIMARY KEY (grp, position)
+    )""",
+    """CREATE TABLE IF NOT EXISTS ref_problem_category (
+        content TEXT PRIMARY KEY,
+        category TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS ref_category_section (
+        position INTEGER PRIMARY KEY,
+        category TEXT NOT NULL,
+        section TEXT NOT NULL
+    )""",
+    f"INSERT OR IGNORE INTO ref_version (id, version, format) VALUES (1, 0, {REFBOOK_FORMAT})",
+)
+
+
+class Refbook(NamedTuple):
+    version: int          # 0 — справочник в базе ещё не загружен
+    categories: dict      # {группа: [содержание, ...]}
+    mapping: dict         # {содержание в нижнем регистре: категория}
+    sections: dict        # {категория: раздел бланка}, порядок — порядок проверки
+    updated_at: str = ""
+    source: str = ""
+
+    def classifier(self):
+        """Раздел бланка сведений по тексту проблемы (blank.BlankClassifier)."""
+        return make_blank_classifier(self.mapping, self.sections)
+
+
+def install_refbook(connection) -> None:
+    """Создаёт таблицы справочника в базе подключения (идемпотентно) и обновляет их формат."""
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(ref_version)")]
+    if columns and "format" not in columns:
+        connection.execute("ALTER TABLE ref_version ADD COLUMN format INTEGER NOT NULL DEFAULT 1")
+    for statement in _SCHEMA:
+        connection.execute(statement)
+    connection.commit()
+    if connection.execute("SELECT format FROM ref_version WHERE id = 1").fetchone()[0] < REFBOOK_FORMAT:
+        _migrate_sections_to_categories(connection)
+
+
+def _migrate_sections_to_categories(connection) -> None:
+    """Формат 1 -> 2: раздел бланка в ref_problem_category заменяется первой категорией
+    ref_category_section с этим разделом; версия увеличивается, чтобы рабочие места
+    перечитали справочник."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        # Другое рабочее место могло обновить формат, пока мы ждали блокировку
+        if connection.execute("SELECT format FROM ref_version WHERE id = 1").fetchone()[0] < REFBOOK_FORMAT:
+            connection.execute("""
+                UPDATE ref_problem_category SET category = (
+                    SELECT s.category FROM ref_category_section s
+                    WHERE s.section = ref_problem_category.category
+                    ORDER BY s.position LIMIT 1)
+                WHERE category IN (SELECT section FROM ref_category_section)""")
+            connection.execute(
+                "UPDATE ref_version SET format = ?, version = version + (version > 0) WHERE id = 1",
+                (REFBOOK_FORMAT,))
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+
+def refbook_version(connection) -> int:
+    row = connection.execute("SELECT version FROM ref_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def read_refbook(connection) -> Refbook:
+    """Справочник из базы подключения (таблицы должны существовать, см. install_refbook)."""
+    version, updated_at, source = connection.execute(
+        "SELECT version, updated_at, source FROM ref_version WHERE id = 1").fetchone()
+    categories = {group: [] for group in GROUPS}
+    for grp, content in connection.execute("SELECT grp, content FROM ref_problems ORDER BY grp, position"):
+        categories.setdefault(grp, []).append(content)
+    mapping = dict(connection.execute("SELECT content, category FROM ref_problem_category"))
+    sections = dict(connection.execute("SELECT category, section FROM ref_category_section ORDER BY position"))
+    return Refbook(version, categories, mapping, sections or dict(CATEGORY_SECTIONS), updated_at or "", source or "")
+
+
+def import_refbook(connection, categories, mapping, sections=None, source: str = "",
+                   expected_version: int | None = None) -> int:
+    """Заменяет справочник целиком и увеличивает версию; возвращает новую версию.
+    sections=None — разделы бланка остаются прежними (в пустой базе — CATEGORY_SECTIONS).
+    expected_version — заменить, только если версия в базе такая (иначе вернуть её)."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        current = refbook_version(connection)
+        if expected_version is not None and current != expected_version:
+            connection.rollback()
+            return current
+        connection.execute("DELETE FROM ref_problems")
+        connection.executemany(
+            "INSERT INTO ref_problems (grp, position, content) VALUES (?, ?, ?)",
+            [(grp, i, content) for grp, contents in categories.items() for i, content in enumerate(contents)])
+        connection.execute("DELETE FROM ref_problem_category")
+        connection.executemany("INSERT INTO ref_problem_category (content, category) VALUES (?, ?)",
+                               list(mapping.items()))
+        if sections is None and not connection.execute("SELECT 1 FROM ref_category_section LIMIT 1").fetchone():
+            sections = CATEGORY_SECTIONS
+        if sections is not None:
+            connection.execute("DELETE FROM ref_category_section")
+            connection.executemany(
+                "INSERT INTO ref_category_section (position, category, section) VALUES (?, ?, ?)",
+                [(i, category, section) for i, (category, section) in enumerate(sections.items())])
+        connection.execute(
+            "UPDATE ref_version SET version = version + 1, updated_at = ?, source = ? WHERE id = 1",
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), source))
+        version = refbook_version(connection)
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    return version
+
+
+def _connect(common_path):
+    connection = sqlite3.connect(str(common_path), timeout=10, isolation_level=None)
+    install_refbook(connection)
+    return connection
+
+
+def import_docx(common_path, doc_path) -> int:
+    """Загрузка справочника администратором из Word-документа doc_path в общую базу
+    common_path; возвращает новую версию. ValueError — в документе нет таблицы содержаний."""
+    try:
+        found = any(True for _ in iter_docx_entries(doc_path))
+    except Exception as e:
+        raise ValueError(f"Не удалось прочитать документ: {e}") from e
+    if not found:
+        raise ValueError("В документе нет таблицы содержаний «содержание (категория)»")
+    categories, mapping = load_problem_categories_from_docx(doc_path)
+    connection = _connect(common_path)
+    try:
+        return import_refbook(connection, categories, mapping, source=os.path.basename(str(doc_path)))
+    finally:
+        connection.close()
+
+
+def load_refbook(common_path, directory) -> Refbook:
+    """Справочник из общей базы common_path. Пустая база заполняется из документа в
+    directory (см. catalog.load_catalog); база недоступна — справочник из документа, версия 0."""
+    try:
+        connection = _connect(common_path)
+    except sqlite3.Error as e:
+        print(f"Справочник: общая база недоступна ({e}), используется документ")
+        categories, mapping = load_catalog(directory)
+        return Refbook(0, categories, mapping, dict(CATEGORY_SECTIONS))
+    try:
+        if not refbook_version(connection):
+            categories, mapping = load_catalog(directory)
+            try:
+                # Только если база всё ещё пуста: её мог заполнить другой компьютер
+                import_refbook(connection, categories, mapping, source="первый запуск", expected_version=0)
+            except sqlite3.Error as e:
+                print(f"Справочник: не удалось заполнить общую базу: {e}")
+                return Refbook(0, categories, mapping, dict(CATEGORY_SECTIONS))
+        return read_refbook(connection)
+    finally:
+        connection.close()
+
+
+class RefbookWatcher:
+    """Следит за версией справочника в общей базе и раздаёт подписчикам новый Refbook.
+
+    Как и changes.ChangeWatcher, на каждом опросе выполняет только PRAGMA
+    data_version; версия читается лишь после записи в базу с другого подключения.
+    """
+
+    def __init__(self, common_path, version: int = 0):
+        self.path = str(common_path)
+        self.version = version
+        self._conn = None
+        self._data_version = None
+        self._subscribers = []
+
+    def subscribe(self, callback) -> None:
+        """callback(refbook: Refbook) вызывается, когда версия справочника изменилась."""
+        self._subscribers.append(callback)
+
+    def poll(self):
+        """Проверяет версию; при изменении читает справочник, оповещает подписчиков и возвращает его."""
+        try:
+            if self._conn is None:
+                self._conn = _connect(self.path)
+            dv = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if dv == self._data_version:
+                return None
+            self._data_version = dv
+            if refbook_version(self._conn) == self.version:
+                return None
+            book = read_refbook(self._conn)
+        except sqlite3.Error:
+            return None
+        self.version = book.version
+        for callback in list(self._subscribers):
+            try:
+                callback(book)
+            except Exception:
+                pass
+        return book
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+        self._subscribers.clear()
@@ -0,0 +1,61 @@
+"""Именованные стили отчётов Excel.
+
+Отчёты и бланки оформляются набором повторяющихся стилей: заголовок, шапка
+таблицы, ячейка в рамке, ячейка с переносом. Вместо новых Font/Alignment/Border
+на каждую ячейку стили один раз регистрируются в книге как NamedStyle
+(register) и назначаются по имени; строка таблицы оформляется шаблоном —
+кортежем имён стилей по колонкам (style_row / write_row).
+"""
+
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+
+_THIN = Side(style="thin")
+_BOX = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+
+# Имя стиля -> параметры NamedStyle
+STYLES = {
+    # Заголовки и подписи
+    "disp_title": dict(font=Font(bold=True, size=14), alignment=Alignment(horizontal="center")),
+    "disp_center": dict(alignment=Alignment(horizontal="center")),
+    "disp_bold": dict(font=Font(bold=True)),
+    "disp_left": dict(alignment=Alignment(horizontal="left")),
+    "disp_wrap": dict(alignment=Alignment(wrap_text=True, vertical="top")),
+    # Таблицы: шапка и ячейки в рамке (выравнивание по верху)
+    "disp_header": dict(font=Font(bold=True), border=_BOX,
+                        alignment=Alignment(horizontal="center", vertical="center")),
+    "disp_cell": dict(border=_BOX, alignment=Alignment(vertical="top")),
+    "disp_cell_wrap": dict(border=_BOX, alignment=Alignment(wrap_text=True, vertical="top")),
+    # Бланк сведений: рамка без выравнивания по верху
+    "disp_section": dict(font=Font(bold=True), border=_BOX, alignment=Alignment(horizontal="left")),
+    "disp_box": dict(border=_BOX),
+    "disp_box_wrap": dict(border=_BOX, alignment=Alignment(wrap_text=True)),
+    "disp_box_right": dict(border=_BOX, alignment=Alignment(horizontal="right")),
+}
+
+# Шаблоны строк: имена стилей по колонкам
+FILTERED_ROW = ("disp_cell", "disp_cell", "disp_cell_wrap", "disp_cell_wrap", "disp_cell_wrap", "disp_cell")
+BLANK_SECTION_ROW = ("disp_section",) + ("disp_box",) * 5
+BLANK_LINE_ROW = ("disp_box_wrap",) + ("disp_box",) * 4 + ("disp_box_right",)
+
+
+def register(wb) -> None:
+    """Регистрирует стили STYLES в книге (повторный вызов ничего не меняет)."""
+    existing = set(wb.named_styles)
+    for name, params in STYLES.items():
+        if name not in existing:
+            wb.add_named_style(NamedStyle(name=name, **params))
+
+
+def style_row(ws, row: int, template, start_column: int = 1) -> None:
+    """Назначает ячейкам строки стили из шаблона; None в шаблоне — колонку не трогать."""
+    for offset, name in enumerate(template):
+        if name:
+            ws.cell(row=row, column=start_column + offset).style = name
+
+
+def write_row(ws, row: int, values, template, start_column: int = 1) -> None:
+    """Записывает значения строки и сразу оформляет её по шаблону."""
+    for offset, (value, name) in enumerate(zip(values, template)):
+        cell = ws.cell(row=row, column=start_column + offset, value=value)
+        if name:
+            cell.style = name
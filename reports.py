@@ -0,0 +1,231 @@
+"""Отчёты и выгрузки: сборка файла по уже выбранным параметрам.
+
+Каждая функция build_* — работа фонового задания (см. jobs.py): пишет результат
+в job.output, ход сообщает через job.report, пустой результат — NothingToExport.
+Базы читаются через query(query_func, db_files) — окно приложения передаёт свой
+_execute_query_multiple_dbs, командная строка — shards.query_databases. Модуль
+не зависит от tkinter: те же отчёты строят и окно, и cli.py.
+"""
+
+import os
+import time
+from datetime import timedelta
+
+from blank import blank_lines, partition_by_day, write_blank_files, write_daily_blank
+from export import count_records, iter_record_rows, write_filtered_report, write_records_csv, write_records_xlsx
+from jobs import NothingToExport
+from query import RecordFilter, register_functions
+from summary import bucket_counts, summarize
+
+# Поля заявки для бланка сведений (см. blank.blank_lines)
+BLANK_FIELDS = ("r.problem, r.address, r.phone, r.name, r.surname, r.brigade_number, "
+                "COALESCE(r.created_at, r.date), r.status, r.category, r.blank_category")
+
+
+def summary_period(period: str, day):
+    """Период краткого отчёта: "day" — сутки day, "week" — 7 дней по day включительно.
+    Возвращает (начало, конец, подпись периода)."""
+    if period == "day":
+        return day, day, day.strftime("%d.%m.%Y")
+    start = day - timedelta(days=6)
+    return start, day, f"{start.strftime('%d.%m.%Y')} - {day.strftime('%d.%m.%Y')}"
+
+
+def summary_file_name(period: str, start, end) -> str:
+    return (
+        f"отчёт_за_сутки_{start.strftime('%d.%m.%Y')}.xlsx" if period == "day"
+        else f"отчёт_за_неделю_{start.strftime('%d.%m.%Y')}_to_{end.strftime('%d.%m.%Y')}.xlsx"
+    )
+
+
+def blank_file_name(day) -> str:
+    return f"бланк_сведений_{day.strftime('%d.%m.%Y')}.xlsx"
+
+
+def month_blanks_dir_name(first) -> str:
+    return f"бланки_сведений_{first.strftime('%Y_%m')}"
+
+
+def month_days(day, today):
+    """Дни месяца day с первого числа по последнее, но не позже today."""
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    last = min(next_month - timedelta(days=1), today)
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def fetch_filtered_rows(query, db_files, keyword: str | None, problem: str | None, status: str | None,
+                        operator: str | None, start_date: str | None, end_date: str | None):
+    """Возвращает строки для экспорта по фильтрам окна списка (условие — query.RecordFilter, как в окне)."""
+    clauses, params = RecordFilter(keyword, problem, status, operator, start_date, end_date).where()
+
+    def execute_query(cursor_to_use):
+        # py_lower для поиска по кириллице (см. query.py)
+        register_functions(cursor_to_use.connection)
+        sql = (
+            """SELECT r.id, r.problem, r.phone, r.address, r.improvement, r.brigade_number, r.category, COALESCE(r.created_at, r.date), r.name, r.surname, u.username, r.status
+                FROM records r
+                LEFT JOIN common.users u ON r.user_id = u.id"""
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY r.id ASC"
+        cursor_to_use.execute(sql, params)
+        return cursor_to_use.fetchall()
+
+    return query(execute_query, db_files)
+
+
+def build_records_xlsx(job, db_files, open_shard, flt, empty_message):
+    """Потоковый экспорт заявок баз db_files по фильтру flt в Excel (см. export.py)."""
+    total = count_records(db_files, open_shard, flt)
+    if not total:
+        raise NothingToExport(empty_message)
+    job.set_total(total)
+    return write_records_xlsx(job.output, iter_record_rows(db_files, open_shard, flt), progress=job.report)
+
+
+def build_records_csv(job, db_files, open_shard, flt, delimiter, compress):
+    """Выгрузка CSV/TSV заявок по фильтру flt (см. export.write_records_csv)."""
+    job.set_total(count_records(db_files, open_shard, flt))
+    count = write_records_csv(job.output, db_files, open_shard, flt, delimiter=delimiter,
+                              compress=compress, progress=job.report)
+    if not count:
+        raise NothingToExport("Записей по текущим фильтрам нет")
+    return count
+
+
+def build_filtered_report(job, query, db_files, kw, pv, sv, ov, start_sql, end_sql, start_h, end_h):
+    """Сводка по фильтрам: шапка с фильтрами и таблица."""
+    # Данные
+    rows = fetch_filtered_rows(query, db_files, kw or None, pv or None, sv or None, ov or None, start_sql, end_sql)
+    if not rows:
+        raise NothingToExport("Записей по текущим фильтрам нет")
+    job.set_total(len(rows))
+
+    parts = []
+    if sv: parts.append(f"Состояние выполнения: {sv}")
+    if pv: parts.append(f"Содержание: {pv}")
+    if ov: parts.append(f"Оператор: {ov}")
+    if kw: parts.append(f"Поиск: {kw}")
+    return write_filtered_report(
+        job.output, rows,
+        f"за период с  {start_h or '...'}  по  {end_h or '...'} г.г.",
+        ("Отбор: " + "; ".join(parts)) if parts else "Отбор: не задан",
+        progress=job.report,
+    )
+
+
+def collect_summary_counts(query, db_files, start_date: str, end_date: str):
+    """Собирает статистику по видам неисправностей за период для сводных отчётов
+    (см. summary.py: один GROUP BY по виду в каждой базе)."""
+    def execute_query(cursor_to_use):
+        return bucket_counts(cursor_to_use.connection, start_date, end_date)
+
+    return summarize(query(execute_query, db_files))
+
+
+def build_summary_report(job, query, db_files, start_sql, end_sql, title_period):
+    """Краткий отчёт за период."""
+    from openpyxl import Workbook
+
+    from report_styles import register
+
+    counts, water_total, sewer_total = collect_summary_counts(query, db_files, start_sql, end_sql)
+    job.report(sum(counts.values()))
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Отчёт"
+    register(wb)
+    bold = "disp_bold"
+    row = 1
+    ws.cell(row=row, column=1, value="Система водоснабжения").style = bold; row += 1
+    ws.cell(row=row, column=1, value="Общее количество:").style = bold
+    ws.cell(row=row, column=2, value=water_total); row += 1
+    ws.cell(row=row, column=1, value="течь воды"); ws.cell(row=row, column=2, value=counts["течь воды"]); row += 1
+    ws.cell(row=row, column=1, value="ав. на водоводе"); ws.cell(row=row, column=2, value=counts["ав. на водоводе"]); row += 1
+    ws.cell(row=row, column=1, value="дефект водоразборной колонки"); ws.cell(row=row, column=2, value=counts["дефект водоразборной колонки"]); row += 1
+    ws.cell(row=row, column=1, value="рж. х/в"); ws.cell(row=row, column=2, value=counts["рж. х/в"]); row += 2
+    ws.cell(row=row, column=1, value="Система водоотведения").style = bold; row += 1
+    ws.cell(row=row, column=1, value="Общее кол-во:").style = bold
+    ws.cell(row=row, column=2, value=sewer_total); row += 1
+    ws.cell(row=row, column=1, value="течь канализации"); ws.cell(row=row, column=2, value=counts["течь канализации"]); row += 1
+    ws.cell(row=row, column=1, value="засор канализации"); ws.cell(row=row, column=2, value=counts["засор канализации"]); row += 1
+    ws.cell(row=row, column=1, value="с/м. засор канализации"); ws.cell(row=row, column=2, value=""); row += 1
+    ws.cell(row=row, column=1, value="ав. на к/коллекторе"); ws.cell(row=row, column=2, value=counts["ав. на к/коллекторе"]); row += 1
+    ws.cell(row=row, column=1, value="с/м. ав. на к/коллекторе"); ws.cell(row=row, column=2, value=""); row += 1
+    ws.cell(row=row, column=1, value="забит колодец"); ws.cell(row=row, column=2, value=counts["забит колодец"]); row += 1
+    ws.cell(row=row, column=1, value="открыт колодец"); ws.cell(row=row, column=2, value=counts["открыт колодец"]); row += 2
+    ws.cell(row=row, column=1, value="Период").style = bold
+    ws.cell(row=row, column=2, value=title_period); row += 1
+    ws.cell(row=row, column=1, value="Смену сдал(а):"); ws.cell(row=row, column=2, value=""); row += 1
+    ws.column_dimensions['A'].width = 45
+    ws.column_dimensions['B'].width = 12
+    try:
+        row += 2
+        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=3)
+        ws.cell(row=row, column=1, value="Составил: __________________")
+        ws.cell(row=row, column=1).style = "disp_left"
+        row2 = row + 1
+        ws.merge_cells(start_row=row2, start_column=1, end_row=row2, end_column=3)
+        ws.cell(row=row2, column=1, value="Утвердил: __________________")
+        ws.cell(row=row2, column=1).style = "disp_left"
+    except Exception:
+        pass
+    wb.save(job.output)
+    return job.done
+
+
+def build_daily_blank(job, query, db_files, day, classify, template):
+    """Бланк сведений за сутки day по шаблону template; classify — раздел заявки без blank_category."""
+    day_sql = day.strftime("%Y-%m-%d")
+
+    def execute_query(cursor_to_use):
+        cursor_to_use.execute(
+            f"""
+            SELECT {BLANK_FIELDS}
+            FROM records r
+            WHERE date(r.date) = date(?)
+            ORDER BY r.id ASC
+            """,
+            (day_sql,)
+        )
+        return cursor_to_use.fetchall()
+
+    rows = query(execute_query, db_files)
+    job.set_total(len(rows))
+    sections = blank_lines(rows, classify)
+    job.report(len(rows))
+    return write_daily_blank(job.output, day, sections, template)
+
+
+def build_month_blanks(job, query, db_files, days, classify, template):
+    """Бланки сведений за дни days (подряд, один месяц) — по файлу на день в каталоге job.output.
+    Заявки месяца читаются одним запросом, книги пишутся в рабочих процессах."""
+    def execute_query(cursor_to_use):
+        cursor_to_use.execute(
+            f"""
+            SELECT date(r.date), {BLANK_FIELDS}
+            FROM records r
+            WHERE date(r.date) >= date(?) AND date(r.date) <= date(?)
+            ORDER BY r.id ASC
+            """,
+            (days[0].strftime("%Y-%m-%d"), days[-1].strftime("%Y-%m-%d"))
+        )
+        return cursor_to_use.fetchall()
+
+    started = time.perf_counter()
+    by_day = partition_by_day(query(execute_query, db_files))
+    job.set_total(len(days))
+    job.report(0)
+    os.makedirs(job.output, exist_ok=True)
+    tasks = [(os.path.join(job.output, blank_file_name(day)), day,
+              blank_lines(by_day.get(day.strftime("%Y-%m-%d"), ()), classify))
+             for day in days]
+    results = write_blank_files(tasks, on_done=lambda *_: job.report(job.done + 1), template=template)
+    results.sort()
+    job.details = "\n".join(
+        [f"Файлов: {len(results)}, заявок: {sum(count for _, count, _ in results)}, "
+         f"всего {time.perf_counter() - started:.1f} с"]
+        + [f"{os.path.basename(path)}: {count} заявок, {seconds:.2f} с" for path, count, seconds in results])
+    return len(results)
@@ -0,0 +1,90 @@
+"""Планировщик обновлений представлений после записи и по сигналам опроса.
+
+Запросы на обновление («обновить панель последних заявок», «обновить окно списка»)
+копятся в течение короткого кадра и выполняются одним вызовом на представление:
+изменения из журнала объединяются, повторы отбрасываются. Закрытые окна
+пропускаются, свёрнутые/скрытые помечаются и обновляются при показе (<Map>).
+"""
+
+
+class RefreshScheduler:
+    FRAME_MS = 40
+
+    def __init__(self, root, frame_ms: int | None = None):
+        self.root = root
+        self.frame_ms = self.FRAME_MS if frame_ms is None else frame_ms
+        self._views = {}     # name -> (callback, window_getter)
+        self._pending = {}   # name -> None (полное обновление) или {(path, seq): Change}
+        self._after_id = None
+        self._map_bound = set()
+
+    def register(self, name: str, callback, window_getter) -> None:
+        """callback(changes) — changes: список Change или None (обновить целиком).
+        window_getter() возвращает окно представления или None, если оно закрыто."""
+        self._views[name] = (callback, window_getter)
+
+    def request(self, name: str, changes=None) -> None:
+        """Ставит обновление представления в очередь кадра. changes=None — полное обновление."""
+        if name not in self._views:
+            return
+        if changes is None:
+            self._pending[name] = None
+        else:
+            bucket = self._pending.get(name, {})
+            if bucket is not None:
+                for ch in changes:
+                    bucket[(ch.path, ch.seq, ch.op)] = ch
+                self._pending[name] = bucket
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._after_id is None:
+            try:
+                self._after_id = self.root.after(self.frame_ms, self.flush)
+            except Exception:
+                self._after_id = None
+
+    @staticmethod
+    def _window_state(window):
+        try:
+            if window is None or not window.winfo_exists():
+                return "closed"
+            return window.state()
+        except Exception:
+            return "closed"
+
+    def _bind_map(self, name: str, window) -> None:
+        key = str(window)
+        if key in self._map_bound:
+            return
+        self._map_bound.add(key)
+
+        def on_map(event, _window=window):
+            if event.widget is _window and self._pending:
+                self._schedule()
+
+        try:
+            window.bind("<Map>", on_map, add="+")
+        except Exception:
+            self._map_bound.discard(key)
+
+    def flush(self) -> None:
+        """Выполняет накопленные обновления видимых представлений."""
+        self._after_id = None
+        for name in list(self._pending):
+            callback, window_getter = self._views[name]
+            window = window_getter()
+            state = self._window_state(window)
+            if state == "closed":
+                self._pending.pop(name, None)
+                continue
+            if state in ("iconic", "withdrawn"):
+                # Обновим, когда окно снова покажут
+                self._bind_map(name, window)
+                continue
+            bucket = self._pending.pop(name)
+            changes = None if bucket is None else sorted(bucket.values(), key=lambda ch: (ch.path, ch.seq))
+            try:
+                callback(changes)
+            except Exception:
+                pass
@@ -0,0 +1,70 @@
+"""Настройки рабочего места: папка приложения и файлы настроек в ней.
+
+.db_dir — каталог помесячных баз (может быть сетевым), .blank_template — шаблон
+бланка сведений, выбранный администратором. Модуль не зависит от tkinter: его
+читают и окно приложения, и выгрузки из командной строки (cli.py).
+"""
+
+import sys
+from pathlib import Path
+
+from blank_template import ensure_default_template
+
+
+def app_dir() -> Path:
+    """Папка приложения. Для .exe — папка, где лежит exe; для .py — текущая папка."""
+    try:
+        if getattr(sys, 'frozen', False):  # PyInstaller
+            return Path(sys.executable).parent
+    except Exception:
+        pass
+    return Path.cwd()
+
+
+def load_db_base_dir() -> str:
+    """Возвращает каталог хранения помесячных БД. Хранится в .db_dir (иначе текущая папка)."""
+    try:
+        cfg = app_dir() / ".db_dir"
+        if cfg.exists():
+            p = cfg.read_text(encoding="utf-8").strip().strip('"')
+            if p:
+                return str(Path(p).expanduser().resolve())
+    except Exception:
+        pass
+    return str(app_dir())
+
+
+def save_db_base_dir(directory: str) -> None:
+    try:
+        (app_dir() / ".db_dir").write_text(str(directory), encoding="utf-8")
+    except Exception:
+        pass
+
+
+def common_db_path(base_dir: str | None = None) -> str:
+    """Полный путь к постоянной БД пользователей (в том же каталоге, что и помесячные)."""
+    return str(Path(base_dir or load_db_base_dir()) / "app.db")
+
+
+def load_blank_template_path() -> str:
+    """Шаблон бланка сведений, выбранный администратором (.blank_template); "" — стандартный."""
+    try:
+        cfg = app_dir() / ".blank_template"
+        if cfg.exists():
+            return cfg.read_text(encoding="utf-8").strip().strip('"')
+    except Exception:
+        pass
+    return ""
+
+
+def save_blank_template_path(path: str) -> None:
+    try:
+        (app_dir() / ".blank_template").write_text(str(path), encoding="utf-8")
+    except Exception:
+        pass
+
+
+def blank_template():
+    """Путь шаблона для бланков сведений: выбранный администратором или стандартный
+    в папке приложения (None — папка недоступна, стандартный строится в памяти)."""
+    return load_blank_template_path() or ensure_default_template(app_dir())
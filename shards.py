@@ -0,0 +1,116 @@
+"""Помесячные базы заявок (app_YYYY_MM.db): схема, подключение, запрос по нескольким базам.
+
+Общая база пользователей app.db лежит в том же каталоге и присоединяется к
+каждому подключению как common. Модуль не зависит от tkinter.
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+from changes import install_change_log
+from settings import common_db_path, load_db_base_dir
+from summary import install_summary_tables
+
+
+# ===== Миграция схемы =====
+def ensure_schema_for_connection(connection, cursor_to_use):
+    """Обновляет схему базы данных для указанного подключения."""
+    cursor_to_use.execute("PRAGMA table_info(records)")
+    existing_columns = [row[1] for row in cursor_to_use.fetchall()]
+    if "assignment_date" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN assignment_date TEXT")
+    if "status" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN status TEXT")
+        cursor_to_use.execute("UPDATE records SET status='не выполнено' WHERE status IS NULL")
+    else:
+        try:
+            cursor_to_use.execute("UPDATE records SET status='не выполнено' WHERE status='не начато'")
+        except Exception:
+            pass
+    # New fields for problem, phone, address
+    if "problem" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN problem TEXT")
+    if "phone" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN phone TEXT")
+    if "address" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN address TEXT")
+    if "created_at" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN created_at TEXT")
+    # Раздел благоустройства
+    if "improvement" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN improvement TEXT")
+    if "brigade_number" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN brigade_number TEXT")
+    if "category" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN category TEXT")
+    # Раздел бланка сведений, вычисляется при сохранении заявки (см. blank.py)
+    if "blank_category" not in existing_columns:
+        cursor_to_use.execute("ALTER TABLE records ADD COLUMN blank_category TEXT")
+    # Сортировка окна списка по дате читает страницы по этому индексу (см. query.SORT_KEYS)
+    cursor_to_use.execute("CREATE INDEX IF NOT EXISTS idx_records_created ON records(COALESCE(created_at, date, ''), id)")
+    connection.commit()
+    # Версия записи и журнал изменений (change_log) для автообновления на всех рабочих местах
+    install_change_log(connection)
+    # Виды неисправностей и суточная сводка для кратких отчётов (см. summary.py)
+    install_summary_tables(connection)
+
+
+def attach_common(connection, common_path: str | None = None) -> None:
+    """Присоединяет постоянную базу пользователей как common (поддерживает сетевые пути)."""
+    try:
+        _common_path = Path(common_path or common_db_path())
+        _common_path.parent.mkdir(parents=True, exist_ok=True)
+        # Экранируем одинарные кавычки для безопасной подстановки в SQL
+        _common_escaped = str(_common_path).replace("'", "''")
+        connection.execute(f"ATTACH DATABASE '{_common_escaped}' AS common")
+    except Exception:
+        pass
+
+
+def open_shard(db_file, common_path: str | None = None):
+    """Отдельное подключение к помесячной базе: схема обновлена, общая база присоединена."""
+    db_path = str(db_file)
+    temp_conn = sqlite3.connect(db_path)
+    temp_cursor = temp_conn.cursor()
+
+    # Обновляем схему базы данных (добавляем отсутствующие колонки)
+    try:
+        ensure_schema_for_connection(temp_conn, temp_cursor)
+    except Exception as e:
+        print(f"Предупреждение: не удалось обновить схему для {db_path}: {e}")
+
+    # Присоединяем общую базу пользователей
+    attach_common(temp_conn, common_path)
+    return temp_conn
+
+
+def query_databases(query_func, db_files, open_shard=open_shard):
+    """Выполняет query_func(cursor) в каждой существующей базе db_files и объединяет результаты.
+    Ошибка в одной базе печатается и не прерывает остальные."""
+    all_results = []
+    for db_file in db_files:
+        db_path = str(db_file)
+        if not os.path.exists(db_path):
+            continue
+
+        temp_conn = open_shard(db_path)
+        temp_cursor = temp_conn.cursor()
+
+        try:
+            all_results.extend(query_func(temp_cursor))
+        except Exception as e:
+            print(f"Ошибка при запросе к {db_path}: {e}")
+        finally:
+            temp_conn.close()
+    return all_results
+
+
+def all_databases(base_dir: str | None = None):
+    """Возвращает список всех баз данных (кроме app.db), новые первыми."""
+    db_files = [db_file for db_file in Path(base_dir or load_db_base_dir()).glob("app_*.db")
+                if db_file.name != "app.db"]  # Исключаем общую базу
+    # Сортируем по дате (из имени файла)
+    db_files.sort(key=lambda x: x.name, reverse=True)
+    return db_files
+
@@ -0,0 +1,167 @@
+"""Сторож зависаний главного цикла Tk.
+
+Главный поток раз в HEARTBEAT_MS отмечается через after(). Отдельный поток
+следит за отметками: если главный поток молчит дольше THRESHOLD_MS, снимается
+его стек (sys._current_frames) вместе с текущим действием пользователя
+(refresh_records_default, _export_filtered_local и т.п. — см. track()).
+Когда цикл оживает, зависание с полной длительностью пишется в журнал
+logs/stalls.log (с ротацией) и в сводку для админ-панели.
+Время внутри модальных диалогов (messagebox, filedialog) зависанием не считается.
+"""
+
+import functools
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+
+class Stall(NamedTuple):
+    started: str        # время начала, "YYYY-MM-DD HH:MM:SS"
+    duration_ms: int
+    action: str         # действие, во время которого завис цикл ("" — не отмечено)
+    where: str          # ближайшее к вершине стека место в коде приложения
+    stack: str
+
+
+# Файлы, по которым видно, что главный поток ждёт в модальном диалоге, а не завис
+_MODAL_FILES = ("commondialog.py", "simpledialog.py", "filedialog.py", "messagebox.py")
+
+
+class StallWatchdog:
+    HEARTBEAT_MS = 100
+    THRESHOLD_MS = 500
+    KEEP = 200            # зависаний в памяти для админ-панели
+    LOG_MAX_BYTES = 1_000_000
+    LOG_BACKUPS = 3
+
+    def __init__(self, root, log_path, threshold_ms: int | None = None):
+        self.root = root
+        self.threshold_ms = self.THRESHOLD_MS if threshold_ms is None else threshold_ms
+        self.stalls = deque(maxlen=self.KEEP)
+        self._actions = []
+        self._main_ident = threading.main_thread().ident
+        self._beat = time.monotonic()
+        self._captured = None      # (stack, where, action, modal) текущего зависания
+        self._stop = threading.Event()
+        self._after_id = None
+        self._thread = None
+        self._app_dir = os.path.dirname(os.path.abspath(__file__))
+        self._logger = self._make_logger(log_path)
+
+    def _make_logger(self, log_path):
+        logger = logging.getLogger("disp.stalls")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            try:
+                os.makedirs(os.path.dirname(str(log_path)), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    str(log_path), maxBytes=self.LOG_MAX_BYTES, backupCount=self.LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            except OSError:
+                logger.addHandler(logging.NullHandler())
+        return logger
+
+    # ---- действия ----
+    def track(self, func=None, *, name: str | None = None):
+        """Декоратор: пока выполняется функция, её имя — текущее действие."""
+        if func is None:
+            return functools.partial(self.track, name=name)
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self._actions.append(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._actions.pop()
+        return wrapper
+
+    def current_action(self) -> str:
+        actions = self._actions[:]
+        return " > ".join(actions)
+
+    # ---- запуск и остановка ----
+    def start(self) -> None:
+        self._beat = time.monotonic()
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    # ---- главный поток ----
+    def _heartbeat(self) -> None:
+        now = time.monotonic()
+        lag_ms = (now - self._beat) * 1000 - self.HEARTBEAT_MS
+        captured = self._captured
+        self._captured = None
+        self._beat = now
+        if lag_ms >= self.threshold_ms and captured is not None and not captured[3]:
+            self._record(lag_ms, *captured[:3])
+        if self._stop.is_set():
+            return
+        try:
+            self._after_id = self.root.after(self.HEARTBEAT_MS, self._heartbeat)
+        except Exception:
+            self._after_id = None
+
+    def _record(self, lag_ms: float, stack: str, where: str, action: str) -> None:
+        started = datetime.now() - timedelta(milliseconds=lag_ms)
+        stall = Stall(started.strftime("%Y-%m-%d %H:%M:%S"), int(lag_ms), action, where, stack)
+        self.stalls.append(stall)
+        try:
+            self._logger.info("%s  зависание %d мс  действие: %s  место: %s\n%s",
+                              stall.started, stall.duration_ms, stall.action or "-", stall.where, stall.stack)
+        except Exception:
+            pass
+
+    # ---- поток сторожа ----
+    def _watch(self) -> None:
+        period = self.HEARTBEAT_MS / 2000
+        while not self._stop.wait(period):
+            silent_ms = (time.monotonic() - self._beat) * 1000 - self.HEARTBEAT_MS
+            if silent_ms < self.threshold_ms or self._captured is not None:
+                continue
+            frame = sys._current_frames().get(self._main_ident)
+            if frame is None:
+                continue
+            summary = traceback.extract_stack(frame)
+            modal = any(os.path.basename(fs.filename) in _MODAL_FILES for fs in summary)
+            self._captured = ("".join(summary.format()), self._where(summary), self.current_action(), modal)
+            del frame
+
+    def _where(self, summary) -> str:
+        for fs in reversed(summary):
+            path = os.path.abspath(fs.filename)
+            if os.path.dirname(path) == self._app_dir and path != os.path.abspath(__file__):
+                return f"{os.path.basename(fs.filename)}:{fs.lineno} {fs.name}"
+        if summary:
+            fs = summary[-1]
+            return f"{os.path.basename(fs.filename)}:{fs.lineno} {fs.name}"
+        return ""
+
+    # ---- сводка ----
+    def summary(self):
+        """[(действие, число зависаний, максимум мс, сумма мс)] по убыванию суммарного времени."""
+        by_action = {}
+        for stall in self.stalls:
+            count, longest, total = by_action.get(stall.action, (0, 0, 0))
+            by_action[stall.action] = (count + 1, max(longest, stall.duration_ms), total + stall.duration_ms)
+        return sorted(((action, *v) for action, v in by_action.items()), key=lambda item: -item[3])
@@ -0,0 +1,205 @@
+"""Общее хранилище заявок для всех открытых окон.
+
+Строки хранятся по ключу (база, id) в раскладке query.RECORD_COLUMNS. Их приносят
+загрузчик окна списка и панель последних заявок, а свежими держит журнал изменений
+(changes.ChangeWatcher): apply() один раз дочитывает добавленные и изменённые
+строки пачкой на базу и сообщает подписчикам. Представления не ходят в базу
+сами: они берут строки из хранилища через Projection — свой фильтр и набор баз.
+Если база загружена целиком (complete), повторная фильтрация идёт по памяти.
+
+Все методы вызываются из главного потока.
+"""
+
+import sqlite3
+
+from changes import shard_key
+from query import RECORD_COLUMNS, RecordFilter, register_functions
+
+# Индексы колонок строки (см. query.RECORD_COLUMNS)
+COL_ID = 0
+COL_DATE = 12
+COL_USER_ID = 13
+COL_IMPROVEMENT = 14
+COL_VERSION = 15
+
+
+class RecordStore:
+    MAX_CONNECTIONS = 4
+
+    def __init__(self, open_shard):
+        """open_shard(db_file) -> sqlite3.Connection с присоединённой common."""
+        self._open_shard = open_shard
+        self._rows = {}          # shard_key -> {id: row}
+        self._paths = {}         # shard_key -> путь к файлу
+        self._complete = set()   # базы, загруженные целиком без фильтра
+        self._connections = {}   # shard_key -> подключение (последние используемые в конце)
+        self._subscribers = []
+
+    # ---- подключения ----
+    def connection(self, path):
+        """Подключение хранилища к базе (кэшируется, не больше MAX_CONNECTIONS)."""
+        key = shard_key(path)
+        connection = self._connections.pop(key, None)
+        if connection is None:
+            connection = self._open_shard(path)
+            register_functions(connection)
+        self._connections[key] = connection
+        while len(self._connections) > self.MAX_CONNECTIONS:
+            self._connections.pop(next(iter(self._connections))).close()
+        return connection
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            try:
+                connection.close()
+            except Exception:
+                pass
+        self._connections.clear()
+        self._subscribers.clear()
+
+    # ---- наполнение ----
+    def track(self, path) -> None:
+        """Отмечает базу как показываемую: её изменения будут дочитываться, даже если
+        под фильтр окна пока не попала ни одна строка."""
+        key = shard_key(path)
+        self._paths[key] = str(path)
+        self._rows.setdefault(key, {})
+
+    def put_rows(self, path, rows) -> None:
+        """Кладёт строки базы; более старая версия строки не затирает новую."""
+        key = shard_key(path)
+        self._paths[key] = str(path)
+        shard = self._rows.setdefault(key, {})
+        for row in rows:
+            old = shard.get(row[COL_ID])
+            if old is None or (row[COL_VERSION] or 0) >= (old[COL_VERSION] or 0):
+                shard[row[COL_ID]] = row
+
+    def mark_complete(self, path) -> None:
+        self._complete.add(shard_key(path))
+
+    def is_complete(self, path) -> bool:
+        return shard_key(path) in self._complete
+
+    def invalidate(self, path) -> None:
+        """Забывает строки базы (журнал потерял часть изменений); база остаётся отслеживаемой."""
+        key = shard_key(path)
+        self._rows[key] = {}
+        self._complete.discard(key)
+
+    # ---- чтение ----
+    def get(self, path, rec_id):
+        return self._rows.get(shard_key(path), {}).get(rec_id)
+
+    def rows_of(self, path):
+        """Строки базы по возрастанию id (копия списка)."""
+        shard = self._rows.get(shard_key(path), {})
+        return [shard[i] for i in sorted(shard)]
+
+    def query(self, path, where: str, params=(), tail: str = ""):
+        """Выполняет выборку по базе, кладёт строки в хранилище и возвращает их."""
+        cursor = self.connection(path).cursor()
+        cursor.execute(
+            f"""SELECT {RECORD_COLUMNS}
+                FROM records r
+                LEFT JOIN common.users u ON r.user_id = u.id
+                WHERE {where} {tail}""",
+            list(params),
+        )
+        rows = cursor.fetchall()
+        self.put_rows(path, rows)
+        return rows
+
+    def fetch(self, path, ids, versions=None):
+        """Строки по id: из памяти, недостающие (или устаревшие по versions) — одним запросом."""
+        shard = self._rows.get(shard_key(path), {})
+        missing = []
+        for rec_id in ids:
+            row = shard.get(rec_id)
+            if row is None or (versions is not None and versions.get(rec_id) != row[COL_VERSION]):
+                missing.append(rec_id)
+        if missing:
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                self.query(path, f"r.id IN ({','.join('?' * len(part))})", part)
+            shard = self._rows.get(shard_key(path), {})
+        return {rec_id: shard[rec_id] for rec_id in ids if rec_id in shard}
+
+    # ---- изменения ----
+    def subscribe(self, callback) -> None:
+        """callback(changes) вызывается после того, как хранилище применило изменения."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        try:
+            self._subscribers.remove(callback)
+        except ValueError:
+            pass
+
+    def apply(self, changes) -> None:
+        """Применяет изменения из журнала: удаляет, дочитывает пачкой и оповещает подписчиков.
+        Строки дочитываются только для баз, которые уже есть в хранилище."""
+        wanted = {}
+        for ch in changes:
+            if ch.path not in self._rows:
+                continue
+            if ch.op == "R":
+                self.invalidate(self._paths[ch.path])
+                wanted.pop(ch.path, None)
+                continue
+            shard = self._rows[ch.path]
+            if ch.op == "D":
+                shard.pop(ch.rec_id, None)
+                wanted.get(ch.path, {}).pop(ch.rec_id, None)
+            else:
+                row = shard.get(ch.rec_id)
+                if row is None or row[COL_VERSION] != ch.version:
+                    wanted.setdefault(ch.path, {})[ch.rec_id] = ch.version
+        for key, versions in wanted.items():
+            try:
+                self.fetch(self._paths[key], list(versions), versions)
+            except sqlite3.Error:
+                self.invalidate(self._paths[key])
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception:
+                pass
+
+
+class Projection:
+    """Отфильтрованный вид хранилища для одного окна: набор баз и RecordFilter."""
+
+    def __init__(self, store: RecordStore, paths, flt: RecordFilter | None = None):
+        self.store = store
+        self.paths = {shard_key(p): str(p) for p in paths}
+        self.flt = flt or RecordFilter()
+
+    def covers(self, changes) -> bool:
+        return any(ch.path in self.paths for ch in changes)
+
+    def delta(self, changes):
+        """Разбирает изменения для этого вида.
+
+        Возвращает (upserts, removed, reset): upserts — [(путь, строка)] подходящих под
+        фильтр строк, removed — [(путь, id)] удалённых или переставших подходить,
+        reset — какую-то из баз нужно перечитать целиком.
+        """
+        upserts = {}
+        removed = {}
+        reset = False
+        for ch in changes:
+            path = self.paths.get(ch.path)
+            if path is None:
+                continue
+            if ch.op == "R":
+                reset = True
+                continue
+            row = None if ch.op == "D" else self.store.get(path, ch.rec_id)
+            if row is not None and self.flt.matches(row):
+                upserts[(ch.path, ch.rec_id)] = (path, row)
+                removed.pop((ch.path, ch.rec_id), None)
+            else:
+                removed[(ch.path, ch.rec_id)] = (path, ch.rec_id)
+                upserts.pop((ch.path, ch.rec_id), None)
+        return list(upserts.values()), list(removed.values()), reset
@@ -0,0 +1,238 @@
+"""Краткий отчёт: подсчёт заявок по видам неисправностей.
+
+Вид (bucket) определяется по тексту проблемы правилами problems.classify_problem.
+Чтобы не прогонять правила по каждой строке при каждом отчёте, в помесячной базе
+хранится таблица problem_bucket: текст проблемы -> вид. Перед подсчётом
+sync_problem_buckets дописывает в неё только новые формулировки — по журналу
+изменений change_log (см. changes.py), а если поменялась версия правил
+RULES_VERSION, пересчитывает всё.
+
+Сами отчёты читают не records, а суточную сводку daily_rollup: число заявок по
+дню × виду × состоянию × бригаде. Сводку ведут триггеры records (добавление,
+изменение, удаление), так что отчёт за любой период — выборка по дням из
+небольшой таблицы. Вид триггер берёт из problem_bucket; заявка с ещё не
+классифицированной формулировкой учитывается с видом PENDING, и такие дни
+пересчитываются при следующей синхронизации. rebuild_daily_rollup
+пересобирает сводку базы целиком.
+"""
+
+import sqlite3
+
+from problems import parse_problem
+
+# Увеличить при любом изменении правил problems.classify_problem
+RULES_VERSION = 1
+
+WATER_BUCKETS = ("течь воды", "ав. на водоводе", "дефект водоразборной колонки", "рж. х/в")
+SEWER_BUCKETS = ("течь канализации", "засор канализации", "ав. на к/коллекторе", "забит колодец", "открыт колодец")
+BUCKETS = WATER_BUCKETS + SEWER_BUCKETS
+
+# Вид в daily_rollup для формулировки, которой ещё нет в problem_bucket
+PENDING = "?"
+
+
+def _status_sql(column: str) -> str:
+    """Состояние без отметки времени: «выполнено (01.11.2025 14:02)» -> «выполнено»."""
+    return (f"rtrim(CASE WHEN instr(COALESCE({column}, ''), ' (') > 0 "
+            f"THEN substr({column}, 1, instr({column}, ' (') - 1) ELSE COALESCE({column}, '') END)")
+
+
+def _rollup_key_sql(row: str) -> str:
+    """Выражения (day, bucket, status, brigade) суточной сводки для строки records row."""
+    return ", ".join((
+        f"COALESCE(date({row}.date), '')",
+        f"CASE WHEN {row}.problem IS NULL THEN '' ELSE COALESCE("
+        f"(SELECT b.bucket FROM problem_bucket b WHERE b.problem = {row}.problem), '{PENDING}') END",
+        _status_sql(f"{row}.status"),
+        f"COALESCE({row}.brigade_number, '')",
+    ))
+
+
+def _rollup_add_sql(row: str, delta: int) -> str:
+    return (f"INSERT INTO daily_rollup (day, bucket, status, brigade, n) VALUES ({_rollup_key_sql(row)}, {delta}) "
+            f"ON CONFLICT (day, bucket, status, brigade) DO UPDATE SET n = n + ({delta});")
+
+
+def install_summary_tables(connection) -> None:
+    """Создаёт problem_bucket, daily_rollup и триггеры сводки в базе подключения (идемпотентно).
+    Сводка новой базы сразу заполняется по уже имеющимся заявкам."""
+    existing = {name for (name,) in connection.execute(
+        "SELECT name FROM main.sqlite_master WHERE type IN ('table', 'trigger')")}
+    if "problem_bucket" not in existing:
+        connection.execute("""CREATE TABLE IF NOT EXISTS main.problem_bucket (
+            problem TEXT PRIMARY KEY,
+            bucket TEXT NOT NULL
+        ) WITHOUT ROWID""")
+    if "problem_bucket_state" not in existing:
+        # Версия правил и seq журнала change_log, до которого таблица актуальна
+        connection.execute("""CREATE TABLE IF NOT EXISTS main.problem_bucket_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rules INTEGER NOT NULL,
+            seq INTEGER
+        )""")
+    if "daily_rollup_insert" in existing:
+        connection.commit()
+        return
+    connection.execute("""CREATE TABLE IF NOT EXISTS main.daily_rollup (
+        day TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        status TEXT NOT NULL,
+        brigade TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (day, bucket, status, brigade)
+    ) WITHOUT ROWID""")
+    connection.execute(f"""CREATE TRIGGER IF NOT EXISTS main.daily_rollup_insert
+        AFTER INSERT ON records
+        BEGIN
+            {_rollup_add_sql("NEW", 1)}
+        END""")
+    # Версию записи триггер журнала меняет отдельным UPDATE — на сводку он не влияет
+    connection.execute(f"""CREATE TRIGGER IF NOT EXISTS main.daily_rollup_update
+        AFTER UPDATE OF date, problem, status, brigade_number ON records
+        BEGIN
+            {_rollup_add_sql("OLD", -1)}
+            {_rollup_add_sql("NEW", 1)}
+            DELETE FROM daily_rollup WHERE n = 0;
+        END""")
+    connection.execute(f"""CREATE TRIGGER IF NOT EXISTS main.daily_rollup_delete
+        AFTER DELETE ON records
+        BEGIN
+            {_rollup_add_sql("OLD", -1)}
+            DELETE FROM daily_rollup WHERE n = 0;
+        END""")
+    # Новая сводка пуста: сбрасываем состояние, и _sync заполнит её целиком (как при смене правил)
+    connection.execute("DELETE FROM main.problem_bucket_state")
+    _sync(connection)
+    connection.commit()
+
+
+def _log_bounds(connection):
+    """(MIN(seq), MAX(seq)) журнала изменений базы; None — журнала нет."""
+    try:
+        lo, hi = connection.execute("SELECT MIN(seq), MAX(seq) FROM main.change_log").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return lo or 0, hi or 0
+
+
+def _rebuild_days(connection, days) -> None:
+    """Пересчитывает daily_rollup за дни days (None — целиком) по records и problem_bucket."""
+    where = ""
+    params = ()
+    if days is not None:
+        if not days:
+            return
+        marks = ",".join("?" * len(days))
+        connection.execute(f"DELETE FROM main.daily_rollup WHERE day IN ({marks})", tuple(days))
+        where = f"WHERE COALESCE(date(r.date), '') IN ({marks})"
+        params = tuple(days)
+    else:
+        connection.execute("DELETE FROM main.daily_rollup")
+    connection.execute(f"""
+        INSERT INTO main.daily_rollup (day, bucket, status, brigade, n)
+        SELECT {_rollup_key_sql("r")}, COUNT(*) FROM main.records r {where}
+        GROUP BY 1, 2, 3, 4
+    """, params)
+
+
+def _sync(connection) -> int:
+    state = connection.execute("SELECT rules, seq FROM main.problem_bucket_state WHERE id = 1").fetchone()
+    bounds = _log_bounds(connection)
+    seq = bounds[1] if bounds else None
+    rules_changed = state is None or state[0] != RULES_VERSION
+    if rules_changed:
+        connection.execute("DELETE FROM main.problem_bucket")
+        state = None
+    elif bounds is not None and state[1] == seq:
+        return 0
+
+    if state is not None and bounds is not None and state[1] is not None and bounds[0] <= state[1] + 1 <= seq:
+        # Только заявки, добавленные или изменённые после прошлой синхронизации
+        new = connection.execute("""
+            SELECT DISTINCT r.problem FROM main.records r
+            WHERE r.id IN (SELECT rec_id FROM main.change_log WHERE seq > ? AND op IN ('I', 'U'))
+              AND r.problem IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM main.problem_bucket b WHERE b.problem = r.problem)
+        """, (state[1],)).fetchall()
+    else:
+        new = connection.execute("""
+            SELECT DISTINCT r.problem FROM main.records r
+            WHERE r.problem IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM main.problem_bucket b WHERE b.problem = r.problem)
+        """).fetchall()
+    connection.executemany(
+        "INSERT OR REPLACE INTO main.problem_bucket (problem, bucket) VALUES (?, ?)",
+        ((problem, parse_problem(problem).bucket) for (problem,) in new))
+    connection.execute("INSERT OR REPLACE INTO main.problem_bucket_state (id, rules, seq) VALUES (1, ?, ?)",
+                       (RULES_VERSION, seq))
+    # Дни, где заявки учтены с видом PENDING (или все дни при смене правил), пересчитываем
+    # в той же транзакции: база уже заблокирована на запись, и триггеры других рабочих мест ждут
+    if rules_changed:
+        _rebuild_days(connection, None)
+    else:
+        _rebuild_days(connection, [day for (day,) in connection.execute(
+            "SELECT DISTINCT day FROM main.daily_rollup WHERE bucket = ?", (PENDING,))])
+    return len(new)
+
+
+def sync_problem_buckets(connection) -> int:
+    """Классифицирует формулировки records, которых ещё нет в problem_bucket, и
+    пересчитывает в daily_rollup дни, где такие заявки учтены с видом PENDING.
+
+    Если с прошлой синхронизации журнал change_log не менялся, база не читается;
+    иначе просматриваются только заявки из новых записей журнала. Вся таблица
+    records перебирается, лишь когда журнала нет, он обрезан дальше сохранённого
+    seq или поменялись правила. Возвращает число добавленных формулировок.
+    """
+    install_summary_tables(connection)
+    count = _sync(connection)
+    connection.commit()
+    return count
+
+
+def rebuild_daily_rollup(connection) -> None:
+    """Пересобирает суточную сводку базы по records (например, после правки базы вне приложения)."""
+    install_summary_tables(connection)
+    _sync(connection)
+    _rebuild_days(connection, None)
+    connection.commit()
+
+
+def bucket_counts(connection, start_date: str, end_date: str):
+    """[(вид, количество)] заявок базы за период (даты YYYY-MM-DD включительно).
+
+    Отчёт не только читает базу: сначала sync_problem_buckets (при первом вызове —
+    install_summary_tables) и фиксирует транзакцию подключения. Если записать не
+    удалось (база занята или только для чтения), подсчёт идёт по records без сводки.
+    """
+    try:
+        sync_problem_buckets(connection)
+    except sqlite3.OperationalError:
+        # База занята или только для чтения: считаем по records, правилами по формулировкам
+        connection.rollback()
+        counts = {}
+        for problem, count in connection.execute("""
+                SELECT problem, COUNT(*) FROM main.records
+                WHERE date(date) >= date(?) AND date(date) <= date(?)
+                GROUP BY problem""", (start_date, end_date)):
+            bucket = parse_problem(problem).bucket
+            if bucket:
+                counts[bucket] = counts.get(bucket, 0) + count
+        return list(counts.items())
+    return connection.execute("""
+        SELECT bucket, SUM(n) FROM main.daily_rollup
+        WHERE day >= date(?) AND day <= date(?) AND bucket NOT IN ('', ?)
+        GROUP BY bucket
+    """, (start_date, end_date, PENDING)).fetchall()
+
+
+def summarize(pairs):
+    """Складывает пары (вид, количество) нескольких баз.
+    Возвращает (counts по всем BUCKETS, итого водоснабжение, итого водоотведение)."""
+    counts = dict.fromkeys(BUCKETS, 0)
+    for bucket, count in pairs:
+        if bucket in counts:
+            counts[bucket] += count
+    water_total = sum(counts[b] for b in WATER_BUCKETS)
+    sewer_total = sum(counts[b] for b in SEWER_BUCKETS)
+    return counts, water_total, sewer_total
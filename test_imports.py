@@ -26,11 +26,11 @@ except ImportError as e:
     print(f"✗ tkinter: {e}")
 
 try:
-    import pandas as pd
-    print("✓ pandas")
+    import openpyxl
+    print("✓ openpyxl")
 except ImportError as e:
-    errors.append(f"✗ pandas: {e}")
-    print(f"✗ pandas: {e}")
+    errors.append(f"✗ openpyxl: {e}")
+    print(f"✗ openpyxl: {e}")
 
 try:
     from tkcalendar import DateEntry